@@ -0,0 +1,52 @@
+#ifndef TELEMETRY_H
+#define TELEMETRY_H
+
+#include <Arduino.h>
+
+// Binary telemetry frames (enabled with MODE:BIN, disabled with MODE:ASCII)
+// Layout (11 bytes, little-endian):
+//   SYNC(u8) TYPE(u8) TIME(u16) POS(i16) SETPOINT(i16) OUTPUT(i16) CRC8(u8)
+// CRC8 (poly 0x07, init 0x00) covers TYPE..OUTPUT.
+// Must match python/interface/telemetry.py
+const uint8_t FRAME_SYNC = 0xA5;
+const uint8_t FRAME_SAMPLE = 0x01;
+const uint8_t FRAME_DONE = 0x02;
+const uint8_t FRAME_HOMED = 0x03; // TIME = homing duration (HSTART)
+const uint8_t FRAME_BEGIN = 0x04; // TIME = batch index (QRUN)
+const uint8_t FRAME_END = 0x05;   // TIME = batch index (QRUN)
+const uint8_t FRAME_SETTLED = 0x06; // TIME = settle time (START with Tolerance,DwellMs)
+const uint8_t FRAME_SIZE = 11;
+
+class Telemetry {
+private:
+    static uint8_t crc8(const uint8_t* data, uint8_t len) {
+        uint8_t crc = 0;
+        for (uint8_t i = 0; i < len; i++) {
+            crc ^= data[i];
+            for (uint8_t bit = 0; bit < 8; bit++) {
+                crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+            }
+        }
+        return crc;
+    }
+
+    static void putU16(uint8_t* buf, uint16_t value) {
+        buf[0] = value & 0xFF;
+        buf[1] = (value >> 8) & 0xFF;
+    }
+
+public:
+    static void sendFrame(uint8_t type, uint16_t time, int16_t pos, int16_t setpoint, int16_t output) {
+        uint8_t frame[FRAME_SIZE];
+        frame[0] = FRAME_SYNC;
+        frame[1] = type;
+        putU16(&frame[2], time);
+        putU16(&frame[4], (uint16_t)pos);
+        putU16(&frame[6], (uint16_t)setpoint);
+        putU16(&frame[8], (uint16_t)output);
+        frame[10] = crc8(&frame[1], FRAME_SIZE - 2);
+        Serial.write(frame, FRAME_SIZE);
+    }
+};
+
+#endif
@@ -1,6 +1,7 @@
 #include "Motor.h"
 #include "Potentiometer.h"
 #include "PID.h"
+#include "Telemetry.h"
 
 // --- PIN CONFIGURATION ---
 const int PIN_ENA = 9;
@@ -11,6 +12,8 @@ const int PIN_POT = A0;
 // --- CONSTANTS ---
 const unsigned long CONTROL_INTERVAL = 20; // 20ms Loop (50Hz)
 const unsigned long TEST_DURATION = 1500; // 1.5 Seconds per test
+const unsigned long HOME_TIMEOUT = 1500; // Homing gives up and starts the test anyway
+const int MAX_BATCH = 32; // Gain sets held by QADD (3 floats each)
 
 // --- OBJECTS ---
 Motor motor(PIN_ENA, PIN_IN1, PIN_IN2, 40); // 40 is a guess deadzone
@@ -20,6 +23,7 @@ PID myPID(-255, 255);
 // --- STATE MACHINE ---
 enum State {
     IDLE,
+    HOMING,
     RUNNING
 };
 State currentState = IDLE;
@@ -28,9 +32,39 @@ State currentState = IDLE;
 unsigned long testStartTime = 0;
 unsigned long lastControlTime = 0;
 float targetSetpoint = 512;
+bool binaryMode = false; // MODE:BIN streams Telemetry.h frames instead of CSV
+
+// HSTART: home on the device, then run the queued test
+float testKp = 0, testKi = 0, testKd = 0;
+unsigned long testDuration = TEST_DURATION; // START may ask for a shorter/longer test
+// Optional settle detection: end the test once the position stays within
+// settleTolerance of the setpoint for settleDwell ms (0 = off)
+float settleTolerance = 0;
+unsigned long settleDwell = 0;
+unsigned long settleSince = 0;
+bool settleInBand = false;
+float testSetpoint = 512;
+float homeTolerance = 5;
+unsigned long homeDwell = 100;
+unsigned long homeStartTime = 0;
+unsigned long inBandSince = 0;
+bool inBand = false;
+float homeKp = 1.0;
+float homeSetpoint = 400;
+
+// Batch queue: QADD uploads gain sets, QRUN runs home->test for each
+float batchGains[MAX_BATCH][3];
+int batchCount = 0;
+int batchIndex = 0;
+bool batchActive = false;
 
 // Forward Declarations
 void parseCommand(String input);
+void startTest(float kp, float ki, float kd, float sp);
+void startHoming();
+void startBatchItem();
+void finishTest();
+bool parseFloats(String data, float* values, int count);
 
 void setup() {
     Serial.begin(115200);
@@ -44,6 +78,7 @@ void loop() {
     if (!pot.isSafe()) {
         motor.stop();
         currentState = IDLE;
+        batchActive = false;
         // In a real panic, we might want to constantly print "ERROR"
         // But for now, just stopping is enough.
         return; 
@@ -57,14 +92,48 @@ void loop() {
     }
 
     // 3. STATE MACHINE LOGIC
+    if (currentState == HOMING) {
+        unsigned long now = millis();
+
+        // Run the weak homing loop at 50Hz (no telemetry)
+        if (now - lastControlTime >= CONTROL_INTERVAL) {
+            float dt = (now - lastControlTime) / 1000.0;
+            lastControlTime = now;
+
+            int currentPos = pot.read();
+            motor.drive(myPID.compute(targetSetpoint, currentPos, dt));
+
+            // Settled = inside the tolerance band for the whole dwell time
+            if (abs(currentPos - targetSetpoint) <= homeTolerance) {
+                if (!inBand) {
+                    inBand = true;
+                    inBandSince = now;
+                }
+            } else {
+                inBand = false;
+            }
+
+            bool settled = inBand && (now - inBandSince >= homeDwell);
+            if (settled || now - homeStartTime > HOME_TIMEOUT) {
+                unsigned long homingTime = now - homeStartTime;
+                if (binaryMode) {
+                    Telemetry::sendFrame(FRAME_HOMED, homingTime, currentPos, (int)targetSetpoint, 0);
+                } else {
+                    Serial.print("HOMED:");
+                    Serial.println(homingTime);
+                }
+                startTest(testKp, testKi, testKd, testSetpoint);
+            }
+        }
+        return;
+    }
+
     if (currentState == RUNNING) {
         unsigned long now = millis();
 
         // Check if Test Finished
-        if (now - testStartTime > TEST_DURATION) {
-            motor.stop();
-            currentState = IDLE;
-            Serial.println("DONE");
+        if (now - testStartTime > testDuration) {
+            finishTest();
             return;
         }
 
@@ -79,22 +148,49 @@ void loop() {
             motor.drive(output);
 
             // Stream Telemetry
-            // Format: TIME,POS,SETPOINT,OUTPUT
-            Serial.print(now - testStartTime);
-            Serial.print(",");
-            Serial.print(currentPos);
-            Serial.print(",");
-            Serial.print((int)targetSetpoint);
-            Serial.print(",");
-            Serial.println(output);
+            if (binaryMode) {
+                Telemetry::sendFrame(FRAME_SAMPLE, now - testStartTime, currentPos, (int)targetSetpoint, output);
+            } else {
+                // Format: TIME,POS,SETPOINT,OUTPUT
+                Serial.print(now - testStartTime);
+                Serial.print(",");
+                Serial.print(currentPos);
+                Serial.print(",");
+                Serial.print((int)targetSetpoint);
+                Serial.print(",");
+                Serial.println(output);
+            }
+
+            // Settle detection: report SETTLED and end the test early
+            if (settleTolerance > 0) {
+                if (abs(currentPos - targetSetpoint) <= settleTolerance) {
+                    if (!settleInBand) {
+                        settleInBand = true;
+                        settleSince = now;
+                    }
+                } else {
+                    settleInBand = false;
+                }
+
+                if (settleInBand && now - settleSince >= settleDwell) {
+                    if (binaryMode) {
+                        Telemetry::sendFrame(FRAME_SETTLED, now - testStartTime, currentPos, (int)targetSetpoint, 0);
+                    } else {
+                        Serial.print("SETTLED:");
+                        Serial.println(now - testStartTime);
+                    }
+                    finishTest();
+                }
+            }
         }
     }
 }
 
 void parseCommand(String input) {
     if (input.startsWith("START:")) {
-        // Expected: START:Kp,Ki,Kd,Setpoint
+        // Expected: START:Kp,Ki,Kd,Setpoint[,DurationMs[,Tolerance,DwellMs]]
         // Example: START:2.0,0.5,0.1,512
+        // With Tolerance,DwellMs the test ends early once settled (SETTLED:<ms>)
         
         // Remove "START:"
         String data = input.substring(6);
@@ -102,6 +198,9 @@ void parseCommand(String input) {
         int firstComma = data.indexOf(',');
         int secondComma = data.indexOf(',', firstComma + 1);
         int thirdComma = data.indexOf(',', secondComma + 1);
+        int fourthComma = data.indexOf(',', thirdComma + 1);
+        int fifthComma = data.indexOf(',', fourthComma + 1);
+        int sixthComma = data.indexOf(',', fifthComma + 1);
 
         if (firstComma > 0 && secondComma > 0 && thirdComma > 0) {
             float kp = data.substring(0, firstComma).toFloat();
@@ -109,17 +208,78 @@ void parseCommand(String input) {
             float kd = data.substring(secondComma + 1, thirdComma).toFloat();
             int sp = data.substring(thirdComma + 1).toInt();
 
-            // Setup Test
-            myPID.setTunings(kp, ki, kd);
-            myPID.reset(pot.read()); // Clear integrals, set prevInput
-            targetSetpoint = sp;
-            
-            testStartTime = millis();
-            lastControlTime = millis();
-            currentState = RUNNING;
-            
-            // Note: We don't print anything here to keep the data stream clean.
-            // The first telemetry packet will arrive in <20ms
+            startTest(kp, ki, kd, sp);
+            if (fourthComma > 0) {
+                testDuration = data.substring(fourthComma + 1).toInt();
+            }
+            if (fourthComma > 0 && fifthComma > 0 && sixthComma > 0) {
+                settleTolerance = data.substring(fifthComma + 1, sixthComma).toFloat();
+                settleDwell = data.substring(sixthComma + 1).toInt();
+            }
+        } else {
+            Serial.println("ERROR:INVALID_FORMAT");
+        }
+    } else if (input.startsWith("HSTART:")) {
+        // Expected: HSTART:Kp,Ki,Kd,Setpoint,HomePos,HomeKp,Tolerance,DwellMs
+        // Homes with a P-only loop until the position stays within
+        // Tolerance for DwellMs, then starts the test immediately.
+        float v[8];
+        if (parseFloats(input.substring(7), v, 8)) {
+            testKp = v[0];
+            testKi = v[1];
+            testKd = v[2];
+            testSetpoint = (int)v[3];
+            homeSetpoint = (int)v[4];
+            homeKp = v[5];
+            homeTolerance = v[6];
+            homeDwell = (unsigned long)v[7];
+            startHoming();
+        } else {
+            Serial.println("ERROR:INVALID_FORMAT");
+        }
+    } else if (input == "QCLEAR") {
+        if (currentState != IDLE) {
+            Serial.println("ERROR:BUSY");
+        } else {
+            batchCount = 0;
+            Serial.println("QUEUED:0");
+        }
+    } else if (input.startsWith("QADD:")) {
+        // Expected: QADD:Kp,Ki,Kd (acknowledged one by one so the
+        // 64-byte serial input buffer never overflows)
+        float v[3];
+        if (currentState != IDLE) {
+            Serial.println("ERROR:BUSY");
+        } else if (batchCount >= MAX_BATCH) {
+            Serial.println("ERROR:QUEUE_FULL");
+        } else if (parseFloats(input.substring(5), v, 3)) {
+            batchGains[batchCount][0] = v[0];
+            batchGains[batchCount][1] = v[1];
+            batchGains[batchCount][2] = v[2];
+            batchCount++;
+            Serial.print("QUEUED:");
+            Serial.println(batchCount);
+        } else {
+            Serial.println("ERROR:INVALID_FORMAT");
+        }
+    } else if (input.startsWith("QRUN:")) {
+        // Expected: QRUN:Setpoint,HomePos,HomeKp,Tolerance,DwellMs
+        // Every queued set is homed and tested back-to-back. Each result is
+        // wrapped in BEGIN:<i> ... END:<i>, then BATCH_DONE.
+        float v[5];
+        if (currentState != IDLE) {
+            Serial.println("ERROR:BUSY");
+        } else if (batchCount == 0) {
+            Serial.println("ERROR:QUEUE_EMPTY");
+        } else if (parseFloats(input.substring(5), v, 5)) {
+            testSetpoint = (int)v[0];
+            homeSetpoint = (int)v[1];
+            homeKp = v[2];
+            homeTolerance = v[3];
+            homeDwell = (unsigned long)v[4];
+            batchIndex = 0;
+            batchActive = true;
+            startBatchItem();
         } else {
             Serial.println("ERROR:INVALID_FORMAT");
         }
@@ -134,9 +294,115 @@ void parseCommand(String input) {
         } else {
             Serial.println("ERROR:BUSY");
         }
+    } else if (input.startsWith("MODE:")) {
+        // Telemetry format negotiation: MODE:BIN or MODE:ASCII
+        if (currentState != IDLE) {
+            Serial.println("ERROR:BUSY");
+        } else if (input == "MODE:BIN") {
+            binaryMode = true;
+            Serial.println("MODE:BIN");
+        } else if (input == "MODE:ASCII") {
+            binaryMode = false;
+            Serial.println("MODE:ASCII");
+        } else {
+            Serial.println("ERROR:INVALID_FORMAT");
+        }
     } else if (input.equalsIgnoreCase("STOP")) {
         motor.stop();
         currentState = IDLE;
+        batchActive = false;
         Serial.println("STOPPED");
     }
 }
+
+void startTest(float kp, float ki, float kd, float sp) {
+    // Setup Test
+    myPID.setTunings(kp, ki, kd);
+    myPID.reset(pot.read()); // Clear integrals, set prevInput
+    targetSetpoint = sp;
+
+    testDuration = TEST_DURATION;
+    settleTolerance = 0;
+    settleInBand = false;
+    testStartTime = millis();
+    lastControlTime = millis();
+    currentState = RUNNING;
+
+    // Note: We don't print anything here to keep the data stream clean.
+    // The first telemetry packet will arrive in <20ms
+}
+
+void startHoming() {
+    // P-only loop towards homeSetpoint; see the HOMING state in loop()
+    myPID.setTunings(homeKp, 0, 0);
+    myPID.reset(pot.read());
+    targetSetpoint = homeSetpoint;
+
+    inBand = false;
+    homeStartTime = millis();
+    lastControlTime = millis();
+    currentState = HOMING;
+}
+
+void startBatchItem() {
+    if (binaryMode) {
+        Telemetry::sendFrame(FRAME_BEGIN, batchIndex, 0, 0, 0);
+    } else {
+        Serial.print("BEGIN:");
+        Serial.println(batchIndex);
+    }
+    testKp = batchGains[batchIndex][0];
+    testKi = batchGains[batchIndex][1];
+    testKd = batchGains[batchIndex][2];
+    startHoming();
+}
+
+void finishTest() {
+    motor.stop();
+    currentState = IDLE;
+
+    if (!batchActive) {
+        if (binaryMode) {
+            Telemetry::sendFrame(FRAME_DONE, 0, 0, 0, 0);
+        } else {
+            Serial.println("DONE");
+        }
+        return;
+    }
+
+    if (binaryMode) {
+        Telemetry::sendFrame(FRAME_END, batchIndex, 0, 0, 0);
+    } else {
+        Serial.print("END:");
+        Serial.println(batchIndex);
+    }
+
+    batchIndex++;
+    if (batchIndex < batchCount) {
+        startBatchItem();
+        return;
+    }
+
+    batchActive = false;
+    batchCount = 0;
+    if (binaryMode) {
+        Telemetry::sendFrame(FRAME_DONE, 0, 0, 0, 0);
+    } else {
+        Serial.println("BATCH_DONE");
+    }
+}
+
+// Parses `count` comma-separated numbers. Returns false if any are missing.
+bool parseFloats(String data, float* values, int count) {
+    int start = 0;
+    for (int i = 0; i < count; i++) {
+        int comma = data.indexOf(',', start);
+        bool last = (i == count - 1);
+        if (last == (comma >= 0)) return false; // Too few or too many fields
+        String field = last ? data.substring(start) : data.substring(start, comma);
+        if (field.length() == 0) return false;
+        values[i] = field.toFloat();
+        start = comma + 1;
+    }
+    return true;
+}
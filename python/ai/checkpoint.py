@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from .genetic_tuner import Individual
+
+# Tuner settings saved with every snapshot and restored on resume
+CONFIG = ('pop_size', 'mutation_rate', 'tournament_size', 'max_samples', 'early_abort',
+          'screen_factor', 'min_surrogate_points', 'kp_range', 'ki_range', 'kd_range',
+          'home_kp', 'home_ki', 'home_kd', 'home_pos', 'on_device_homing',
+          'home_tolerance', 'home_dwell_ms', 'settle_tolerance', 'settle_dwell_ms', 'test_samples')
+
+
+def _to_tuple(value):
+    # JSON turns the tuples of random.getstate() into lists
+    if isinstance(value, list):
+        return tuple(_to_tuple(v) for v in value)
+    return value
+
+
+class Checkpoint:
+    """
+    Crash-safe progress of a GeneticTuner session.
+    A snapshot (config, generation, population, archive, RNG state) is
+    written atomically once per generation, right after breeding. Every
+    evaluation in between only appends one line to a journal next to it,
+    so checkpointing costs a short write per test. restore() loads the
+    snapshot and replays the journal, so a resumed session continues
+    mid-generation without re-testing anyone.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + '.log'
+        self._journal = None
+        self._lock = threading.Lock()  # RigPool workers record concurrently
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def save(self, tuner):
+        """Writes a full snapshot and starts a new journal."""
+        state = {
+            'config': {key: getattr(tuner, key) for key in CONFIG},
+            'generation': tuner.generation,
+            'evaluations': tuner.evaluations,
+            'rng_state': tuner.rng.getstate(),
+            'population': [self._individual(ind) for ind in tuner.population],
+            'archive': [list(genes) + [cost] for genes, cost in tuner.archive.items()],
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+        # Journal entries of older generations are ignored on restore, so
+        # a crash between the replace and the truncate is harmless
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, 'w')
+
+    def record(self, tuner, individual):
+        """Appends one finished evaluation to the journal."""
+        try:
+            index = tuner.population.index(individual)
+        except ValueError:
+            return
+        entry = self._individual(individual)
+        entry.update(generation=tuner.generation, index=index, evaluations=tuner.evaluations)
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a')
+            self._journal.write(json.dumps(entry) + '\n')
+            self._journal.flush()
+
+    def restore(self, tuner):
+        """
+        Loads the snapshot and journal into tuner. Objects that are not
+        part of the state (cache, surrogate, metrics, store) stay as set
+        on the tuner. Returns the number of individuals of the current
+        generation that already have a cost.
+        """
+        with open(self.path) as f:
+            state = json.load(f)
+
+        for key, value in state['config'].items():
+            setattr(tuner, key, tuple(value) if key.endswith('_range') else value)
+        tuner.generation = state['generation']
+        tuner.evaluations = state['evaluations']
+        tuner.rng.setstate(_to_tuple(state['rng_state']))
+
+        def build(entry):
+            ind = Individual(entry['kp'], entry['ki'], entry['kd'])
+            ind.cost = entry['cost']
+            ind.aborted = entry['aborted']
+            return ind
+
+        tuner.archive = {tuple(entry[:3]): entry[3] for entry in state['archive']}
+        tuner.population = [build(entry) for entry in state['population']]
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn last line from a crash
+                    if entry['generation'] != tuner.generation:
+                        continue
+                    if entry['index'] >= len(tuner.population):
+                        continue  # Not from this snapshot's population
+                    ind = tuner.population[entry['index']]
+                    if ind.get_genes() != [entry['kp'], entry['ki'], entry['kd']]:
+                        continue
+                    ind.cost = entry['cost']
+                    ind.aborted = entry['aborted']
+                    tuner.evaluations = max(tuner.evaluations, entry['evaluations'])
+
+        return sum(1 for ind in tuner.population if ind.cost != float('inf'))
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    @staticmethod
+    def _individual(ind):
+        return {'kp': ind.kp, 'ki': ind.ki, 'kd': ind.kd, 'cost': ind.cost, 'aborted': ind.aborted}
@@ -1,5 +1,4 @@
 import numpy as np
-import pandas as pd
 
 class CostFunction:
     def __init__(self, w_sae=1.0, w_overshoot=10.0, w_settling=2.0):
@@ -7,60 +6,183 @@ class CostFunction:
         self.w_overshoot = w_overshoot
         self.w_settling = w_settling
 
-    def evaluate(self, df):
+    def evaluate(self, df, samples=None):
         """
         Calculates the Cost of a run.
-        df: Pandas DataFrame with columns ['time', 'pos', 'setpoint', 'output']
+        df: ResponseBuffer or Pandas DataFrame with columns ['time', 'pos', 'setpoint', 'output']
+        samples: length of a full run. A run that ended early because it
+        settled is scored as if the missing samples had zero error.
         Returns: float (The Cost, lower is better)
         """
-        if df.empty:
+        if len(df) == 0:
             return 1e6 # Heavily penalize failed runs
 
-        # 1. Calculate Error Vector
-        error = df['setpoint'] - df['pos']
-        abs_error = np.abs(error)
+        time = np.asarray(df['time'])[None, :]
+        pos = np.asarray(df['pos'])[None, :]
+        setpoint = np.asarray(df['setpoint'])[None, :]
+        return float(self.evaluate_many(time, pos, setpoint, samples=samples)[0])
 
-        # 2. Sum of Absolute Error (SAE)
-        # Normalize by number of samples to keep score consistent across durations
-        sae_score = np.mean(abs_error)
+    def evaluate_many(self, time, pos, setpoint, lengths=None, mask=None, samples=None):
+        """
+        Scores N runs at once, identical to evaluate() on each of them.
+        time, pos, setpoint: (N, T) arrays, one run per row
+        lengths: optional (N,) valid samples per row (runs stopped early)
+        mask: optional (N, T) bool array of valid samples, instead of lengths
+        samples: optional full run length (scalar or (N,)), as in evaluate()
+        Returns: (N,) float array of costs; rows without samples cost 1e6.
+        """
+        time = np.asarray(time)
+        pos = np.asarray(pos)
+        setpoint = np.asarray(setpoint)
+        n, t = pos.shape
+        if t == 0:
+            return np.full(n, 1e6)
+        rows = np.arange(n)
+        if mask is None and lengths is not None:
+            mask = np.arange(t) < np.asarray(lengths)[:, None]
 
-        # 3. Overshoot Calculation
-        target = df['setpoint'].iloc[0]
-        max_pos = df['pos'].max()
-        min_pos = df['pos'].min()
-        
-        overshoot = 0
-        # Assuming we move UP to target
-        if df['setpoint'].iloc[-1] > df['pos'].iloc[0]:
-            if max_pos > target:
-                overshoot = max_pos - target
-        # Assuming we move DOWN to target
+        # 1. Error Vector (samples outside the mask count as zero error)
+        abs_error = np.abs(setpoint - pos)
+        if mask is None:
+            # Every row is a full run: skip the masking
+            count = np.full(n, t)
+            first = np.zeros(n, dtype=np.intp)
+            last = np.full(n, t - 1)
+            max_pos = pos.max(axis=1)
+            min_pos = pos.min(axis=1)
+            unsettled = abs_error > 10
         else:
-            if min_pos < target:
-                overshoot = target - min_pos
-        
-        # Penalize only significant overshoot (> 5 units)
-        overshoot_score = max(0, overshoot - 5)
+            mask = np.asarray(mask, dtype=bool)
+            count = mask.sum(axis=1)
+            first = np.argmax(mask, axis=1)
+            last = t - 1 - np.argmax(mask[:, ::-1], axis=1)
+            abs_error = np.where(mask, abs_error, 0)
+            max_pos = np.where(mask, pos, np.iinfo(np.int64).min).max(axis=1)
+            min_pos = np.where(mask, pos, np.iinfo(np.int64).max).min(axis=1)
+            unsettled = mask & (abs_error > 10)
 
-        # 4. Settling Time Calculation
-        # Find time when error stays within 5% (approx 10 units for 0-1023)
-        threshold = 10
-        settled_indices = np.where(abs_error > threshold)[0]
-        
-        if len(settled_indices) == 0:
-             # Started settled?
-            settling_time_score = 0
-        else:
-            # Last index where it was UNSETTLED + 1 is the settling time index
-            last_unsettled_idx = settled_indices[-1]
-            settling_time_score = df['time'].iloc[last_unsettled_idx]
+        # 2. Sum of Absolute Error (SAE), normalized by number of samples.
+        # Integer sums are exact, so this equals np.mean of each run.
+        divisor = count if samples is None else np.maximum(count, samples)
+        sae_score = abs_error.sum(axis=1) / np.maximum(divisor, 1)
+
+        # 3. Overshoot: past the target in the direction of the move
+        target = setpoint[rows, first]
+        moving_up = setpoint[rows, last] > pos[rows, first]
+        overshoot = np.where(moving_up, np.maximum(max_pos - target, 0),
+                             np.maximum(target - min_pos, 0))
+        # Penalize only significant overshoot (> 5 units)
+        overshoot_score = np.maximum(overshoot - 5, 0)
 
-        # Normalize settling time (e.g., divide by 1000ms) to keep scale similar to error
-        settling_time_score /= 1000.0 
+        # 4. Settling Time: time of the last sample outside 10 units (~5%)
+        last_unsettled = t - 1 - np.argmax(unsettled[:, ::-1], axis=1)
+        settling_time_score = np.where(unsettled.any(axis=1), time[rows, last_unsettled], 0) / 1000.0
 
         # 5. Total Cost
         total_cost = (self.w_sae * sae_score) + \
                      (self.w_overshoot * overshoot_score) + \
                      (self.w_settling * settling_time_score)
-                     
-        return total_cost
+        return np.where(count > 0, total_cost, 1e6)
+
+    def evaluate_scenario(self, responses, weights, samples=None):
+        """
+        Weighted mean of the step costs of a scenario plan.
+        responses: one run per step (an empty run costs the failure penalty)
+        weights: the step weights, same order
+        samples: optional full length of every step, as in evaluate()
+        """
+        samples = samples or [None] * len(responses)
+        total = sum(w * self.evaluate(df, n) for df, w, n in zip(responses, weights, samples))
+        return total / sum(weights)
+
+    def stream(self, abort_threshold=None, max_samples=None):
+        """Returns a StreamingCost that scores a run sample by sample."""
+        return StreamingCost(self, abort_threshold, max_samples)
+
+
+class StreamingCost:
+    """
+    Incremental version of CostFunction.evaluate.
+    update() is called once per sample as it arrives; cost() then gives the
+    exact same result as evaluate() on the whole run. While the run is still
+    going, lower_bound() is a cost the finished run can never go below, so a
+    run whose bound is already past `abort_threshold` can be stopped early.
+    max_samples: most samples a run can produce (tightens the SAE bound).
+    """
+    def __init__(self, cost_func, abort_threshold=None, max_samples=None):
+        self.cost_func = cost_func
+        self.abort_threshold = abort_threshold
+        self.max_samples = max_samples
+        self.aborted = False
+
+        self.n = 0
+        self.sum_abs_error = 0
+        self.target = None
+        self.start_pos = None
+        self.last_setpoint = None
+        self.max_pos = None
+        self.min_pos = None
+        self.last_unsettled_time = 0
+
+    def update(self, time, pos, setpoint):
+        if self.n == 0:
+            self.target = setpoint
+            self.start_pos = pos
+            self.max_pos = pos
+            self.min_pos = pos
+        elif pos > self.max_pos:
+            self.max_pos = pos
+        elif pos < self.min_pos:
+            self.min_pos = pos
+
+        abs_error = abs(setpoint - pos)
+        self.sum_abs_error += abs_error
+        if abs_error > 10:
+            self.last_unsettled_time = time
+        self.last_setpoint = setpoint
+        self.n += 1
+
+    def extend(self, time, pos, setpoint):
+        for t, p, s in zip(time, pos, setpoint):
+            self.update(int(t), int(p), int(s))
+
+    def _total(self, sae_score):
+        # Same terms as CostFunction.evaluate, built from the running state
+        overshoot = 0
+        if self.last_setpoint > self.start_pos:
+            if self.max_pos > self.target:
+                overshoot = self.max_pos - self.target
+        else:
+            if self.min_pos < self.target:
+                overshoot = self.target - self.min_pos
+        overshoot_score = max(0, overshoot - 5)
+
+        settling_time_score = self.last_unsettled_time / 1000.0
+
+        return (self.cost_func.w_sae * sae_score) + \
+               (self.cost_func.w_overshoot * overshoot_score) + \
+               (self.cost_func.w_settling * settling_time_score)
+
+    def cost(self, samples=None):
+        """Cost of the samples seen so far, identical to evaluate(df, samples)."""
+        if self.n == 0:
+            return 1e6
+        return self._total(self.sum_abs_error / max(self.n, samples or 0))
+
+    def lower_bound(self):
+        """
+        Lowest cost the run can still finish with. Overshoot and settling
+        time only grow with more samples; the SAE mean can only be bounded
+        when the maximum sample count is known.
+        """
+        if self.n == 0:
+            return 0.0
+        if self.max_samples:
+            return self._total(self.sum_abs_error / max(self.n, self.max_samples))
+        return self._total(0.0)
+
+    def should_abort(self):
+        if self.abort_threshold is None or self.aborted:
+            return self.aborted
+        self.aborted = self.lower_bound() > self.abort_threshold
+        return self.aborted
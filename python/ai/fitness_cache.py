@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class FitnessCache:
+    """
+    Remembers the cost of gain sets that were already tested, so children
+    that are practically identical to a past individual skip the rig.
+    Keys are (kp, ki, kd) quantized to `resolution` plus the setpoint and
+    home position. Least recently used entries are evicted past `max_size`.
+    With `remeasure_after=N`, an entry is reported as a miss after N hits
+    so the point is tested again and hardware drift is still noticed.
+    """
+    def __init__(self, max_size=1024, resolution=0.01, path=None, remeasure_after=None):
+        self.max_size = max_size
+        # One step for all gains, or a (kp, ki, kd) tuple
+        if isinstance(resolution, (int, float)):
+            resolution = (resolution,) * 3
+        self.resolution = tuple(resolution)
+        self.path = path
+        self.remeasure_after = remeasure_after
+
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> [cost, hits since measured]
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def make_key(self, kp, ki, kd, setpoint, home_pos):
+        genes = (kp, ki, kd)
+        return tuple(int(round(g / r)) for g, r in zip(genes, self.resolution)) + \
+               (int(setpoint), int(home_pos))
+
+    def get(self, kp, ki, kd, setpoint, home_pos):
+        """Returns the cached cost, or None if the point must be tested."""
+        key = self.make_key(kp, ki, kd, setpoint, home_pos)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.remeasure_after and entry[1] >= self.remeasure_after):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry[1] += 1
+            self.hits += 1
+            return entry[0]
+
+    def put(self, kp, ki, kd, setpoint, home_pos, cost):
+        key = self.make_key(kp, ki, kd, setpoint, home_pos)
+        with self._lock:
+            self._entries[key] = [cost, 0]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def save(self, path=None):
+        """Writes the cache to disk atomically (JSON)."""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            state = {
+                'resolution': self.resolution,
+                'entries': [list(key) + entry for key, entry in self._entries.items()],
+            }
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        with open(path) as f:
+            state = json.load(f)
+        if tuple(state['resolution']) != self.resolution:
+            print(f"Fitness cache {path} uses a different resolution, ignoring it.")
+            return
+        with self._lock:
+            self._entries = OrderedDict(
+                (tuple(row[:5]), [row[5], row[6]]) for row in state['entries'][-self.max_size:]
+            )
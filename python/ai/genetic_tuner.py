@@ -1,5 +1,12 @@
+import asyncio
+import io
 import random
+import threading
 import time
+from collections import deque
+from contextlib import nullcontext, redirect_stdout
+from interface.response_buffer import ResponseBuffer
+import numpy as np
 from .cost_function import CostFunction
 
 
@@ -9,19 +16,42 @@ class Individual:
         self.ki = ki
         self.kd = kd
         self.cost = float('inf')
-        self.history = None  # Store DataFrame for plotting
+        self.history = None  # ResponseBuffer (or TraceHandle) for plotting
+        self.aborted = False  # Cost is only a lower bound (test stopped early)
 
     def get_genes(self):
         return [self.kp, self.ki, self.kd]
 
 
 class GeneticTuner:
-    def __init__(self, pop_size=20, mutation_rate=0.1):
+    # RigPool workers count evaluations concurrently; a class attribute, so
+    # tuners still pickle (simulation.islands)
+    _evaluations_lock = threading.Lock()
+
+    def __init__(self, pop_size=20, mutation_rate=0.1, cache=None, surrogate=None, metrics=None,
+                 rng=None):
         self.pop_size = pop_size
         self.mutation_rate = mutation_rate
         self.population = []
         self.generation = 0
         self.cost_func = CostFunction()
+        self.cache = cache  # Optional FitnessCache, skips re-testing known gains
+        self.early_abort = False  # Stop tests that can no longer win a tournament
+        self.tournament_size = 3
+        self.max_samples = 76  # TEST_DURATION / CONTROL_INTERVAL + 1
+        self.evaluations = 0  # Tests actually run (cache hits excluded)
+        self.metrics = metrics  # Optional MetricsRecorder for per-phase timing
+        self.rng = rng or random  # Pass a random.Random for an independent, seeded stream
+
+        # Surrogate pre-screening: breed screen_factor x more children than
+        # needed and only test the ones the model ranks best
+        self.surrogate = surrogate  # Optional RBFSurrogate
+        self.screen_factor = 5
+        self.min_surrogate_points = 10
+        # (kp, ki, kd) -> cost of fully measured runs, oldest first; only
+        # kept with a surrogate, and only the newest max_archive of them
+        self.archive = {}
+        self.max_archive = 500
 
         # PID Limits
         self.kp_range = (0.1, 10.0)
@@ -32,33 +62,250 @@ class GeneticTuner:
         self.home_kp = 1.0
         self.home_ki = 0.0
         self.home_kd = 0.0
+        self.home_pos = 400
+
+        # On-device homing (HSTART): the firmware homes until the position
+        # stays within home_tolerance for home_dwell_ms, then tests at once
+        self.on_device_homing = False
+        self.home_tolerance = 5
+        self.home_dwell_ms = 100
+
+        # Optional settle detection (START tests): the firmware ends a test
+        # once the position stays within settle_tolerance of the setpoint for
+        # settle_dwell_ms; the cut-off tail is scored as zero error over a
+        # full run of test_samples (scenario steps: duration / 20 ms). Keep
+        # the band below the cost function's 10-count settling threshold so
+        # the settling time is not changed. HSTART and QRUN cannot do this.
+        self.settle_tolerance = None
+        self.settle_dwell_ms = 200
+        self.test_samples = 75  # 1500 ms at 20 ms
+
+        # Optional ai.trace_store.TraceStore: every run is appended to disk
+        # and histories become lazy handles, so memory stays flat
+        self.store = None
+
+        # Optional ai.checkpoint.Checkpoint: snapshot after every generation,
+        # journal line after every evaluation
+        self.checkpoint = None
+
+        # Optional ai.scenario.ScenarioPlan: score every individual on a set
+        # of chained step tests instead of the single home -> setpoint step
+        self.scenario = None
+
+        # Optional ai.system_id.PlantIdentifier: every run is added to it, and
+        # run_generation_model tunes on the plant fitted from those runs
+        self.identifier = None
 
     def initialize_population(self):
         self.population = []
         for _ in range(self.pop_size):
-            kp = random.uniform(*self.kp_range)
-            ki = random.uniform(*self.ki_range)
-            kd = random.uniform(*self.kd_range)
+            kp = self.rng.uniform(*self.kp_range)
+            ki = self.rng.uniform(*self.ki_range)
+            kd = self.rng.uniform(*self.kd_range)
             self.population.append(Individual(kp, ki, kd))
+        if self.checkpoint is not None:
+            self.checkpoint.save(self)
 
-    def evaluate_individual(self, interface, individual, setpoint=600):
+    def evaluate_individual(self, interface, individual, setpoint=600, abort_threshold=None):
         """
         Runs a test on hardware for a single individual.
+        If abort_threshold is given, the test is stopped as soon as its cost
+        is certain to exceed it, and the individual gets the lower bound.
         """
         print(f"  Testing PID: Kp={individual.kp:.2f}, Ki={individual.ki:.2f}, Kd={individual.kd:.2f}")
 
-        # 1. Return motor to home position before each test
-        self._move_to_home(interface, home_pos=400)
-        time.sleep(0.3)
+        if self.metrics is None:
+            self._run_test(interface, individual, setpoint, abort_threshold)
+        else:
+            self.metrics.start_individual(self.generation, individual)
+            before = dict(interface.stats)
+            cached = self._run_test(interface, individual, setpoint, abort_threshold)
+            self.metrics.add_counters(before, interface.stats)
+            self.metrics.end_individual(individual, cached)
+
+        # A cut-off run is tested again after a resume
+        if self.checkpoint is not None and not interface.timed_out:
+            self.checkpoint.record(self, individual)
+
+    def _run_test(self, interface, individual, setpoint, abort_threshold):
+        """
+        Homes, tests and scores one individual. Returns True if the cost
+        came from the fitness cache instead.
+        """
+        if self.scenario is not None:
+            return self._run_scenario(interface, individual)
+
+        if self._lookup_cache(individual, setpoint, self.home_pos):
+            print(f"    Cost: {individual.cost:.4f} (cached)")
+            return True
+
+        with self._evaluations_lock:
+            self.evaluations += 1
+        interface.timed_out = False
+        monitor = self.cost_func.stream(abort_threshold, self.max_samples)
+        parse_before = interface.stats['parse_seconds']
+
+        if self.on_device_homing:
+            self._check_settle_mode("on_device_homing (HSTART)")
+            # 1+2. Home and test in one command, no host round-trip between
+            with self._phase('test'):
+                interface.send_home_and_start(
+                    individual.kp, individual.ki, individual.kd, setpoint,
+                    self.home_pos, self.home_kp, self.home_tolerance, self.home_dwell_ms)
+                data = interface.read_response(timeout=4.5, monitor=monitor)
+            if self.metrics is not None and interface.last_homing_ms is not None:
+                homing = interface.last_homing_ms / 1000.0
+                self.metrics.add('homing', homing)
+                self.metrics.add('test', -homing)
+        else:
+            # 1. Return motor to home position before each test
+            with self._phase('homing'):
+                self._move_to_home(interface, home_pos=self.home_pos)
+            with self._phase('settle'):
+                time.sleep(0.3)
+
+            # 2. Run Test
+            parse_before = interface.stats['parse_seconds']
+            with self._phase('test'):
+                interface.send_command(individual.kp, individual.ki, individual.kd, setpoint,
+                                       settle_tolerance=self.settle_tolerance,
+                                       settle_dwell_ms=self.settle_dwell_ms)
+                data = interface.read_response(timeout=3.0, monitor=monitor)
+
+        self._score_run(interface, individual, setpoint, monitor, data, parse_before)
+        return False
+
+    def _score_run(self, interface, individual, setpoint, monitor, data, parse_before):
+        """Final part of _run_test: cost, cache and history of a finished run."""
+        if self.metrics is not None:
+            # Parsing happens inside read_response; split it out of the test phase
+            parse = interface.stats['parse_seconds'] - parse_before
+            self.metrics.add('parse', parse)
+            self.metrics.add('test', -parse)
 
-        # 2. Run Test
-        interface.send_command(individual.kp, individual.ki, individual.kd, setpoint)
-        df = interface.read_response(timeout=3.0)
+        # 3. Calculate Cost (scored while the samples arrived)
+        with self._phase('cost'):
+            individual.aborted = monitor.aborted
+            if monitor.aborted:
+                individual.cost = monitor.lower_bound()
+            else:
+                individual.cost = monitor.cost(self.test_samples if data.settled_ms is not None else None)
+                if self.cache is not None and not interface.timed_out:
+                    self.cache.put(individual.kp, individual.ki, individual.kd,
+                                   setpoint, self.home_pos, individual.cost)
+            self._keep_history(individual, data)
 
-        # 3. Calculate Cost
-        individual.history = df
-        individual.cost = self.cost_func.evaluate(df)
-        print(f"    Cost: {individual.cost:.4f}")
+        if individual.aborted:
+            print(f"    Cost: >{individual.cost:.4f} (stopped early)")
+        else:
+            print(f"    Cost: {individual.cost:.4f}")
+
+    def _run_scenario(self, interface, individual):
+        """
+        Runs every step of the compiled scenario plan, homing only where a
+        step does not start where the previous one ended. The history is
+        all steps back to back on one time axis; the cost is the weighted
+        mean of the step costs.
+        """
+        key = self.scenario.cache_key()
+        if self._lookup_cache(individual, key, 0):
+            print(f"    Cost: {individual.cost:.4f} (cached)")
+            return True
+
+        with self._evaluations_lock:
+            self.evaluations += 1
+        interface.timed_out = False
+        steps, moves = self.scenario.compiled()
+        responses = []
+
+        for step, move in zip(steps, moves):
+            if move:
+                with self._phase('homing'):
+                    self._move_to_home(interface, home_pos=step.home)
+                with self._phase('settle'):
+                    time.sleep(0.3)
+
+            with self._phase('test'):
+                interface.send_command(individual.kp, individual.ki, individual.kd,
+                                       step.setpoint, step.duration,
+                                       settle_tolerance=self.settle_tolerance,
+                                       settle_dwell_ms=self.settle_dwell_ms)
+                data = interface.read_response(timeout=step.duration / 1000.0 + 1.5)
+            if interface.timed_out:
+                break
+            responses.append(data)
+
+        history = self._join_runs(responses)
+        runs = list(responses)
+        # Steps that never ran count as failed runs
+        responses += [ResponseBuffer()] * (len(steps) - len(responses))
+        # Settled steps ended early: score their tail as a full step
+        samples = [step.duration // 20 if data.settled_ms is not None else None
+                   for step, data in zip(steps, responses)]
+
+        with self._phase('cost'):
+            individual.aborted = False
+            individual.cost = self.cost_func.evaluate_scenario(
+                responses, [step.weight for step in steps], samples)
+            if self.cache is not None and not interface.timed_out:
+                self.cache.put(individual.kp, individual.ki, individual.kd, key, 0, individual.cost)
+            self._keep_history(individual, history, runs)
+
+        print(f"    Cost: {individual.cost:.4f} ({len(steps)} steps, {sum(moves)} homing moves)")
+        return False
+
+    @staticmethod
+    def _join_runs(runs):
+        """The runs of a scenario back to back on one time axis (for plotting)."""
+        history = ResponseBuffer()
+        for data in runs:
+            offset = history['time'][-1] + 20 if len(history) else 0  # One control interval
+            history.extend(data['time'] + offset, data['pos'], data['setpoint'], data['output'])
+        return history
+
+    def _keep_history(self, individual, data, runs=None):
+        """
+        Attaches a scored run to the individual. With a trace store the run
+        is appended to disk and the individual only keeps a lazy handle.
+        runs: the separate step runs a joined scenario history is made of;
+        the identifier gets those, as the idle time between them is not
+        in the trace.
+        """
+        if self.identifier is not None:
+            for run in (runs if runs is not None else [data]):
+                self.identifier.add(run)
+        if self.store is None:
+            individual.history = data
+            return
+        try:
+            index = self.population.index(individual)
+        except ValueError:
+            index = -1
+        individual.history = self.store.append(self.generation, index, individual, data)
+
+    def _check_settle_mode(self, mode):
+        if self.settle_tolerance is not None:
+            raise Exception(f"settle_tolerance needs START tests; {mode} has no settle detection.")
+
+    def _phase(self, name):
+        """Timer for one phase of an evaluation (no-op without metrics)."""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(name)
+
+    def _lookup_cache(self, individual, setpoint, home_pos):
+        """
+        Fills in the individual's cost from the fitness cache.
+        Returns True on a hit (no test needed).
+        """
+        if self.cache is None:
+            return False
+        cost = self.cache.get(individual.kp, individual.ki, individual.kd, setpoint, home_pos)
+        if cost is None:
+            return False
+        individual.cost = cost
+        individual.history = None
+        return True
 
     def _move_to_home(self, interface, home_pos=400):
         """
@@ -69,6 +316,148 @@ class GeneticTuner:
         interface.send_command(self.home_kp, self.home_ki, self.home_kd, home_pos)
         interface.read_response(timeout=3.0)  # Wait for DONE, discard homing data
 
+    def evaluate_population_batch(self, simulator, setpoint=600, home_pos=400):
+        """
+        Scores every unevaluated individual with a single call to a batch
+        simulator (e.g. simulation.batch_motor.BatchSimulatedMotor).
+        The simulator must provide run_batch(kp, ki, kd, setpoint, start_pos)
+        returning (N, T) arrays of time, pos, setpoint and output.
+        With a scenario plan set, its steps are simulated instead of the
+        home_pos -> setpoint step.
+        """
+        if self.scenario is not None:
+            setpoint, home_pos = self.scenario.cache_key(), 0
+        pending = [ind for ind in self.population
+                   if ind.cost == float('inf') and not self._lookup_cache(ind, setpoint, home_pos)]
+        if not pending:
+            return
+        if self.scenario is not None:
+            self._simulate_scenario(simulator, pending)
+            return
+
+        n = len(pending)
+        self.evaluations += n
+        times, positions, setpoints, outputs = simulator.run_batch(
+            kp=[ind.kp for ind in pending],
+            ki=[ind.ki for ind in pending],
+            kd=[ind.kd for ind in pending],
+            setpoint=[setpoint] * n,
+            start_pos=[home_pos] * n,
+        )
+
+        # Simulators with a safety stop report shorter runs in `lengths`
+        lengths = getattr(simulator, 'lengths', None)
+        costs = self.cost_func.evaluate_many(times, positions, setpoints, lengths=lengths)
+        for i, ind in enumerate(pending):
+            end = times.shape[1] if lengths is None else lengths[i]
+            data = ResponseBuffer.from_columns(
+                times[i, :end], positions[i, :end], setpoints[i, :end], outputs[i, :end])
+            ind.cost = float(costs[i])
+            if self.cache is not None:
+                self.cache.put(ind.kp, ind.ki, ind.kd, setpoint, home_pos, ind.cost)
+            self._keep_history(ind, data)
+            if self.checkpoint is not None:
+                self.checkpoint.record(self, ind)
+
+    def _simulate_scenario(self, simulator, pending):
+        """
+        evaluate_population_batch for a scenario plan: one run_batch call
+        per compiled step. Chained steps start where the previous one
+        ended, the others at the step's home. After a safety stop the
+        remaining steps of that individual count as failed runs, as on
+        the rig, where the test times out.
+        """
+        steps, moves = self.scenario.compiled()
+        key = self.scenario.cache_key()
+        n = len(pending)
+        self.evaluations += n
+        gains = {g: [getattr(ind, g) for ind in pending] for g in ('kp', 'ki', 'kd')}
+        rows = np.arange(n)
+        pos = np.zeros(n)
+        alive = np.ones(n, dtype=bool)
+        total = np.zeros(n)
+        runs = [[] for _ in pending]
+
+        for step, move in zip(steps, moves):
+            start = np.full(n, float(step.home)) if move else pos
+            times, positions, setpoints, outputs = simulator.run_batch(
+                setpoint=[step.setpoint] * n, start_pos=start, duration=step.duration / 1000.0, **gains)
+            full = times.shape[1]
+            lengths = getattr(simulator, 'lengths', None)
+            lengths = np.full(n, full) if lengths is None else np.asarray(lengths)
+            lengths = np.where(alive, lengths, 0)
+            total += step.weight * self.cost_func.evaluate_many(times, positions, setpoints, lengths=lengths)
+            for i in np.flatnonzero(lengths):
+                end = lengths[i]
+                runs[i].append(ResponseBuffer.from_columns(
+                    times[i, :end], positions[i, :end], setpoints[i, :end], outputs[i, :end]))
+            pos = positions[rows, np.maximum(lengths - 1, 0)].astype(float)
+            alive &= lengths == full
+
+        costs = total / sum(step.weight for step in steps)
+        for i, ind in enumerate(pending):
+            ind.cost = float(costs[i])
+            ind.aborted = False
+            if self.cache is not None:
+                self.cache.put(ind.kp, ind.ki, ind.kd, key, 0, ind.cost)
+            self._keep_history(ind, self._join_runs(runs[i]), runs[i])
+            if self.checkpoint is not None:
+                self.checkpoint.record(self, ind)
+
+    def evaluate_population_device(self, interface, setpoint=600):
+        """
+        Scores every unevaluated individual with on-device batches: up to
+        interface.max_batch gain sets are queued on the firmware and run
+        back-to-back (homing included) with a single QRUN, so there is no
+        host round-trip between tests. Sets cut off by a timeout keep an
+        infinite cost. With metrics, every set gets a record with an even
+        share of its batch, split into homing and test at the reported
+        homing time.
+        """
+        self._check_settle_mode("the device batch (QRUN)")
+        pending = [ind for ind in self.population
+                   if ind.cost == float('inf') and not self._lookup_cache(ind, setpoint, self.home_pos)]
+
+        for start in range(0, len(pending), interface.max_batch):
+            chunk = pending[start:start + interface.max_batch]
+            print(f"\n[{start + 1}-{start + len(chunk)}/{len(pending)}] Device batch")
+            self.evaluations += len(chunk)
+
+            before = dict(interface.stats)
+            batch_start = time.perf_counter()
+            responses, homing_ms = interface.run_batch(
+                [ind.get_genes() for ind in chunk], setpoint, self.home_pos,
+                self.home_kp, self.home_tolerance, self.home_dwell_ms)
+            share = (time.perf_counter() - batch_start) / len(chunk)
+            parse = (interface.stats['parse_seconds'] - before.get('parse_seconds', 0.0)) / len(chunk)
+
+            for i, (ind, data, homed) in enumerate(zip(chunk, responses, homing_ms)):
+                if self.metrics is not None:
+                    self.metrics.start_individual(self.generation, ind, share)
+                    homing = homed / 1000.0 if homed is not None else 0.0
+                    self.metrics.add('homing', homing)
+                    self.metrics.add('parse', parse)
+                    self.metrics.add('test', share - homing - parse)
+                    self.metrics.add_counters(before, interface.stats, i, len(chunk))
+
+                ind.aborted = False
+                if homed is None:
+                    ind.cost = float('inf')
+                    ind.history = data
+                    print(f"    Kp={ind.kp:.2f}, Ki={ind.ki:.2f}, Kd={ind.kd:.2f}: no result")
+                else:
+                    with self._phase('cost'):
+                        ind.cost = self.cost_func.evaluate(data)
+                    if self.cache is not None:
+                        self.cache.put(ind.kp, ind.ki, ind.kd, setpoint, self.home_pos, ind.cost)
+                    self._keep_history(ind, data)
+                    if self.checkpoint is not None:
+                        self.checkpoint.record(self, ind)
+                    print(f"    Kp={ind.kp:.2f}, Ki={ind.ki:.2f}, Kd={ind.kd:.2f}: Cost {ind.cost:.4f}")
+
+                if self.metrics is not None:
+                    self.metrics.end_individual(ind)
+
     def run_generation(self, interface, setpoint=600):
         print(f"\n{'='*50}")
         print(f"  GENERATION {self.generation}")
@@ -78,7 +467,254 @@ class GeneticTuner:
         for i, ind in enumerate(self.population):
             if ind.cost == float('inf'):  # Only eval if not already known (Elitism)
                 print(f"\n[{i+1}/{self.pop_size}]", end="")
+                threshold = self._abort_threshold() if self.early_abort else None
+                self.evaluate_individual(interface, ind, setpoint, threshold)
+
+        return self._evolve()
+
+    def run_generation_model(self, interface, setpoint=600, model_generations=20, confirm=3):
+        """
+        Model-assisted generation (needs self.identifier). The plant is
+        refitted on every run so far, a GA seeded with this population
+        evolves model_generations generations on the fitted model, and only
+        its `confirm` best new candidates are tested on hardware. They join
+        the measured elites, and the next generation is bred from those.
+        With a scenario plan set, the model GA scores the plan's steps too.
+        Until there are enough runs to fit, this is a normal generation.
+        """
+        if self.identifier is None:
+            raise Exception("run_generation_model needs tuner.identifier (a PlantIdentifier).")
+        if not self.identifier.ready():
+            return self.run_generation(interface, setpoint)
+
+        plant = self.identifier.fit()
+        print(f"\n{'='*50}")
+        print(f"  GENERATION {self.generation} (model)")
+        print(f"  {plant}")
+        print(f"{'='*50}")
+
+        model = GeneticTuner(self.pop_size, self.mutation_rate, rng=self.rng)
+        model.cost_func = self.cost_func
+        model.tournament_size = self.tournament_size
+        model.kp_range, model.ki_range, model.kd_range = self.kp_range, self.ki_range, self.kd_range
+        model.population = [Individual(*ind.get_genes()) for ind in self.population]
+        # Rank on the objective the candidates are confirmed with
+        model.scenario = self.scenario
+        # Homing leaves the rig near, not at, home_pos: start where tests really start
+        simulator = plant.simulator()
+        with redirect_stdout(io.StringIO()):
+            for _ in range(model_generations):
+                model.run_generation_batch(simulator, setpoint, plant.start_pos)
+            model.evaluate_population_batch(simulator, setpoint, plant.start_pos)
+        model.population.sort(key=lambda x: x.cost)
+
+        # Best model candidates not measured yet
+        measured = sorted((ind for ind in self.population if ind.cost != float('inf')),
+                          key=lambda x: x.cost)
+        known = {tuple(ind.get_genes()) for ind in measured}
+        candidates = []
+        for ind in model.population:
+            if len(candidates) == confirm:
+                break
+            if tuple(ind.get_genes()) not in known:
+                known.add(tuple(ind.get_genes()))
+                candidates.append(Individual(*ind.get_genes()))
+
+        self.population = measured[:max(2, self.pop_size - len(candidates))] + candidates
+        for i, ind in enumerate(candidates):
+            print(f"\n[confirm {i+1}/{len(candidates)}]", end="")
+            self.evaluate_individual(interface, ind, setpoint)
+
+        return self._evolve()
+
+    def run_generation_optimizer(self, optimizer, interface=None, simulator=None,
+                                 setpoint=600, home_pos=400):
+        """
+        One ask/tell round of an ai.optimizers backend (GA, CMA-ES, DE):
+        the asked gains become the population, are tested one at a time on
+        the rig through interface (or all at once on simulator), and their
+        costs are told back. Returns the best individual measured so far.
+        The optimizer's state is not checkpointed, so a tuner with a
+        checkpoint attached is refused.
+        """
+        if self.checkpoint is not None:
+            raise Exception("run_generation_optimizer cannot be resumed; detach the checkpoint.")
+        print(f"\n{'='*50}")
+        print(f"  GENERATION {self.generation} ({type(optimizer).__name__})")
+        print(f"{'='*50}")
+
+        self.population = [Individual(*genes) for genes in optimizer.ask()]
+        if simulator is not None:
+            self.evaluate_population_batch(simulator, setpoint, home_pos)
+        else:
+            for i, ind in enumerate(self.population):
+                print(f"\n[{i+1}/{len(self.population)}]", end="")
                 self.evaluate_individual(interface, ind, setpoint)
+        optimizer.tell([ind.cost for ind in self.population])
+
+        self._end_generation()
+        self.population.sort(key=lambda x: x.cost)
+        self._update_archive()
+        best = self.population[0]
+        if optimizer.best_cost < best.cost:  # Found in an earlier round
+            best = Individual(*optimizer.best_genes)
+            best.cost = optimizer.best_cost
+        print(f"\n>> Gen {self.generation} Best: Cost={best.cost:.2f} "
+              f"[P={best.kp:.2f}, I={best.ki:.2f}, D={best.kd:.2f}]")
+        self.generation += 1
+        return best
+
+    def run_generation_batch(self, simulator, setpoint=600, home_pos=400):
+        """
+        Same as run_generation, but evaluates the whole population in one
+        vectorized simulator pass instead of one hardware test at a time.
+        """
+        print(f"\n{'='*50}")
+        print(f"  GENERATION {self.generation} (batch)")
+        print(f"{'='*50}")
+
+        self.evaluate_population_batch(simulator, setpoint, home_pos)
+
+        return self._evolve()
+
+    def run_generation_device(self, interface, setpoint=600):
+        """
+        Same as run_generation, but the firmware runs the whole population
+        in queued batches (see evaluate_population_device).
+        """
+        print(f"\n{'='*50}")
+        print(f"  GENERATION {self.generation} (device batch)")
+        print(f"{'='*50}")
+
+        self.evaluate_population_device(interface, setpoint)
+
+        return self._evolve()
+
+    def run_generation_pool(self, pool, setpoint=600):
+        """
+        Same as run_generation, but spreads the hardware tests across every
+        rig in an interface.rig_pool.RigPool. Individuals whose rig failed
+        are re-tested on another rig.
+        """
+        print(f"\n{'='*50}")
+        print(f"  GENERATION {self.generation} ({len(pool.active_rigs)} rigs)")
+        print(f"{'='*50}")
+
+        def evaluate(rig, ind):
+            ind.cost = float('inf')
+            ind.history = None
+            threshold = self._abort_threshold() if self.early_abort else None
+            self.evaluate_individual(rig, ind, setpoint, threshold)
+            if rig.timed_out:
+                ind.cost = float('inf')  # Partial run, re-test elsewhere
+
+        pending = [ind for ind in self.population if ind.cost == float('inf')]
+        pool.run(pending, evaluate)
+
+        return self._evolve()
+
+    async def run_generation_async(self, interfaces, setpoint=600):
+        """
+        Same as run_generation, for interface.async_interface.AsyncMotorInterface
+        rigs, inside the caller's event loop. interfaces is one rig or a
+        list: every rig tests the next pending individual as soon as it is
+        idle, and with several rigs an individual whose rig timed out is
+        re-tested on another one (the rig sits out the rest of the
+        generation). Cancelling the task STOPs the running tests.
+        """
+        if not isinstance(interfaces, (list, tuple)):
+            interfaces = [interfaces]
+        print(f"\n{'='*50}")
+        print(f"  GENERATION {self.generation} ({len(interfaces)} rigs)")
+        print(f"{'='*50}")
+
+        pending = deque(ind for ind in self.population if ind.cost == float('inf'))
+        retry = len(interfaces) > 1
+
+        async def worker(rig):
+            while pending:
+                ind = pending.popleft()
+                print(f"\n[{self.population.index(ind) + 1}/{self.pop_size}]", end="")
+                threshold = self._abort_threshold() if self.early_abort else None
+                await self.evaluate_individual_async(rig, ind, setpoint, threshold)
+                if retry and rig.timed_out:
+                    ind.cost = float('inf')  # Partial run, re-test elsewhere
+                    ind.history = None
+                    pending.append(ind)
+                    print(f"Rig {rig.port} timed out, leaving it out of this generation.")
+                    return
+
+        await asyncio.gather(*(worker(rig) for rig in interfaces))
+        if pending:
+            raise Exception(f"All rigs failed. {len(pending)} individuals left untested.")
+
+        return self._evolve()
+
+    async def evaluate_individual_async(self, interface, individual, setpoint=600,
+                                        abort_threshold=None):
+        """evaluate_individual on an AsyncMotorInterface."""
+        print(f"  Testing PID: Kp={individual.kp:.2f}, Ki={individual.ki:.2f}, Kd={individual.kd:.2f}")
+
+        if self.metrics is None:
+            await self._run_test_async(interface, individual, setpoint, abort_threshold)
+        else:
+            self.metrics.start_individual(self.generation, individual)
+            before = dict(interface.stats)
+            cached = await self._run_test_async(interface, individual, setpoint, abort_threshold)
+            self.metrics.add_counters(before, interface.stats)
+            self.metrics.end_individual(individual, cached)
+
+        if self.checkpoint is not None and not interface.timed_out:
+            self.checkpoint.record(self, individual)
+
+    async def _run_test_async(self, interface, individual, setpoint, abort_threshold):
+        """Awaitable _run_test (single step tests only)."""
+        if self.scenario is not None:
+            raise Exception("Scenario plans are not supported on async interfaces.")
+
+        if self._lookup_cache(individual, setpoint, self.home_pos):
+            print(f"    Cost: {individual.cost:.4f} (cached)")
+            return True
+
+        with self._evaluations_lock:
+            self.evaluations += 1
+        interface.timed_out = False
+        monitor = self.cost_func.stream(abort_threshold, self.max_samples)
+        parse_before = interface.stats['parse_seconds']
+
+        if self.on_device_homing:
+            self._check_settle_mode("on_device_homing (HSTART)")
+            with self._phase('test'):
+                await interface.send_home_and_start(
+                    individual.kp, individual.ki, individual.kd, setpoint,
+                    self.home_pos, self.home_kp, self.home_tolerance, self.home_dwell_ms)
+                data = await interface.read_response(timeout=4.5, monitor=monitor)
+            if self.metrics is not None and interface.last_homing_ms is not None:
+                homing = interface.last_homing_ms / 1000.0
+                self.metrics.add('homing', homing)
+                self.metrics.add('test', -homing)
+        else:
+            with self._phase('homing'):
+                await interface.home(self.home_pos, self.home_kp, self.home_ki, self.home_kd)
+            with self._phase('settle'):
+                await asyncio.sleep(0.3)
+
+            parse_before = interface.stats['parse_seconds']
+            with self._phase('test'):
+                await interface.send_command(individual.kp, individual.ki, individual.kd, setpoint,
+                                             settle_tolerance=self.settle_tolerance,
+                                             settle_dwell_ms=self.settle_dwell_ms)
+                data = await interface.read_response(timeout=3.0, monitor=monitor)
+
+        self._score_run(interface, individual, setpoint, monitor, data, parse_before)
+        return False
+
+    def _evolve(self):
+        """
+        Sorts the evaluated population, reports the best individual and
+        breeds the next generation. Returns the best individual.
+        """
+        self._end_generation()
 
         # 2. Sort
         self.population.sort(key=lambda x: x.cost)
@@ -87,6 +723,8 @@ class GeneticTuner:
         print(f"\n>> Gen {self.generation} Best: Cost={best.cost:.2f} "
               f"[P={best.kp:.2f}, I={best.ki:.2f}, D={best.kd:.2f}]")
 
+        self._update_archive()
+
         # 3. Evolve (Selection & Crossover)
         new_pop = []
 
@@ -95,25 +733,88 @@ class GeneticTuner:
         new_pop.append(self.population[1])
 
         # Fill rest with children
-        while len(new_pop) < self.pop_size:
+        new_pop.extend(self._breed(self.pop_size - len(new_pop)))
+
+        self.population = new_pop
+        self.generation += 1
+
+        if self.checkpoint is not None:
+            self.checkpoint.save(self)
+
+        return best
+
+    def _end_generation(self):
+        # Persist the fitness cache once per generation
+        if self.cache is not None:
+            self.cache.save()
+            print(f"Fitness cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+        if self.metrics is not None:
+            self.metrics.end_generation(self.generation)
+
+    def _breed(self, count):
+        """
+        Creates count children by tournament selection, crossover and
+        mutation. With a trained surrogate, screen_factor times as many are
+        bred and only the most promising ones are kept.
+        """
+        screening = self._fit_surrogate()
+        n = count * self.screen_factor if screening else count
+
+        children = []
+        for _ in range(n):
             parent1 = self._tournament_select()
             parent2 = self._tournament_select()
             child = self._crossover(parent1, parent2)
             self._mutate(child)
-            new_pop.append(child)
+            children.append(child)
 
-        self.population = new_pop
-        self.generation += 1
+        if screening:
+            predicted = self.surrogate.predict([c.get_genes() for c in children])
+            children = [children[i] for i in predicted.argsort()[:count]]
 
-        return best
+        return children
+
+    def _update_archive(self):
+        if self.surrogate is None:
+            return
+        for ind in self.population:
+            genes = tuple(ind.get_genes())
+            if ind.cost != float('inf') and not ind.aborted and genes not in self.archive:
+                self.archive[genes] = ind.cost
+        for genes in list(self.archive)[:max(0, len(self.archive) - self.max_archive)]:
+            del self.archive[genes]
+
+    def _fit_surrogate(self):
+        """Refits the surrogate on the archive. Returns True if it can be used."""
+        if self.surrogate is None or len(self.archive) < self.min_surrogate_points:
+            return False
+        self.surrogate.fit(list(self.archive), list(self.archive.values()))
+        return True
+
+    def _abort_threshold(self):
+        """
+        Cost above which a new individual can never be picked.
+        A tournament of size k is only won by an individual that has k-1
+        worse ones, so once pop_size-k+1 fully measured individuals beat
+        it, testing it further is wasted rig time.
+        Returns None while too few costs are known.
+        """
+        measured = sorted(ind.cost for ind in self.population
+                          if ind.cost != float('inf') and not ind.aborted)
+        needed = self.pop_size - self.tournament_size + 1
+        if needed < 1 or len(measured) < needed:
+            return None
+        return measured[needed - 1]
 
-    def _tournament_select(self, k=3):
-        candidates = random.sample(self.population, min(k, len(self.population)))
+    def _tournament_select(self, k=None):
+        k = k or self.tournament_size
+        candidates = self.rng.sample(self.population, min(k, len(self.population)))
         return min(candidates, key=lambda x: x.cost)
 
     def _crossover(self, p1, p2):
         """Arithmetic crossover: weighted average of parent genes."""
-        alpha = random.random()
+        alpha = self.rng.random()
         new_kp = alpha * p1.kp + (1 - alpha) * p2.kp
         new_ki = alpha * p1.ki + (1 - alpha) * p2.ki
         new_kd = alpha * p1.kd + (1 - alpha) * p2.kd
@@ -121,12 +822,12 @@ class GeneticTuner:
 
     def _mutate(self, ind):
         """Percentage-based mutation: ±20% per gene."""
-        if random.random() < self.mutation_rate:
-            ind.kp *= random.uniform(0.8, 1.2)
-        if random.random() < self.mutation_rate:
-            ind.ki *= random.uniform(0.8, 1.2)
-        if random.random() < self.mutation_rate:
-            ind.kd *= random.uniform(0.8, 1.2)
+        if self.rng.random() < self.mutation_rate:
+            ind.kp *= self.rng.uniform(0.8, 1.2)
+        if self.rng.random() < self.mutation_rate:
+            ind.ki *= self.rng.uniform(0.8, 1.2)
+        if self.rng.random() < self.mutation_rate:
+            ind.kd *= self.rng.uniform(0.8, 1.2)
 
         # Clamp to valid ranges
         ind.kp = max(self.kp_range[0], min(self.kp_range[1], ind.kp))
@@ -0,0 +1,157 @@
+import contextvars
+import csv
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-individual record fields, in export order
+PHASES = ('homing', 'settle', 'test', 'parse', 'cost')
+COUNTERS = ('bytes_rx', 'lines_rx', 'malformed_lines', 'dropped_bytes', 'timeouts')
+FIELDS = ('generation', 'kp', 'ki', 'kd', 'cost', 'cached', 'aborted', 'total') + PHASES + COUNTERS
+
+
+class MemorySink:
+    """Keeps every record in lists (default sink)."""
+    def __init__(self):
+        self.individuals = []
+        self.generations = []
+
+    def record(self, kind, row):
+        if kind == 'individual':
+            self.individuals.append(row)
+        else:
+            self.generations.append(row)
+
+    def close(self):
+        pass
+
+
+class JSONSink:
+    """Appends one JSON object per line: {"kind": ..., **row}."""
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def record(self, kind, row):
+        self.file.write(json.dumps({'kind': kind, **row}) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CSVSink:
+    """Writes individual records to one CSV and generation summaries to another."""
+    def __init__(self, path, generations_path=None):
+        self.files = {}
+        self.writers = {}
+        self._open('individual', path)
+        if generations_path:
+            self._open('generation', generations_path)
+
+    def _open(self, kind, path):
+        f = open(path, 'w', newline='')
+        self.files[kind] = f
+        self.writers[kind] = None  # Header written on first row
+
+    def record(self, kind, row):
+        if kind not in self.files:
+            return
+        if self.writers[kind] is None:
+            self.writers[kind] = csv.DictWriter(self.files[kind], fieldnames=list(row))
+            self.writers[kind].writeheader()
+        self.writers[kind].writerow(row)
+        self.files[kind].flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class MetricsRecorder:
+    """
+    Structured timing for the tuning loop.
+    Phase timers (homing, settle, test, parse, cost) and serial counters
+    are collected per individual, summarized per generation and passed to
+    a pluggable sink (MemorySink, CSVSink, JSONSink).
+    Safe to use from RigPool worker threads and concurrent asyncio tasks
+    (run_generation_async): each thread or task has its own current record.
+    """
+    def __init__(self, sink=None):
+        self.sink = sink or MemorySink()
+        # (row, start time) of the individual being tested; a ContextVar is
+        # per thread and per asyncio task, a threading.local only per thread
+        self._current = contextvars.ContextVar('metrics_row', default=None)
+        self._lock = threading.Lock()
+        self._generation_rows = []
+
+    def start_individual(self, generation, individual, elapsed=0.0):
+        """elapsed: time already spent on the individual (its share of a batch run)."""
+        row = dict.fromkeys(FIELDS, 0)
+        row.update(generation=generation, kp=individual.kp, ki=individual.ki, kd=individual.kd,
+                   cached=False, aborted=False)
+        self._current.set((row, time.perf_counter() - elapsed))
+
+    def end_individual(self, individual, cached=False):
+        row, start = self._current.get()
+        row['total'] = time.perf_counter() - start
+        row['cost'] = float(individual.cost)
+        row['cached'] = cached
+        row['aborted'] = individual.aborted
+        self._current.set(None)
+        with self._lock:
+            self._generation_rows.append(row)
+            self.sink.record('individual', row)
+
+    def add(self, key, value):
+        current = self._current.get()
+        if current is not None:
+            current[0][key] += value
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add_counters(self, before, after, part=0, parts=1):
+        """
+        Adds the change in an interface's stats dict to the current record.
+        For a run shared by `parts` individuals, this is share `part` of
+        the change; the shares add up to the whole change.
+        """
+        for key in COUNTERS:
+            change = after.get(key, 0) - before.get(key, 0)
+            self.add(key, change * (part + 1) // parts - change * part // parts)
+
+    def end_generation(self, generation):
+        """Emits and prints a summary of the individuals tested this generation."""
+        with self._lock:
+            rows, self._generation_rows = self._generation_rows, []
+
+        tested = [r for r in rows if not r['cached']]
+        summary = {
+            'generation': generation,
+            'individuals': len(rows),
+            'tested': len(tested),
+            'cached': len(rows) - len(tested),
+            'aborted': sum(1 for r in rows if r['aborted']),
+            'total': sum(r['total'] for r in rows),
+        }
+        for key in PHASES + COUNTERS:
+            summary[key] = sum(r[key] for r in rows)
+        self.sink.record('generation', summary)
+
+        print(f"Timing (gen {generation}): {summary['tested']} tested, {summary['cached']} cached, "
+              f"{summary['total']:.2f}s total")
+        if tested:
+            phases = ", ".join(f"{p}={summary[p] / len(tested):.3f}s" for p in PHASES)
+            print(f"  per test: {phases}")
+        print(f"  serial: {summary['bytes_rx']} bytes, {summary['lines_rx']} lines, "
+              f"{summary['malformed_lines']} malformed, {summary['timeouts']} timeouts")
+        return summary
+
+    def close(self):
+        self.sink.close()
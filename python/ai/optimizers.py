@@ -0,0 +1,192 @@
+import io
+import random
+from contextlib import redirect_stdout
+import numpy as np
+from .genetic_tuner import GeneticTuner
+
+# kp_range, ki_range, kd_range of GeneticTuner
+DEFAULT_RANGES = ((0.1, 10.0), (0.0, 2.0), (0.0, 5.0))
+
+
+class AskTellOptimizer:
+    """
+    Common part of the ask/tell backends. ask() returns a batch of
+    [kp, ki, kd] gain vectors inside `ranges`; tell(costs) takes their
+    costs back in the same order (inf for a run without result). The
+    caller decides how the batch is evaluated: one test at a time on the
+    rig, or all at once on a simulator.
+    The search itself runs in the unit cube; genes are scaled to ranges.
+    """
+    def __init__(self, ranges=DEFAULT_RANGES):
+        self.ranges = tuple(tuple(r) for r in ranges)
+        self.lower = np.array([r[0] for r in self.ranges], dtype=float)
+        self.upper = np.array([r[1] for r in self.ranges], dtype=float)
+        self.evaluations = 0
+        self.best_genes = None
+        self.best_cost = float('inf')
+        self._asked = None  # Unit-cube points of the batch awaiting tell()
+
+    def ask(self):
+        if self._asked is not None:
+            raise Exception("tell() the costs of the previous batch first.")
+        self._asked = np.clip(self._ask(), 0.0, 1.0)
+        return [list(g) for g in self._genes(self._asked)]
+
+    def tell(self, costs):
+        if self._asked is None:
+            raise Exception("Nothing to tell: call ask() first.")
+        costs = np.asarray(costs, dtype=float)
+        if len(costs) != len(self._asked):
+            raise Exception(f"Expected {len(self._asked)} costs, got {len(costs)}.")
+        self.evaluations += len(costs)
+        i = int(np.argmin(costs))
+        if costs[i] < self.best_cost:
+            self.best_cost = float(costs[i])
+            self.best_genes = list(self._genes(self._asked[i:i + 1])[0])
+        asked, self._asked = self._asked, None
+        self._tell(asked, costs)
+
+    def _genes(self, unit):
+        return self.lower + unit * (self.upper - self.lower)
+
+    def _unit(self, genes):
+        return (np.asarray(genes, dtype=float) - self.lower) / (self.upper - self.lower)
+
+
+class GAOptimizer(AskTellOptimizer):
+    """
+    The GeneticTuner GA as an ask/tell backend: tournament selection,
+    arithmetic crossover, +-20% mutation and elitism, bred by an inner
+    GeneticTuner. Children outside the ranges are clipped to them.
+    """
+    def __init__(self, ranges=DEFAULT_RANGES, pop_size=20, mutation_rate=0.1, seed=None,
+                 surrogate=None):
+        super().__init__(ranges)
+        self.tuner = GeneticTuner(pop_size, mutation_rate, surrogate=surrogate,
+                                  rng=random.Random(seed))
+        self.tuner.kp_range, self.tuner.ki_range, self.tuner.kd_range = self.ranges
+        self.tuner.initialize_population()
+        self._pending = []
+
+    def _ask(self):
+        self._pending = [ind for ind in self.tuner.population if ind.cost == float('inf')]
+        for ind in self._pending:
+            genes = np.clip(ind.get_genes(), self.lower, self.upper)
+            ind.kp, ind.ki, ind.kd = (float(g) for g in genes)
+        return self._unit([ind.get_genes() for ind in self._pending])
+
+    def _tell(self, asked, costs):
+        for ind, cost in zip(self._pending, costs):
+            ind.cost = float(cost)
+        with redirect_stdout(io.StringIO()):  # _evolve reports every generation
+            self.tuner._evolve()
+
+
+class CMAESOptimizer(AskTellOptimizer):
+    """
+    CMA-ES (Hansen's (mu/mu_w, lambda) variant with rank-one and rank-mu
+    covariance updates and cumulative step-size adaptation). Samples
+    outside the unit cube are projected onto it, and the projected points
+    are used for the update.
+    popsize: lambda (default 4 + 3 ln n = 7 for three gains).
+    """
+    def __init__(self, ranges=DEFAULT_RANGES, popsize=None, sigma=0.3, seed=None):
+        super().__init__(ranges)
+        n = len(self.ranges)
+        self.rng = np.random.default_rng(seed)
+        self.lam = popsize or 4 + int(3 * np.log(n))
+        self.mu = self.lam // 2
+        w = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = w / w.sum()
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        self.mean = self.rng.uniform(0, 1, n)
+        self.sigma = sigma
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.generation = 0
+
+    def _ask(self):
+        z = self.rng.standard_normal((self.lam, len(self.mean)))
+        return self.mean + self.sigma * (z * self.D) @ self.B.T
+
+    def _tell(self, asked, costs):
+        n = len(self.mean)
+        order = np.argsort(costs, kind='stable')[:self.mu]
+        old_mean = self.mean
+        steps = (asked[order] - old_mean) / self.sigma
+        self.mean = old_mean + self.sigma * self.weights @ steps
+        y_w = self.weights @ steps
+
+        # Step-size path (in the coordinates where C is the identity)
+        inv_sqrt_c = self.B @ np.diag(1 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c @ y_w
+        self.generation += 1
+        ps_norm = np.linalg.norm(self.ps) / np.sqrt(1 - (1 - self.cs) ** (2 * self.generation))
+        hsig = ps_norm / self.chi_n < 1.4 + 2 / (n + 1)
+
+        # Covariance: rank-one (evolution path) and rank-mu updates
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+        rank_mu = (steps * self.weights[:, None]).T @ steps
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * rank_mu)
+        self.sigma = min(self.sigma * np.exp((self.cs / self.damps) * (np.linalg.norm(self.ps) / self.chi_n - 1)), 1.0)
+
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+
+class DEOptimizer(AskTellOptimizer):
+    """
+    Differential evolution (DE/rand/1/bin). Every member gets one trial
+    vector per generation and is replaced if the trial is at least as
+    good. Mutants that leave the unit cube bounce back between their
+    parent and the violated bound.
+    """
+    def __init__(self, ranges=DEFAULT_RANGES, pop_size=20, F=0.7, CR=0.9, seed=None):
+        super().__init__(ranges)
+        self.rng = np.random.default_rng(seed)
+        self.F = F
+        self.CR = CR
+        self.pop = self.rng.uniform(0, 1, (pop_size, len(self.ranges)))
+        self.costs = None  # Unknown until the initial population is told
+
+    def _ask(self):
+        if self.costs is None:
+            return self.pop
+        n, dim = self.pop.shape
+        trials = np.empty_like(self.pop)
+        for i in range(n):
+            r1, r2, r3 = self.rng.choice([j for j in range(n) if j != i], 3, replace=False)
+            mutant = self.pop[r1] + self.F * (self.pop[r2] - self.pop[r3])
+            cross = self.rng.uniform(0, 1, dim) < self.CR
+            cross[self.rng.integers(dim)] = True
+            trial = np.where(cross, mutant, self.pop[i])
+            low, high = trial < 0, trial > 1
+            trial[low] = self.pop[i][low] * self.rng.uniform(0, 1, low.sum())
+            trial[high] = self.pop[i][high] + (1 - self.pop[i][high]) * self.rng.uniform(0, 1, high.sum())
+            trials[i] = trial
+        return trials
+
+    def _tell(self, asked, costs):
+        if self.costs is None:
+            self.costs = costs.copy()
+            return
+        better = costs <= self.costs
+        self.pop[better] = asked[better]
+        self.costs[better] = costs[better]
+
+
+OPTIMIZERS = {'ga': GAOptimizer, 'cmaes': CMAESOptimizer, 'de': DEOptimizer}
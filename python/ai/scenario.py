@@ -0,0 +1,153 @@
+from itertools import permutations
+
+
+class Step:
+    """One test of a scenario: drive from home to setpoint for duration ms."""
+    def __init__(self, home, setpoint, duration=1500, weight=1.0):
+        self.home = int(home)
+        self.setpoint = int(setpoint)
+        self.duration = int(duration)
+        self.weight = float(weight)
+
+    def __repr__(self):
+        return f"Step({self.home}->{self.setpoint}, {self.duration}ms, w={self.weight})"
+
+
+class ScenarioPlan:
+    """
+    A set of weighted step tests that together score one individual.
+    compile() orders the steps so each test ends where the next begins;
+    a step only needs a homing move when the previous one ended more than
+    `tolerance` away from its home. The order minimizes the estimated plan
+    time (tests plus homing moves), exactly for up to `exact_limit` steps
+    and greedily beyond that.
+    """
+    def __init__(self, steps=None, tolerance=5, home_overhead_ms=800, ms_per_count=2.0,
+                 exact_limit=12):
+        self.steps = list(steps or [])
+        self.tolerance = tolerance
+        self.home_overhead_ms = home_overhead_ms  # Homing run + settle, whatever the distance
+        self.ms_per_count = ms_per_count  # Rough homing travel speed
+        self.exact_limit = exact_limit
+
+        self.order = None  # Compiled steps
+        self.moves = None  # True where a step needs a homing move first
+
+    @classmethod
+    def from_points(cls, points, duration=1500, weight=1.0, **kwargs):
+        """Steps between every pair of points, in both directions."""
+        plan = cls(**kwargs)
+        for a, b in permutations(points, 2):
+            plan.add_step(a, b, duration, weight)
+        return plan
+
+    def add_step(self, home, setpoint, duration=1500, weight=1.0):
+        self.steps.append(Step(home, setpoint, duration, weight))
+        self.order = None
+
+    def add_disturbance(self, position, amplitude=30, duration=1000, weight=1.0):
+        """
+        Small-signal test around position: a step out by amplitude and back.
+        The rig has no load injection, so a disturbance is modeled as a
+        short excursion the loop has to reject on its way back.
+        """
+        self.add_step(position, position + amplitude, duration, weight)
+        self.add_step(position + amplitude, position, duration, weight)
+
+    def cache_key(self):
+        """Stable integer identifying the plan (for FitnessCache keys)."""
+        steps = tuple(sorted((s.home, s.setpoint, s.duration, s.weight) for s in self.steps))
+        return hash(steps) & 0x7FFFFFFF
+
+    def move_time(self, from_pos, step):
+        """Estimated ms to get from from_pos to the step's home (0 if chained)."""
+        if from_pos is not None:
+            gap = abs(from_pos - step.home)
+            if gap <= self.tolerance:
+                return 0.0
+        else:
+            gap = 0
+        return self.home_overhead_ms + gap * self.ms_per_count
+
+    def total_time(self, order, start_pos=None):
+        """Estimated ms to run the steps in the given order."""
+        total = 0.0
+        pos = start_pos
+        for step in order:
+            total += self.move_time(pos, step) + step.duration
+            pos = step.setpoint
+        return total
+
+    def compile(self, start_pos=None):
+        """
+        Orders the steps for the shortest plan time starting from
+        start_pos (None = unknown, the first step always homes).
+        Returns the ordered steps.
+        """
+        if not self.steps:
+            raise Exception("Scenario has no steps.")
+
+        if len(self.steps) <= self.exact_limit:
+            order = self._exact_order(start_pos)
+        else:
+            order = self._greedy_order(start_pos)
+
+        self.order = order
+        self.moves = []
+        pos = start_pos
+        for step in order:
+            self.moves.append(pos is None or abs(pos - step.home) > self.tolerance)
+            pos = step.setpoint
+        return order
+
+    def _exact_order(self, start_pos):
+        # Held-Karp over subsets: best[mask][j] = time of the fastest order of
+        # the steps in mask that ends with step j
+        steps = self.steps
+        n = len(steps)
+        best = [[float('inf')] * n for _ in range(1 << n)]
+        parent = [[-1] * n for _ in range(1 << n)]
+        for j in range(n):
+            best[1 << j][j] = self.move_time(start_pos, steps[j]) + steps[j].duration
+
+        for mask in range(1, 1 << n):
+            for j in range(n):
+                cost = best[mask][j]
+                if cost == float('inf'):
+                    continue
+                end = steps[j].setpoint
+                for k in range(n):
+                    if mask & (1 << k):
+                        continue
+                    nxt = mask | (1 << k)
+                    total = cost + self.move_time(end, steps[k]) + steps[k].duration
+                    if total < best[nxt][k]:
+                        best[nxt][k] = total
+                        parent[nxt][k] = j
+
+        full = (1 << n) - 1
+        j = min(range(n), key=lambda i: best[full][i])
+        order = []
+        mask = full
+        while j >= 0:
+            order.append(steps[j])
+            mask, j = mask & ~(1 << j), parent[mask][j]
+        return order[::-1]
+
+    def _greedy_order(self, start_pos):
+        # Nearest neighbour: always take the step that is cheapest to reach
+        remaining = list(self.steps)
+        order = []
+        pos = start_pos
+        while remaining:
+            step = min(remaining, key=lambda s: self.move_time(pos, s))
+            remaining.remove(step)
+            order.append(step)
+            pos = step.setpoint
+        return order
+
+    def compiled(self, start_pos=None):
+        """Returns (steps, moves), compiling the plan on first use."""
+        if self.order is None:
+            self.compile(start_pos)
+        return self.order, self.moves
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class RBFSurrogate:
+    """
+    Cheap regression model of cost versus (kp, ki, kd).
+    Gaussian radial basis functions on gains scaled to [0, 1] by the tuner
+    ranges, fitted to log(cost) with a small ridge term. Only the ranking
+    of candidates matters, so the log keeps failed runs (1e6) from
+    swamping the fit.
+    """
+    def __init__(self, ranges, epsilon=3.0, ridge=1e-3, max_points=300):
+        self.lo = np.array([r[0] for r in ranges], dtype=float)
+        self.span = np.array([r[1] - r[0] for r in ranges], dtype=float)
+        self.span[self.span == 0] = 1.0
+        self.epsilon = epsilon
+        self.ridge = ridge
+        self.max_points = max_points
+
+        self.centers = None
+        self.weights = None
+        self.offset = 0.0
+
+    def _scale(self, genes):
+        return (np.asarray(genes, dtype=float) - self.lo) / self.span
+
+    def _kernel(self, a, b):
+        d2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-(self.epsilon ** 2) * d2)
+
+    @property
+    def ready(self):
+        return self.centers is not None
+
+    def fit(self, genes, costs):
+        """
+        genes: (N, 3) array of [kp, ki, kd]; costs: (N,) measured costs.
+        Keeps the max_points lowest-cost samples, where accuracy matters.
+        """
+        genes = np.asarray(genes, dtype=float)
+        costs = np.asarray(costs, dtype=float)
+        if len(costs) > self.max_points:
+            keep = np.argsort(costs)[:self.max_points]
+            genes, costs = genes[keep], costs[keep]
+
+        y = np.log1p(np.maximum(costs, 0.0))
+        self.offset = y.mean()
+        self.centers = self._scale(genes)
+
+        K = self._kernel(self.centers, self.centers)
+        K[np.diag_indices_from(K)] += self.ridge
+        self.weights = np.linalg.solve(K, y - self.offset)
+
+    def predict(self, genes):
+        """Predicted log-cost for an (M, 3) array of gains (lower is better)."""
+        x = self._scale(np.atleast_2d(genes))
+        return self.offset + self._kernel(x, self.centers) @ self.weights
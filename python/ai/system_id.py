@@ -0,0 +1,162 @@
+import numpy as np
+
+CONTROL_DT = 0.02  # s between samples (firmware control interval)
+
+
+class PlantFit:
+    """
+    Identified plant: the SimulatedMotor parameters (J, b, Kt) plus the
+    Motor.h deadzone and a PWM delay in control steps. rms is the
+    position residual of the fit in counts.
+    """
+    def __init__(self, J, b, Kt, deadzone, delay, rms, samples, start_pos=None):
+        self.J = J
+        self.b = b
+        self.Kt = Kt
+        self.deadzone = deadzone
+        self.delay = delay
+        self.rms = rms
+        self.samples = samples  # Trace samples the fit is based on
+        self.start_pos = start_pos  # Median first position of the traces (where tests really start)
+
+    def simulator(self):
+        """FirmwareSimulatedMotor running the fitted plant."""
+        from simulation.firmware_motor import FirmwareSimulatedMotor  # Pulls in numba; only needed here
+        return FirmwareSimulatedMotor(J=self.J, b=self.b, Kt=self.Kt,
+                                      deadzone=self.deadzone, delay=self.delay)
+
+    def __repr__(self):
+        return (f"PlantFit(J={self.J:g}, b={self.b:.4g}, Kt={self.Kt:.4g}, "
+                f"deadzone={self.deadzone}, delay={self.delay}, rms={self.rms:.2f})")
+
+
+class PlantIdentifier:
+    """
+    Least-squares plant identification from step-response traces.
+    SimulatedMotor's plant, sampled every 20 ms and driven by PWM u
+    (/255), moves as
+        omega[k+1] = a * omega[k] + dt * (Kt/J) * u[k],   a = 1 - dt*b/J
+        pos[k+1]   = pos[k] + dt * omega[k+1]
+    where u[k] is the logged output `delay` steps earlier, zeroed inside
+    the deadzone. For a given a, delay and deadzone every trace is linear
+    in Kt/J, its starting velocity and position offset, so the fit is a
+    grid search over (a, delay, deadzone) with a closed-form least-squares
+    solve at each point. Positions are fitted directly (output error), so
+    ADC quantization only adds +-1 count of noise. Only the ratios b/J
+    and Kt/J are observable from positions; J is held at the given value.
+
+    Traces are added as they arrive (GeneticTuner does this for every
+    test when tuner.identifier is set); fit() refits on the latest ones.
+    """
+    def __init__(self, J=0.001, deadzones=range(0, 81, 5), max_delay=3,
+                 max_traces=200, min_samples=150):
+        self.J = J
+        self.deadzones = list(deadzones)
+        self.max_delay = max_delay
+        self.max_traces = max_traces  # Oldest traces are dropped beyond this
+        self.min_samples = min_samples  # Samples needed before fit() is trusted
+        # Damping b/J (1/s) searched; the best is refined once on a finer grid
+        self.damping_grid = np.r_[0.0, np.geomspace(0.05, 25.0, 30)]
+        self.segments = []  # (pos, output) arrays of evenly sampled stretches
+        self._fit = None
+
+    def add(self, data):
+        """
+        Adds one trace (ResponseBuffer, TraceHandle or DataFrame). Scenario
+        runs are split where the sample times jump (homing in between).
+        """
+        if data is None or len(data) < 3:
+            return
+        time = np.asarray(data['time'], dtype=np.int64)
+        pos = np.asarray(data['pos'], dtype=float)
+        output = np.asarray(data['output'], dtype=float)
+
+        breaks = np.flatnonzero(np.abs(np.diff(time) - CONTROL_DT * 1000) > 2) + 1
+        for start, end in zip(np.r_[0, breaks], np.r_[breaks, len(time)]):
+            if end - start >= 3:
+                self.segments.append((pos[start:end], output[start:end]))
+        self.segments = self.segments[-self.max_traces:]
+        self._fit = None
+
+    @property
+    def samples(self):
+        return sum(len(pos) for pos, _ in self.segments)
+
+    def ready(self):
+        return self.samples >= self.min_samples
+
+    def fit(self):
+        """Returns the best PlantFit for the traces so far (cached until add())."""
+        if self._fit is not None:
+            return self._fit
+        if not self.segments:
+            raise Exception("No traces to identify the plant from.")
+
+        # Pad the traces to (S, T); mask marks real samples
+        t = max(len(pos) for pos, _ in self.segments)
+        pos = np.zeros((len(self.segments), t))
+        output = np.zeros((len(self.segments), t))
+        mask = np.zeros((len(self.segments), t), dtype=bool)
+        for i, (p, o) in enumerate(self.segments):
+            pos[i, :len(p)], output[i, :len(o)], mask[i, :len(p)] = p, o, True
+
+        # Motor input for every (delay, deadzone) candidate: (V, S, T)
+        variants, inputs = [], []
+        for delay in range(self.max_delay + 1):
+            lagged = np.zeros_like(output)
+            lagged[:, delay:] = output[:, :t - delay]
+            for deadzone in self.deadzones:
+                variants.append((delay, deadzone))
+                inputs.append(np.where((np.abs(lagged) < deadzone) & (lagged != 0), 0.0, lagged) / 255.0)
+        inputs = np.array(inputs)
+
+        best = None
+        grid = self.damping_grid
+        for _ in range(2):
+            for damping in grid:
+                sse, gain = self._solve(1.0 - CONTROL_DT * damping, inputs, pos, mask)
+                v = int(np.argmin(sse))
+                if best is None or sse[v] < best[0]:
+                    best = (sse[v], damping, gain[v], variants[v])
+            # Refine between the neighbours of the best damping
+            i = int(np.searchsorted(grid, best[1]))
+            grid = np.linspace(grid[max(i - 1, 0)], grid[min(i + 1, len(grid) - 1)], 21)
+
+        sse, damping, gain, (delay, deadzone) = best
+        rows = int(mask.sum())
+        start_pos = float(np.median([p[0] for p, _ in self.segments]))
+        self._fit = PlantFit(self.J, damping * self.J, gain * self.J, deadzone, delay,
+                             float(np.sqrt(max(sse, 0.0) / rows)), rows, start_pos)
+        return self._fit
+
+    @staticmethod
+    def _solve(a, inputs, pos, mask):
+        """
+        Least squares for one pole a: per trace, position offset and
+        starting velocity are projected out; the shared gain Kt/J is then
+        solved in closed form for every input variant.
+        Returns (sse, gain) arrays over the variants.
+        """
+        t = pos.shape[1]
+        g = np.r_[0.0, np.cumsum(a ** np.arange(t - 1))]  # g[n] = 1 + a + ... + a^(n-1)
+        # Response to unit gain: r[k] = dt^2 * sum_{j<k} g[k-j] u[j]
+        lag = np.arange(t)[None, :] - np.arange(t)[:, None]
+        toeplitz = np.where(lag > 0, g[np.clip(lag, 0, t - 1)], 0.0)
+        response = (inputs @ toeplitz) * CONTROL_DT ** 2
+
+        # Per-trace basis: offset and starting velocity (dt * a * g[k])
+        basis = np.stack([np.ones(t), CONTROL_DT * a * g], axis=1)  # (T, 2)
+        zm = mask[:, :, None] * basis  # (S, T, 2)
+        gram_inv = np.linalg.pinv(np.einsum('stb,stc->sbc', zm, zm))
+
+        def residual(y):
+            coef = np.einsum('...st,stb->...sb', y * mask, zm)
+            coef = np.einsum('...sb,sbc->...sc', coef, gram_inv)
+            return (y - coef @ basis.T) * mask
+
+        y = residual(pos)
+        r = residual(response)
+        num = np.einsum('vst,st->v', r, y)
+        den = np.maximum(np.einsum('vst,vst->v', r, r), 1e-12)
+        sse = np.sum(y * y) - num * num / den
+        return sse, num / den
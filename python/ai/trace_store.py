@@ -0,0 +1,128 @@
+import os
+import threading
+import numpy as np
+
+# Index record per stored trace; offset/length locate it in the data file
+INDEX_DTYPE = np.dtype([
+    ('generation', '<i4'),
+    ('individual', '<i4'),
+    ('kp', '<f8'),
+    ('ki', '<f8'),
+    ('kd', '<f8'),
+    ('cost', '<f8'),
+    ('aborted', 'u1'),
+    ('offset', '<i8'),  # Byte offset of the trace in traces.bin
+    ('length', '<i4'),  # Samples
+])
+SAMPLE_DTYPE = np.dtype('<i4')
+COLUMNS = ('time', 'pos', 'setpoint', 'output')
+
+
+class TraceStore:
+    """
+    Append-only on-disk archive of every response trace.
+    traces.bin holds each trace as four fixed-width int32 columns back to
+    back (time, pos, setpoint, output); index.bin holds one INDEX_DTYPE
+    record per trace. Both are only ever appended to, and read back
+    through numpy.memmap, so memory use does not grow with the number of
+    runs. The data is written before its index record: after a crash the
+    index only lists complete traces.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.data_path = os.path.join(path, 'traces.bin')
+        self.index_path = os.path.join(path, 'index.bin')
+
+        # Drop a partly written index record left by a crash
+        if os.path.exists(self.index_path):
+            size = os.path.getsize(self.index_path)
+            if size % INDEX_DTYPE.itemsize:
+                with open(self.index_path, 'r+b') as f:
+                    f.truncate(size - size % INDEX_DTYPE.itemsize)
+
+        self._data = open(self.data_path, 'ab')
+        self._index = open(self.index_path, 'ab')
+        self._lock = threading.Lock()
+        self._map = None  # Read-only memmap of traces.bin, remapped as it grows
+
+    def append(self, generation, individual, ind, data):
+        """
+        Stores one run (a ResponseBuffer or anything with the four columns)
+        together with the individual's gains and cost.
+        Returns a TraceHandle that reads the trace back lazily.
+        """
+        n = len(data)
+        block = np.empty((len(COLUMNS), n), dtype=SAMPLE_DTYPE)
+        for row, col in enumerate(COLUMNS):
+            block[row] = data[col] if n else []
+
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record[0] = (generation, individual, ind.kp, ind.ki, ind.kd, ind.cost,
+                     ind.aborted, 0, n)
+
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(block.tobytes())
+            self._data.flush()
+            record['offset'] = offset
+            self._index.write(record.tobytes())
+            self._index.flush()
+        return TraceHandle(self, offset, n)
+
+    def __len__(self):
+        return os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize
+
+    def entries(self):
+        """Every index record, as a read-only structured memmap."""
+        if len(self) == 0:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.memmap(self.index_path, dtype=INDEX_DTYPE, mode='r', shape=(len(self),))
+
+    def trace(self, i):
+        """Handle to the i-th stored trace."""
+        entry = self.entries()[i]
+        return TraceHandle(self, int(entry['offset']), int(entry['length']))
+
+    def _read(self, offset, length):
+        """(4, length) int32 view of a stored trace."""
+        end = offset + len(COLUMNS) * length * SAMPLE_DTYPE.itemsize
+        with self._lock:
+            if self._map is None or len(self._map) < end:
+                self._map = np.memmap(self.data_path, dtype=np.uint8, mode='r')
+            raw = self._map[offset:end]
+        return raw.view(SAMPLE_DTYPE).reshape(len(COLUMNS), length)
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+        self._map = None
+
+
+class TraceHandle:
+    """
+    Lazy stand-in for a ResponseBuffer kept in a TraceStore. Columns are
+    read from the memory-mapped file on access; nothing is held in RAM.
+    """
+    COLUMNS = COLUMNS
+
+    def __init__(self, store, offset, length):
+        self.store = store
+        self.offset = offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def empty(self):
+        return self.length == 0
+
+    def __getitem__(self, column):
+        if self.length == 0:
+            return np.zeros(0, dtype=SAMPLE_DTYPE)
+        return self.store._read(self.offset, self.length)[COLUMNS.index(column)]
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({col: np.array(self[col]) for col in COLUMNS})
@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 from interface.motor_interface import MotorInterface
 
 
@@ -28,9 +27,10 @@ def test_connection():
             return
 
         print(f"Received {len(df)} data points.")
-        print(df.head())
+        print(df.to_dataframe().head())
 
-        # 5. Plot
+        # 5. Plot (matplotlib is slow to import; only load it now)
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(10, 6))
         plt.plot(df['time'], df['setpoint'], 'r--', label='Setpoint')
         plt.plot(df['time'], df['pos'], 'b-', label='Position')
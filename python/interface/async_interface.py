@@ -0,0 +1,346 @@
+import asyncio
+import time
+import serial
+from .motor_interface import PORT_CACHE, load_port, save_port, find_arduino
+from .telemetry import (decode_frames, FRAME_SAMPLE, FRAME_DONE, FRAME_HOMED,
+                        FRAME_SETTLED, FRAME_SIZE, ERROR_PREFIX)
+from .response_buffer import ResponseBuffer
+
+
+async def open_serial_connection(url, baudrate):
+    """Opens a real port as an asyncio (StreamReader, StreamWriter) pair."""
+    import serial_asyncio  # pyserial-asyncio, only needed for real rigs
+    return await serial_asyncio.open_serial_connection(url=url, baudrate=baudrate)
+
+
+class AsyncMotorInterface:
+    """
+    asyncio counterpart of MotorInterface: every exchange with the
+    firmware is a coroutine, and waiting for data yields to the event loop
+    instead of blocking a thread, so one loop can drive several rigs next
+    to other work. Reads take a timeout like MotorInterface. Cancelling a
+    read (task.cancel(), asyncio.wait_for) STOPs the running test; the
+    leftovers up to STOPPED are skipped before the next command.
+    Real ports are opened with pyserial-asyncio (pip install
+    pyserial-asyncio). open_connection can be any coroutine
+    (url, baudrate) -> (reader, writer), e.g. tests' AsyncMockSerial.
+    One coroutine at a time may use an interface.
+    """
+    def __init__(self, baud_rate=115200, rig='default', port_cache=PORT_CACHE,
+                 open_connection=None):
+        self.baud_rate = baud_rate
+        self.port = None
+        self.rig = rig  # Key into port_cache
+        self.port_cache = port_cache  # None disables the cache
+        self.open_connection = open_connection or open_serial_connection
+        self.ready_timeout = 3.0  # Longest wait for the READY banner after opening
+        self.reader = None
+        self.writer = None
+        self.timed_out = False  # Set when read_response gives up waiting
+        self.last_homing_ms = None  # Homing time reported by the last HSTART
+        self.binary = False  # Telemetry arrives as binary frames (see telemetry.py)
+        # Cumulative receive counters (read by ai.metrics)
+        self.stats = {'bytes_rx': 0, 'lines_rx': 0, 'malformed_lines': 0,
+                      'dropped_bytes': 0, 'timeouts': 0, 'parse_seconds': 0.0}
+        self._buf = bytearray()  # Received bytes not consumed yet
+        self._stopping = False  # A cancelled test was STOPped; its output is still arriving
+
+    async def connect(self, port=None):
+        """
+        Connects to the Arduino, like MotorInterface.connect: the given
+        port, else the one this rig was last found on, else auto-detected.
+        Returns as soon as the firmware has printed READY.
+        """
+        self.writer = None
+        if port:
+            self.port = port
+        else:
+            self.port = load_port(self.port_cache, self.rig)
+            if self.port:
+                try:
+                    await self._open()
+                except (serial.SerialException, OSError):
+                    print(f"{self.port} is not available, searching...")
+            if self.writer is None:
+                self.port = find_arduino()
+                if not self.port:
+                    raise Exception("Arduino not found. Please specify port manually.")
+                await self._open()
+                save_port(self.port_cache, self.rig, self.port)
+
+        if self.writer is None:
+            await self._open()
+
+        if not await self._skip_until(b"READY", self.ready_timeout):
+            print("Warning: no READY from the firmware (board without auto-reset?)")
+        self._buf.clear()  # Startup garbage
+        print("Connected.")
+
+    async def _open(self):
+        print(f"Connecting to {self.port}...")
+        self.reader, self.writer = await self.open_connection(url=self.port, baudrate=self.baud_rate)
+        self._buf.clear()
+        self._stopping = False
+
+    @property
+    def is_open(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def send_command(self, kp, ki, kd, setpoint, duration_ms=None, settle_tolerance=None,
+                           settle_dwell_ms=200):
+        """Sends the START command (arguments as in MotorInterface.send_command)."""
+        cmd = f"START:{kp},{ki},{kd},{setpoint}"
+        if settle_tolerance is not None:
+            cmd += f",{int(duration_ms or 1500)},{settle_tolerance},{int(settle_dwell_ms)}"
+        elif duration_ms is not None:
+            cmd += f",{int(duration_ms)}"
+        await self._send(cmd)
+
+    async def send_home_and_start(self, kp, ki, kd, setpoint, home_pos, home_kp=1.0,
+                                  tolerance=5, dwell_ms=100):
+        """Sends the combined HSTART command; read_response then reads the test."""
+        self.last_homing_ms = None
+        await self._send(f"HSTART:{kp},{ki},{kd},{setpoint},{home_pos},{home_kp},{tolerance},{dwell_ms}")
+
+    async def home(self, home_pos, kp=1.0, ki=0.0, kd=0.0, timeout=3.0):
+        """
+        Drives the motor to home_pos with a START run on the given (weak)
+        gains and waits for its DONE. Returns the run's ResponseBuffer.
+        """
+        await self.send_command(kp, ki, kd, home_pos)
+        return await self.read_response(timeout=timeout)
+
+    async def set_binary_mode(self, enabled=True, timeout=1.0):
+        """
+        Negotiates the telemetry format (MODE:BIN / MODE:ASCII), falling
+        back to ASCII without an acknowledgement. Returns True if the
+        requested mode is active.
+        """
+        mode = "BIN" if enabled else "ASCII"
+        await self._send(f"MODE:{mode}")
+        if await self._skip_until(f"MODE:{mode}".encode(), timeout):
+            self.binary = enabled
+            return True
+        print(f"Firmware did not acknowledge MODE:{mode}, using ASCII.")
+        self.binary = False
+        return not enabled
+
+    async def stop(self):
+        """Sends STOP command."""
+        if self.is_open:
+            self.writer.write(b"STOP\n")
+            await self.writer.drain()
+            print("Sent: STOP")
+
+    async def read_response(self, timeout=None, monitor=None):
+        """
+        Reads the test until DONE, like MotorInterface.read_response.
+        Returns a ResponseBuffer; sets timed_out if DONE has not arrived
+        `timeout` seconds after the call, even while samples are still
+        coming in. A monitor that asks to abort STOPs the test.
+        """
+        if not self.is_open:
+            raise Exception("Not connected.")
+        deadline = self._deadline(timeout)
+        print("Waiting for data stream...")
+        try:
+            if self.binary:
+                return await self._read_binary_response(deadline, monitor)
+            return await self._read_ascii_response(deadline, monitor)
+        except asyncio.CancelledError:
+            # The firmware keeps streaming otherwise; let the next command skip the rest
+            if self.is_open:
+                self.writer.write(b"STOP\n")
+                print("Sent: STOP (cancelled)")
+                self._stopping = True
+            raise
+
+    async def _read_ascii_response(self, deadline, monitor):
+        data = ResponseBuffer()
+        stats = self.stats
+        while True:
+            raw = await self._readline(deadline)
+            if not raw:
+                print("Timeout waiting for data.")
+                self.timed_out = True
+                stats['timeouts'] += 1
+                break
+            parse_start = time.perf_counter()
+            stats['bytes_rx'] += len(raw)
+            try:
+                line = raw.decode('utf-8').strip()
+            except UnicodeDecodeError:
+                stats['malformed_lines'] += 1
+                continue
+            if not line:
+                continue
+            stats['lines_rx'] += 1
+
+            if line == "DONE":
+                print("Test Complete.")
+                break
+            if line.startswith("ERROR"):
+                print(f"Firmware Error: {line}")
+                break
+
+            if line.startswith("HOMED:") or line.startswith("SETTLED:"):
+                tag, _, value = line.partition(':')
+                try:
+                    if tag == "HOMED":
+                        self.last_homing_ms = int(value)
+                    else:
+                        data.settled_ms = int(value)
+                except ValueError:
+                    stats['malformed_lines'] += 1
+                continue
+
+            parts = line.split(',')
+            if len(parts) != 4:
+                stats['malformed_lines'] += 1
+                continue
+            try:
+                sample = (int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]))
+            except ValueError:
+                stats['malformed_lines'] += 1
+                continue
+            data.append(*sample)
+
+            if monitor:
+                monitor.update(sample[0], sample[1], sample[2])
+                if monitor.should_abort():
+                    await self._abort_test()
+                    break
+            stats['parse_seconds'] += time.perf_counter() - parse_start
+
+        return data
+
+    async def _read_binary_response(self, deadline, monitor):
+        data = ResponseBuffer()
+        while True:
+            chunk = await self._read_chunk(deadline)
+            if not chunk:
+                print("Timeout waiting for data.")
+                self.timed_out = True
+                self.stats['timeouts'] += 1
+                break
+
+            parse_start = time.perf_counter()
+            self.stats['bytes_rx'] += len(chunk)
+            self._buf += chunk
+            error_at = self._buf.find(ERROR_PREFIX)
+            if error_at >= 0:
+                # Text reply to a rejected command
+                del self._buf[:error_at]
+                line = await self._readline(self._deadline(1.0))
+                print(f"Firmware Error: {line.decode('ascii', errors='replace').strip()}")
+                break
+            frames, consumed = decode_frames(self._buf)
+            del self._buf[:consumed]
+            self.stats['lines_rx'] += len(frames)
+            self.stats['dropped_bytes'] += consumed - len(frames) * FRAME_SIZE
+            self.stats['parse_seconds'] += time.perf_counter() - parse_start
+            if not len(frames):
+                continue
+
+            homed = frames[frames['type'] == FRAME_HOMED]
+            if len(homed):
+                self.last_homing_ms = int(homed['time'][0])
+            settled = frames[frames['type'] == FRAME_SETTLED]
+            if len(settled):
+                data.settled_ms = int(settled['time'][0])
+
+            done = frames['type'] == FRAME_DONE
+            finished = done.any()
+            if finished:
+                frames = frames[:int(done.argmax())]
+
+            frames = frames[frames['type'] == FRAME_SAMPLE]
+            data.extend(frames['time'], frames['pos'], frames['setpoint'], frames['output'])
+
+            if monitor:
+                monitor.extend(frames['time'], frames['pos'], frames['setpoint'])
+                if not finished and monitor.should_abort():
+                    await self._abort_test()
+                    break
+
+            if finished:
+                print("Test Complete.")
+                break
+
+        return data
+
+    async def _abort_test(self, timeout=1.0):
+        print("Aborting test early.")
+        await self.stop()
+        if not await self._skip_until(b"STOPPED", timeout):
+            print("Timeout waiting for STOPPED.")
+
+    async def _send(self, cmd):
+        if not self.is_open:
+            raise Exception("Not connected.")
+        if self._stopping:
+            # Output of a cancelled test ends with the STOPPED it was sent
+            await self._skip_until(b"STOPPED", 1.0)
+            self._stopping = False
+        self.writer.write(f"{cmd}\n".encode())
+        await self.writer.drain()
+        print(f"Sent: {cmd}")
+
+    def _deadline(self, timeout):
+        """Event loop time a read gives up at (None = wait indefinitely)."""
+        if not timeout:
+            return None
+        return asyncio.get_running_loop().time() + timeout
+
+    async def _read_chunk(self, deadline):
+        """Whatever arrived next, or b"" once the deadline has passed."""
+        if deadline is None:
+            chunk = await self.reader.read(4096)
+        else:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return b""
+            try:
+                chunk = await asyncio.wait_for(self.reader.read(4096), remaining)
+            except asyncio.TimeoutError:
+                return b""
+        if not chunk:
+            raise Exception("Connection closed.")
+        return chunk
+
+    async def _readline(self, deadline):
+        """Next complete line (with newline), or b"" once the deadline has passed."""
+        while True:
+            end = self._buf.find(b"\n")
+            if end >= 0:
+                line = bytes(self._buf[:end + 1])
+                del self._buf[:end + 1]
+                return line
+            chunk = await self._read_chunk(deadline)
+            if not chunk:
+                return b""
+            self._buf += chunk
+
+    async def _skip_until(self, marker, timeout):
+        """
+        Discards input up to and including the line containing marker.
+        Returns False (with the input discarded) if it did not arrive in time.
+        """
+        deadline = self._deadline(timeout)
+        while True:
+            start = self._buf.find(marker)
+            end = self._buf.find(b"\n", start) if start >= 0 else -1
+            if end >= 0:
+                del self._buf[:end + 1]
+                return True
+            chunk = await self._read_chunk(deadline)
+            if not chunk:
+                self._buf.clear()
+                return False
+            self._buf += chunk
+
+    async def close(self):
+        if self.is_open:
+            self.writer.close()
+            await self.writer.wait_closed()
+            print("Connection closed.")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Live view of a running tuning session.
+
+The tuner sends one UDP datagram per generation (LivePublisher); this
+viewer draws the convergence curve and the best trace from them in its
+own process. Sending never blocks and needs no listener, so the tuner
+runs at full speed whether a viewer is open or not.
+
+Usage:
+    cd python/
+    python3 -m interface.live_view --port 5760
+"""
+import argparse
+import json
+import socket
+
+DEFAULT_ADDRESS = ('127.0.0.1', 5760)
+MAX_DATAGRAM = 60000  # Stay below the 64 KB UDP limit
+MAX_HISTORY = 1000  # Generations resent with every update (late viewers get the curve)
+
+
+class LivePublisher:
+    """
+    Fire-and-forget sender for LiveViewer. Every message carries the whole
+    convergence history, so a viewer started late (or a lost datagram)
+    costs nothing.
+    """
+    def __init__(self, address=DEFAULT_ADDRESS, max_points=2000):
+        self.address = address
+        self.max_points = max_points  # Longer traces are decimated
+        self.history = []  # [generation, evaluations, best cost]
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def publish(self, generation, best, evaluations=0):
+        """Sends the best individual of a finished generation."""
+        self.history.append([generation, evaluations, best.cost])
+        self.history = self.history[-MAX_HISTORY:]
+
+        message = {
+            'generation': generation,
+            'evaluations': evaluations,
+            'cost': best.cost,
+            'gains': best.get_genes(),
+            'history': self.history,
+            'trace': self._trace(best.history),
+        }
+        data = json.dumps(message).encode()
+        if len(data) > MAX_DATAGRAM:
+            message['trace'] = None
+            data = json.dumps(message).encode()
+        try:
+            self.sock.sendto(data, self.address)
+        except OSError:
+            pass  # Nobody listening or buffer full: the next update will do
+
+    def _trace(self, history):
+        if history is None or len(history) == 0:
+            return None
+        step = max(1, -(-len(history) // self.max_points))
+        return {col: [int(v) for v in history[col][::step]] for col in ('time', 'pos', 'setpoint')}
+
+    def close(self):
+        self.sock.close()
+
+
+class LiveViewer:
+    """
+    Receives LivePublisher updates. poll() drains the socket without
+    blocking and keeps the latest state; show() draws it with matplotlib.
+    """
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(address)
+        self.sock.setblocking(False)
+        self.latest = None
+
+    def poll(self):
+        """Reads every pending update. Returns True if something new arrived."""
+        updated = False
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return updated
+            try:
+                self.latest = json.loads(data)
+                updated = True
+            except ValueError:
+                continue
+
+    def show(self, interval_ms=500):
+        import matplotlib.pyplot as plt
+        from matplotlib.animation import FuncAnimation
+
+        fig, (ax_cost, ax_trace) = plt.subplots(1, 2, figsize=(12, 4))
+        cost_line, = ax_cost.plot([], [], 'b.-')
+        ax_cost.set_xlabel('Generation')
+        ax_cost.set_ylabel('Best cost')
+        ax_cost.grid(True)
+        target_line, = ax_trace.plot([], [], 'r--', label='Target')
+        pos_line, = ax_trace.plot([], [], 'b-', label='Best Response')
+        ax_trace.set_xlabel('Time (ms)')
+        ax_trace.set_ylabel('Position')
+        ax_trace.legend()
+        ax_trace.grid(True)
+        ax_trace.set_title('Waiting for the tuner...')
+
+        def update(_):
+            if not self.poll():
+                return
+            msg = self.latest
+            history = msg['history']
+            cost_line.set_data([h[0] for h in history], [h[2] for h in history])
+            ax_cost.relim()
+            ax_cost.autoscale_view()
+            ax_cost.set_title(f"{msg['evaluations']} evaluations")
+
+            trace = msg['trace']
+            if trace:
+                target_line.set_data(trace['time'], trace['setpoint'])
+                pos_line.set_data(trace['time'], trace['pos'])
+                ax_trace.relim()
+                ax_trace.autoscale_view()
+            kp, ki, kd = msg['gains']
+            ax_trace.set_title(f"Gen {msg['generation']} Best: Cost={msg['cost']:.1f} "
+                               f"(P={kp:.2f}, I={ki:.2f}, D={kd:.2f})")
+
+        self._animation = FuncAnimation(fig, update, interval=interval_ms, cache_frame_data=False)
+        plt.show()
+
+    def close(self):
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live view of a running tuning session.")
+    parser.add_argument('--host', default=DEFAULT_ADDRESS[0])
+    parser.add_argument('--port', type=int, default=DEFAULT_ADDRESS[1])
+    args = parser.parse_args()
+
+    viewer = LiveViewer((args.host, args.port))
+    try:
+        viewer.show()
+    finally:
+        viewer.close()
+
+
+if __name__ == "__main__":
+    main()
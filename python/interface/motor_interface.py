@@ -1,61 +1,383 @@
+import json
+import os
 import serial
-import serial.tools.list_ports
 import time
-import pandas as pd
+from .telemetry import (decode_frames, FRAME_SAMPLE, FRAME_DONE, FRAME_HOMED,
+                        FRAME_BEGIN, FRAME_END, FRAME_SETTLED, FRAME_SIZE, ERROR_PREFIX)
+from .response_buffer import ResponseBuffer
+from .serial_reader import SerialReader
+from .serial_recording import RecordingSerial
+
+# Last auto-detected port of every rig, so a restart skips the port scan
+PORT_CACHE = os.path.join(os.path.expanduser('~'), '.pid_tuner_ports.json')
+
+
+def load_port(port_cache, rig):
+    """Port the rig was last auto-detected on, or None."""
+    if port_cache is None:
+        return None
+    try:
+        with open(port_cache) as f:
+            return json.load(f).get(rig)
+    except (OSError, ValueError):
+        return None
+
+
+def save_port(port_cache, rig, port):
+    if port_cache is None:
+        return
+    try:
+        with open(port_cache) as f:
+            ports = json.load(f)
+    except (OSError, ValueError):
+        ports = {}
+    if ports.get(rig) == port:
+        return
+    ports[rig] = port
+    try:
+        tmp_path = port_cache + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(ports, f)
+        os.replace(tmp_path, port_cache)
+    except OSError:
+        pass  # Read-only home: just scan again next time
+
+
+def find_arduino():
+    """
+    Auto-detects a likely Arduino port.
+    """
+    import serial.tools.list_ports  # Only needed when scanning
+    ports = list(serial.tools.list_ports.comports())
+    for p in ports:
+        # Common descriptions for Arduino/USB-Serial chips
+        if "Arduino" in p.description or "CH340" in p.description or "CP210x" in p.description or "USB Serial" in p.description:
+            return p.device
+
+    # If we found nothing but there is only one port, try it
+    if len(ports) == 1:
+        return ports[0].device
+
+    return None
+
 
 class MotorInterface:
-    def __init__(self, baud_rate=115200, timeout=2):
+    def __init__(self, baud_rate=115200, timeout=2, threaded=True, rig='default',
+                 port_cache=PORT_CACHE):
         self.baud_rate = baud_rate
         self.timeout = timeout
         self.ser = None
         self.port = None
+        self.rig = rig  # Key into port_cache
+        self.port_cache = port_cache  # None disables the cache
+        self.ready_timeout = 3.0  # Longest wait for the READY banner after opening
+        self.threaded = threaded  # Drain the port with a background SerialReader
+        self.open_port = None  # Replaces serial.Serial(port, baud_rate, timeout=), e.g. ReplaySerial
+        self.record = None  # Optional path: every byte of the session is logged there (RecordingSerial)
+        self.reader = None
+        self.timed_out = False  # Set when read_response gives up waiting
+        self.last_homing_ms = None  # Homing time reported by the last HSTART
+        self.max_batch = 32  # MAX_BATCH in the firmware (QADD queue size)
+        self.binary = False  # Telemetry arrives as binary frames (see telemetry.py)
+        # Cumulative receive counters (read by ai.metrics)
+        self.stats = {'bytes_rx': 0, 'lines_rx': 0, 'malformed_lines': 0,
+                      'dropped_bytes': 0, 'timeouts': 0, 'parse_seconds': 0.0}
 
     def connect(self, port=None):
         """
-        Connects to the Arduino. If port is None, tries to auto-detect.
+        Connects to the Arduino. If port is None, tries the port this rig
+        was last found on, then auto-detects (and remembers the result).
+        Returns as soon as the firmware has printed READY after its reset.
         """
+        self.ser = None
         if port:
             self.port = port
         else:
-            self.port = self._find_arduino()
-            if not self.port:
-                raise Exception("Arduino not found. Please specify port manually.")
-        
-        print(f"Connecting to {self.port}...")
-        self.ser = serial.Serial(self.port, self.baud_rate, timeout=self.timeout)
-        time.sleep(2) # Wait for Arduino reset
-        
+            self.port = self._cached_port()
+            if self.port:
+                try:
+                    self._open()
+                except (serial.SerialException, OSError):
+                    print(f"{self.port} is not available, searching...")
+            if self.ser is None:
+                self.port = self._find_arduino()
+                if not self.port:
+                    raise Exception("Arduino not found. Please specify port manually.")
+                self._open()
+                self._save_port()
+
+        if self.ser is None:
+            self._open()
+
+        if not self._wait_for_ready(self.ready_timeout):
+            print("Warning: no READY from the firmware (board without auto-reset?)")
+
         # Flush any startup garbage
         self.ser.reset_input_buffer()
+        if self.threaded:
+            self.reader = SerialReader(self.ser)
         print("Connected.")
 
-    def _find_arduino(self):
+    def _open(self):
+        print(f"Connecting to {self.port}...")
+        open_port = self.open_port or serial.Serial
+        self.ser = open_port(self.port, self.baud_rate, timeout=self.timeout)
+        if self.record:
+            self.ser = RecordingSerial(self.ser, self.record)
+
+    def _wait_for_ready(self, deadline_s):
         """
-        Auto-detects a likely Arduino port.
+        Opening the port resets the Arduino; setup() prints READY once the
+        firmware runs. Waits for that line instead of a fixed sleep.
+        Returns False if it did not arrive within deadline_s.
         """
-        ports = list(serial.tools.list_ports.comports())
-        for p in ports:
-            # Common descriptions for Arduino/USB-Serial chips
-            if "Arduino" in p.description or "CH340" in p.description or "CP210x" in p.description or "USB Serial" in p.description:
-                return p.device
-        
-        # If we found nothing but there is only one port, try it
-        if len(ports) == 1:
-            return ports[0].device
-            
-        return None
+        deadline = time.monotonic() + deadline_s
+        timeout = self.ser.timeout
+        self.ser.timeout = 0.05
+        try:
+            while time.monotonic() < deadline:
+                if self.ser.readline().strip() == b"READY":
+                    return True
+            return False
+        finally:
+            self.ser.timeout = timeout
+
+    def _cached_port(self):
+        return load_port(self.port_cache, self.rig)
+
+    def _save_port(self):
+        save_port(self.port_cache, self.rig, self.port)
 
-    def send_command(self, kp, ki, kd, setpoint):
+    def _find_arduino(self):
+        return find_arduino()
+
+    def send_command(self, kp, ki, kd, setpoint, duration_ms=None, settle_tolerance=None,
+                     settle_dwell_ms=200):
         """
         Sends the START command to the firmware.
+        duration_ms: optional test length (firmware default 1500 ms).
+        settle_tolerance: optional band (counts) for settle detection; the
+        test then ends early with SETTLED once the position has stayed
+        inside it for settle_dwell_ms.
         """
         if not self.ser or not self.ser.is_open:
             raise Exception("Not connected.")
             
-        cmd = f"START:{kp},{ki},{kd},{setpoint}\n"
+        cmd = f"START:{kp},{ki},{kd},{setpoint}"
+        if settle_tolerance is not None:
+            cmd += f",{int(duration_ms or 1500)},{settle_tolerance},{int(settle_dwell_ms)}"
+        elif duration_ms is not None:
+            cmd += f",{int(duration_ms)}"
+        cmd += "\n"
+        self.ser.write(cmd.encode())
+        print(f"Sent: {cmd.strip()}")
+
+    def send_home_and_start(self, kp, ki, kd, setpoint, home_pos, home_kp=1.0,
+                            tolerance=5, dwell_ms=100):
+        """
+        Sends the combined HSTART command: the firmware homes to home_pos with
+        a P-only loop, ends homing once the position stays within tolerance for
+        dwell_ms (or after its homing timeout), reports HOMED:<ms> and starts
+        the test right away. read_response then reads the test as usual.
+        """
+        if not self.ser or not self.ser.is_open:
+            raise Exception("Not connected.")
+
+        self.last_homing_ms = None
+        cmd = f"HSTART:{kp},{ki},{kd},{setpoint},{home_pos},{home_kp},{tolerance},{dwell_ms}\n"
+        self.ser.write(cmd.encode())
+        print(f"Sent: {cmd.strip()}")
+
+    def run_batch(self, gain_sets, setpoint, home_pos, home_kp=1.0, tolerance=5,
+                  dwell_ms=100, timeout=None):
+        """
+        On-device batch evaluation: uploads the (kp, ki, kd) sets with QADD,
+        then QRUN homes and tests each one back-to-back on the firmware.
+        Results come back tagged (BEGIN:<i> ... END:<i>) and are split per set.
+        Returns (responses, homing_ms): a ResponseBuffer and homing time for
+        every gain set, in order. Sets whose END never arrived get an empty
+        buffer and None.
+        """
+        if not self.ser or not self.ser.is_open:
+            raise Exception("Not connected.")
+        if len(gain_sets) > self.max_batch:
+            raise Exception(f"Batch of {len(gain_sets)} exceeds firmware queue ({self.max_batch}).")
+
+        # Upload, one acknowledged line at a time
+        self._reset_input()
+        self._command_with_ack("QCLEAR", "QUEUED:0")
+        for i, (kp, ki, kd) in enumerate(gain_sets):
+            self._command_with_ack(f"QADD:{kp},{ki},{kd}", f"QUEUED:{i + 1}")
+        print(f"Sent: {len(gain_sets)} gain sets")
+
+        cmd = f"QRUN:{setpoint},{home_pos},{home_kp},{tolerance},{dwell_ms}\n"
+        self.timed_out = False
         self.ser.write(cmd.encode())
         print(f"Sent: {cmd.strip()}")
 
+        if timeout is None:
+            timeout = len(gain_sets) * 3.5 + 1.0  # Worst case homing + test each
+        responses = [ResponseBuffer() for _ in gain_sets]
+        homing_ms = [None] * len(gain_sets)
+        ended = [False] * len(gain_sets)
+        if self.binary:
+            self._read_binary_batch(responses, homing_ms, ended, timeout)
+        else:
+            self._read_batch(responses, homing_ms, ended, timeout)
+
+        # Drop partial results of sets that were cut off
+        for i, ok in enumerate(ended):
+            if not ok:
+                responses[i] = ResponseBuffer()
+                homing_ms[i] = None
+        return responses, homing_ms
+
+    def _command_with_ack(self, cmd, ack, timeout=1.0):
+        self.ser.write(f"{cmd}\n".encode())
+        start_wait = time.time()
+        while True:
+            raw = self._readline(self._remaining(start_wait, timeout))
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line == ack:
+                return
+            if line.startswith("ERROR") or (not raw and time.time() - start_wait > timeout):
+                raise Exception(f"{cmd} not acknowledged: {line or 'timeout'}")
+
+    def _read_batch(self, responses, homing_ms, ended, timeout):
+        stats = self.stats
+        current = None
+        start_wait = time.time()
+
+        while True:
+            raw = self._readline(self._remaining(start_wait, timeout))
+            stats['bytes_rx'] += len(raw)
+            try:
+                line = raw.decode('utf-8').strip()
+            except UnicodeDecodeError:
+                stats['malformed_lines'] += 1
+                continue
+
+            if not line:
+                if time.time() - start_wait > timeout:
+                    print("Timeout waiting for batch data.")
+                    self.timed_out = True
+                    stats['timeouts'] += 1
+                    break
+                continue
+            stats['lines_rx'] += 1
+
+            tag, _, value = line.partition(':')
+            try:
+                if tag == "BEGIN":
+                    current = int(value)
+                    continue
+                if tag == "END":
+                    ended[int(value)] = True
+                    current = None
+                    continue
+                if tag == "HOMED" and current is not None:
+                    homing_ms[current] = int(value)
+                    continue
+            except (ValueError, IndexError):
+                stats['malformed_lines'] += 1
+                continue
+
+            if line == "BATCH_DONE":
+                print("Batch Complete.")
+                break
+            if line.startswith("ERROR"):
+                print(f"Firmware Error: {line}")
+                break
+
+            parts = line.split(',')
+            if current is None or len(parts) != 4:
+                stats['malformed_lines'] += 1
+                continue
+            try:
+                responses[current].append(int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]))
+            except (ValueError, IndexError):
+                stats['malformed_lines'] += 1
+
+    def _read_binary_batch(self, responses, homing_ms, ended, timeout):
+        buf = bytearray()
+        current = None
+        start_wait = time.time()
+
+        while True:
+            chunk = self._read_chunk(self._remaining(start_wait, timeout))
+            if not chunk:
+                if time.time() - start_wait > timeout:
+                    print("Timeout waiting for batch data.")
+                    self.timed_out = True
+                    self.stats['timeouts'] += 1
+                    break
+                continue
+
+            self.stats['bytes_rx'] += len(chunk)
+            buf += chunk
+            if ERROR_PREFIX in buf:
+                self._binary_error(buf)
+                return
+            frames, consumed = decode_frames(buf)
+            del buf[:consumed]
+            self.stats['lines_rx'] += len(frames)
+            self.stats['dropped_bytes'] += consumed - len(frames) * FRAME_SIZE
+
+            # Tags change rarely, so walk the frame types in runs
+            types = frames['type']
+            start = 0
+            for i in range(len(frames) + 1):
+                if i < len(frames) and types[i] == FRAME_SAMPLE:
+                    continue
+                if current is not None and i > start and current < len(responses):
+                    run = frames[start:i]
+                    responses[current].extend(run['time'], run['pos'], run['setpoint'], run['output'])
+                start = i + 1
+                if i == len(frames):
+                    break
+
+                kind = types[i]
+                tag = int(frames['time'][i])
+                if kind == FRAME_BEGIN:
+                    current = tag
+                elif kind == FRAME_END:
+                    if tag < len(ended):
+                        ended[tag] = True
+                    current = None
+                elif kind == FRAME_HOMED and current is not None and current < len(homing_ms):
+                    homing_ms[current] = tag
+                elif kind == FRAME_DONE:
+                    print("Batch Complete.")
+                    return
+
+    def set_binary_mode(self, enabled=True, timeout=1.0):
+        """
+        Negotiates the telemetry format with the firmware (MODE:BIN / MODE:ASCII).
+        Falls back to ASCII if the firmware does not acknowledge.
+        Returns True if the requested mode is active.
+        """
+        if not self.ser or not self.ser.is_open:
+            raise Exception("Not connected.")
+
+        mode = "BIN" if enabled else "ASCII"
+        self._reset_input()
+        self.ser.write(f"MODE:{mode}\n".encode())
+        print(f"Sent: MODE:{mode}")
+
+        start_wait = time.time()
+        while time.time() - start_wait < timeout:
+            try:
+                line = self._readline(timeout - (time.time() - start_wait)).decode('utf-8').strip()
+            except UnicodeDecodeError:
+                continue
+            if line == f"MODE:{mode}":
+                self.binary = enabled
+                return True
+
+        print(f"Firmware did not acknowledge MODE:{mode}, using ASCII.")
+        self.binary = False
+        return not enabled
+
     def manual_drive(self, pwm):
         """
         Sends manual drive command (M:pwm).
@@ -75,32 +397,45 @@ class MotorInterface:
             self.ser.write(b"STOP\n")
             print("Sent: STOP")
 
-    def read_response(self, timeout=None):
+    def read_response(self, timeout=None, monitor=None):
         """
         Reads the CSV stream from Arduino until 'DONE' is received.
-        Returns a Pandas DataFrame with the data.
+        Returns a ResponseBuffer with the data (use .to_dataframe() for pandas).
+        monitor: optional StreamingCost updated per sample. If it asks to
+        abort, the test is STOPped early and the partial data is returned.
         """
         if not self.ser or not self.ser.is_open:
             raise Exception("Not connected.")
 
-        data_list = []
+        if self.binary:
+            return self._read_binary_response(timeout, monitor)
+
+        data = ResponseBuffer()
         start_wait = time.time()
         
         print("Waiting for data stream...")
         
+        stats = self.stats
         while True:
+            raw = self._readline(self._remaining(start_wait, timeout))
+            parse_start = time.perf_counter()
+            stats['bytes_rx'] += len(raw)
             try:
-                line = self.ser.readline().decode('utf-8').strip()
+                line = raw.decode('utf-8').strip()
             except UnicodeDecodeError:
+                stats['malformed_lines'] += 1
                 continue # Ignore bad bytes
                 
             if not line:
                 if timeout and (time.time() - start_wait > timeout):
                     print("Timeout waiting for data.")
+                    self.timed_out = True
+                    stats['timeouts'] += 1
                     break
                 continue
 
             # print(f"RX: {line}") # Debug print
+            stats['lines_rx'] += 1
 
             if line == "DONE":
                 print("Test Complete.")
@@ -110,23 +445,154 @@ class MotorInterface:
                 print(f"Firmware Error: {line}")
                 break
 
-            # Parse CSV: TIME,POS,SETPOINT,OUTPUT
-            parts = line.split(',')
-            if len(parts) == 4:
+            if line.startswith("HOMED:"):
+                try:
+                    self.last_homing_ms = int(line[6:])
+                except ValueError:
+                    stats['malformed_lines'] += 1
+                continue
+
+            if line.startswith("SETTLED:"):
                 try:
-                    record = {
-                        'time': int(parts[0]),
-                        'pos': int(parts[1]),
-                        'setpoint': int(parts[2]),
-                        'output': int(parts[3])
-                    }
-                    data_list.append(record)
+                    data.settled_ms = int(line[8:])
                 except ValueError:
-                    continue # Skip partial lines
+                    stats['malformed_lines'] += 1
+                continue
+
+            # Parse CSV: TIME,POS,SETPOINT,OUTPUT
+            parts = line.split(',')
+            if len(parts) != 4:
+                stats['malformed_lines'] += 1
+                continue
+            try:
+                sample = (int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]))
+            except ValueError:
+                stats['malformed_lines'] += 1
+                continue # Skip partial lines
+            data.append(*sample)
 
-        return pd.DataFrame(data_list)
+            if monitor:
+                monitor.update(sample[0], sample[1], sample[2])
+                if monitor.should_abort():
+                    self._abort_test()
+                    break
+            stats['parse_seconds'] += time.perf_counter() - parse_start
+
+        return data
+
+    def _abort_test(self, timeout=1.0):
+        """
+        Stops a running test and discards whatever the firmware sent
+        before acknowledging with STOPPED.
+        """
+        print("Aborting test early.")
+        self.stop()
+        buf = bytearray()
+        start_wait = time.time()
+        while b"STOPPED" not in buf:
+            if time.time() - start_wait > timeout:
+                print("Timeout waiting for STOPPED.")
+                break
+            buf += self._read_chunk(self._remaining(start_wait, timeout))
+
+    def _read_binary_response(self, timeout=None, monitor=None):
+        """
+        Binary counterpart of read_response: reads raw chunks, decodes whole
+        frames in bulk and stops at the DONE frame.
+        """
+        buf = bytearray()
+        data = ResponseBuffer()
+        start_wait = time.time()
+
+        print("Waiting for data stream...")
+
+        while True:
+            chunk = self._read_chunk(self._remaining(start_wait, timeout))
+            if not chunk:
+                if timeout and (time.time() - start_wait > timeout):
+                    print("Timeout waiting for data.")
+                    self.timed_out = True
+                    self.stats['timeouts'] += 1
+                    break
+                continue
+
+            parse_start = time.perf_counter()
+            self.stats['bytes_rx'] += len(chunk)
+            buf += chunk
+            if ERROR_PREFIX in buf:
+                self._binary_error(buf)
+                break
+            frames, consumed = decode_frames(buf)
+            del buf[:consumed]
+            self.stats['lines_rx'] += len(frames)
+            self.stats['dropped_bytes'] += consumed - len(frames) * FRAME_SIZE
+            self.stats['parse_seconds'] += time.perf_counter() - parse_start
+            if not len(frames):
+                continue
+
+            homed = frames[frames['type'] == FRAME_HOMED]
+            if len(homed):
+                self.last_homing_ms = int(homed['time'][0])
+            settled = frames[frames['type'] == FRAME_SETTLED]
+            if len(settled):
+                data.settled_ms = int(settled['time'][0])
+
+            done = frames['type'] == FRAME_DONE
+            finished = done.any()
+            if finished:
+                frames = frames[:int(done.argmax())]
+
+            frames = frames[frames['type'] == FRAME_SAMPLE]
+            data.extend(frames['time'], frames['pos'], frames['setpoint'], frames['output'])
+
+            if monitor:
+                monitor.extend(frames['time'], frames['pos'], frames['setpoint'])
+                if not finished and monitor.should_abort():
+                    self._abort_test()
+                    break
+
+            if finished:
+                print("Test Complete.")
+                break
+
+        return data
+
+    def _binary_error(self, buf):
+        """Reports the text ERROR reply found in a binary read; buf holds its start."""
+        line = bytes(buf[buf.find(ERROR_PREFIX):])
+        if b"\n" not in line:
+            line += self._readline(1.0)  # Rest of the line
+        line = line.split(b"\n")[0].decode('ascii', errors='replace').strip()
+        print(f"Firmware Error: {line}")
+
+    def _remaining(self, start_wait, timeout):
+        """Seconds left before a read deadline (None = wait indefinitely)."""
+        if not timeout:
+            return None
+        return max(0.0, timeout - (time.time() - start_wait))
+
+    def _readline(self, timeout=None):
+        if self.reader:
+            return self.reader.readline(timeout)
+        return self.ser.readline()
+
+    def _read_chunk(self, timeout=None):
+        if self.reader:
+            return self.reader.read(timeout)
+        return self.ser.read(max(1, self.ser.in_waiting))
+
+    def _reset_input(self):
+        if self.reader:
+            self.reader.reset_input_buffer()
+        else:
+            self.ser.reset_input_buffer()
 
     def close(self):
         if self.ser and self.ser.is_open:
+            if self.reader:
+                self.reader.stop()
             self.ser.close()
+            if self.reader:
+                self.reader.join()
+                self.reader = None
             print("Connection closed.")
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class ResponseBuffer:
+    """
+    Column store for one test run: TIME, POS, SETPOINT, OUTPUT.
+    Samples are written into a preallocated int array that grows
+    geometrically, so reading a run costs no per-sample allocations.
+    Columns are returned as NumPy views; call to_dataframe() only when
+    pandas is actually needed (e.g. for plotting).
+    """
+    COLUMNS = ('time', 'pos', 'setpoint', 'output')
+
+    def __init__(self, capacity=128):
+        self._data = np.empty((len(self.COLUMNS), max(1, capacity)), dtype=np.int64)
+        self._len = 0
+        self.settled_ms = None  # Set when the firmware ended the test early (SETTLED)
+
+    @classmethod
+    def from_columns(cls, time, pos, setpoint, output):
+        buf = cls(capacity=len(time))
+        buf.extend(time, pos, setpoint, output)
+        return buf
+
+    def _reserve(self, extra):
+        needed = self._len + extra
+        capacity = self._data.shape[1]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.empty((len(self.COLUMNS), capacity), dtype=np.int64)
+        grown[:, :self._len] = self._data[:, :self._len]
+        self._data = grown
+
+    def append(self, time, pos, setpoint, output):
+        if self._len == self._data.shape[1]:
+            self._reserve(1)
+        self._data[:, self._len] = (time, pos, setpoint, output)
+        self._len += 1
+
+    def extend(self, time, pos, setpoint, output):
+        n = len(time)
+        self._reserve(n)
+        end = self._len + n
+        self._data[0, self._len:end] = time
+        self._data[1, self._len:end] = pos
+        self._data[2, self._len:end] = setpoint
+        self._data[3, self._len:end] = output
+        self._len = end
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def empty(self):
+        return self._len == 0
+
+    def __getitem__(self, column):
+        return self._data[self.COLUMNS.index(column), :self._len]
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({col: self[col] for col in self.COLUMNS})
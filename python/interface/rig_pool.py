@@ -0,0 +1,86 @@
+import queue
+import threading
+
+
+class RigPool:
+    """
+    Schedules work across several identical, already-connected rigs.
+    Each rig runs in its own thread and pulls the next pending job as soon
+    as it is idle, so wall time scales down with the number of rigs.
+    A rig that times out (or raises) has its job handed to another rig and
+    sits out the rest of the pass; it is retired after `max_failures`
+    failures.
+    """
+    def __init__(self, interfaces, max_failures=1):
+        self.rigs = list(interfaces)
+        self.max_failures = max_failures
+        self.failures = {id(rig): 0 for rig in self.rigs}
+        self.retired = []
+        self._lock = threading.Lock()
+
+    @property
+    def active_rigs(self):
+        return [rig for rig in self.rigs if rig not in self.retired]
+
+    def run(self, jobs, func):
+        """
+        Calls func(rig, job) once for every job, spreading jobs across
+        the active rigs. Blocks until all jobs are done.
+        Raises if every rig has been retired before the work is finished.
+        """
+        work = queue.Queue()
+        for job in jobs:
+            work.put(job)
+
+        # Requeued jobs can be left behind when the other workers have
+        # already drained the queue, so keep going while rigs remain.
+        failed_rigs = set()  # ids of the rigs that failed a job in the last pass
+        while not work.empty():
+            rigs = self.active_rigs
+            if not rigs:
+                raise Exception(f"All rigs failed. {work.qsize()} jobs left unfinished.")
+            # Rigs that just failed wait while another rig can take their job
+            rigs = [rig for rig in rigs if id(rig) not in failed_rigs] or rigs
+            failed_rigs = set()
+
+            threads = [threading.Thread(target=self._worker, args=(rig, work, func, failed_rigs),
+                                        daemon=True)
+                       for rig in rigs]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+    def _worker(self, rig, work, func, failed_rigs):
+        while True:
+            try:
+                job = work.get_nowait()
+            except queue.Empty:
+                return
+
+            rig.timed_out = False
+            try:
+                func(rig, job)
+                failed = rig.timed_out
+            except Exception as e:
+                print(f"Rig {rig.port} Error: {e}")
+                failed = True
+
+            if not failed:
+                continue
+
+            # Hand the job back for a healthy rig to pick up, and stop
+            # pulling jobs so this rig cannot take it straight back. run()
+            # starts it again for whatever is left after this pass.
+            work.put(job)
+            with self._lock:
+                failed_rigs.add(id(rig))
+                self.failures[id(rig)] += 1
+                if self.failures[id(rig)] >= self.max_failures:
+                    print(f"Retiring rig {rig.port} after {self.failures[id(rig)]} failures.")
+                    self.retired.append(rig)
+            try:
+                rig.stop()
+            except Exception:
+                pass
+            return
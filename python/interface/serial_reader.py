@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import deque
+
+
+class SerialReader:
+    """
+    Background thread that drains a serial port in large chunks.
+    The thread blocks inside ser.read() (no polling) and appends whatever
+    arrived to a buffer. Consumers block on a condition variable with a
+    deadline instead of spinning on empty readline() calls, and complete
+    lines are split off in bulk.
+    """
+    def __init__(self, ser):
+        self.ser = ser
+        self.error = None  # Exception that stopped the thread, re-raised to readers
+
+        self._buf = bytearray()
+        self._lines = deque()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            try:
+                # Blocks until at least one byte arrives (or the port timeout)
+                chunk = self.ser.read(max(1, self.ser.in_waiting))
+            except Exception as e:
+                if self._running:
+                    self.error = e
+                break
+            if chunk:
+                with self._cond:
+                    self._buf += chunk
+                    self._cond.notify_all()
+
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _split_lines(self):
+        # Move every complete line out of the byte buffer at once
+        end = self._buf.rfind(b"\n")
+        if end >= 0:
+            self._lines.extend(bytes(self._buf[:end + 1]).splitlines(keepends=True))
+            del self._buf[:end + 1]
+
+    def _wait(self, ready, timeout):
+        """Waits (holding the lock) until ready() or the timeout. Returns ready()."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ready():
+            if self.error is not None:
+                raise self.error
+            if not self._running:
+                return False
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    def readline(self, timeout=None):
+        """
+        Returns the next complete line (with newline), or b"" if none
+        arrived before the timeout.
+        """
+        with self._cond:
+            def ready():
+                if not self._lines:
+                    self._split_lines()
+                return bool(self._lines)
+
+            if not self._wait(ready, timeout):
+                return b""
+            return self._lines.popleft()
+
+    def read(self, timeout=None):
+        """Returns every byte received so far, waiting up to timeout for some."""
+        with self._cond:
+            if not self._wait(lambda: self._lines or self._buf, timeout):
+                return b""
+            data = b"".join(self._lines) + bytes(self._buf)
+            self._lines.clear()
+            self._buf.clear()
+            return data
+
+    def reset_input_buffer(self):
+        with self._cond:
+            self._lines.clear()
+            self._buf.clear()
+        self.ser.reset_input_buffer()
+
+    def stop(self):
+        """Asks the thread to exit. Close the port next to unblock its read."""
+        self._running = False
+
+    def join(self):
+        self._thread.join(timeout=(self.ser.timeout or 0) + 1.0)
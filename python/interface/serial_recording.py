@@ -0,0 +1,234 @@
+import struct
+import threading
+import time
+
+MAGIC = b"PIDSERIAL1\n"
+# Record header: kind, microseconds since the previous record, payload length
+RECORD = struct.Struct('<BIH')
+RX, TX, RESET = 0, 1, 2
+MAX_PAYLOAD = 0xFFFF
+MAX_DELAY_US = 0xFFFFFFFF
+
+
+class RecordingSerial:
+    """
+    Wraps an open serial port and logs every byte that crosses it, with
+    its time, for ReplaySerial. The file is MAGIC followed by one record
+    per read, write or input reset: a 7-byte RECORD header and the
+    payload. Empty reads (timeouts) are not logged; the gap shows in the
+    next record's delay. Records are flushed at every command, so a crash
+    loses at most the input since the last one.
+    Everything else (timeout, in_waiting, is_open, ...) is the port's.
+    """
+    def __init__(self, ser, path):
+        self.ser = ser
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()  # SerialReader reads while the main thread writes
+        self._last = time.monotonic()
+
+    def _log(self, kind, payload=b"", flush=False):
+        with self._lock:
+            if self._file.closed:
+                return
+            now = time.monotonic()
+            delay = min(int((now - self._last) * 1e6), MAX_DELAY_US)
+            self._last = now
+            for start in range(0, max(len(payload), 1), MAX_PAYLOAD):
+                piece = payload[start:start + MAX_PAYLOAD]
+                self._file.write(RECORD.pack(kind, delay, len(piece)))
+                self._file.write(piece)
+                delay = 0
+            if flush:
+                self._file.flush()
+
+    def read(self, size=1):
+        data = self.ser.read(size)
+        if data:
+            self._log(RX, data)
+        return data
+
+    def readline(self):
+        data = self.ser.readline()
+        if data:
+            self._log(RX, data)
+        return data
+
+    def write(self, data):
+        written = self.ser.write(data)
+        self._log(TX, bytes(data), flush=True)
+        return written
+
+    def reset_input_buffer(self):
+        self.ser.reset_input_buffer()
+        self._log(RESET, flush=True)
+
+    @property
+    def timeout(self):
+        return self.ser.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.ser.timeout = value
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def close(self):
+        self.ser.close()
+        with self._lock:
+            self._file.close()
+
+
+def load_recording(path):
+    """
+    Reads a RecordingSerial file into a list of (kind, seconds since the
+    start, payload). A torn last record (crash while recording) is dropped.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if not raw.startswith(MAGIC):
+        raise Exception(f"{path} is not a serial recording.")
+
+    events = []
+    pos = len(MAGIC)
+    t_us = 0
+    while pos + RECORD.size <= len(raw):
+        kind, delay, length = RECORD.unpack_from(raw, pos)
+        pos += RECORD.size
+        if pos + length > len(raw):
+            break
+        t_us += delay
+        events.append((kind, t_us / 1e6, raw[pos:pos + length]))
+        pos += length
+    return events
+
+
+class ReplaySerial:
+    """
+    Serves a RecordingSerial file back behind the serial.Serial interface
+    (read, readline, write, in_waiting, reset_input_buffer, timeout), so
+    MotorInterface runs on recorded rig traffic without a rig:
+        motor.open_port = ReplaySerial
+        motor.connect(port='session.rec')
+    The input arrives in the chunks it was recorded in, at the recorded
+    pace after every command (speed=2.0 plays twice as fast), or all at
+    once with speed=None. Each write must be the next recorded command;
+    it releases what the rig sent in response. Anything else raises,
+    since the recording has no answer to it. Input resets discard what
+    the session discarded.
+    """
+    def __init__(self, port, baudrate=115200, timeout=1, speed=1.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.speed = speed  # None = as fast as possible
+        self.is_open = True
+
+        self.events = load_recording(port)
+        self._next = 0  # First event not replayed yet
+        self._rx = bytearray()  # Released input not read yet
+        self._anchor = (time.monotonic(), 0.0)  # Wall time <-> recorded time of the last command
+        self._cond = threading.Condition()
+
+    @property
+    def remaining(self):
+        """Recorded events not replayed yet (0 once the session is through)."""
+        return len(self.events) - self._next
+
+    def _due(self, t):
+        """Wall time the input recorded at t is released at."""
+        if self.speed is None:
+            return float('-inf')
+        wall, recorded = self._anchor
+        return wall + (t - recorded) / self.speed
+
+    def _release_due(self):
+        """Moves the recorded input that is due into the receive buffer."""
+        now = time.monotonic()
+        while self._next < len(self.events):
+            kind, t, payload = self.events[self._next]
+            if kind != RX or self._due(t) > now:
+                break
+            self._rx += payload
+            self._next += 1
+
+    def _next_control(self):
+        """Index of the next recorded write or reset, or None."""
+        for i in range(self._next, len(self.events)):
+            if self.events[i][0] != RX:
+                return i
+        return None
+
+    def _advance(self, i):
+        # Input recorded before event i had arrived by then in the session
+        for _, _, payload in self.events[self._next:i]:
+            self._rx += payload
+        self._next = i + 1
+        self._anchor = (time.monotonic(), self.events[i][1])
+
+    def _wait_for(self, ready):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            self._release_due()
+            if ready() or not self.is_open:
+                return
+            now = time.monotonic()
+            wake = None
+            if self._next < len(self.events) and self.events[self._next][0] == RX:
+                wake = self._due(self.events[self._next][1])
+            if deadline is not None:
+                if now >= deadline:
+                    return
+                wake = deadline if wake is None else min(wake, deadline)
+            self._cond.wait(None if wake is None else max(0.0, wake - now))
+
+    def write(self, data):
+        data = bytes(data)
+        with self._cond:
+            i = self._next_control()
+            recorded = None if i is None else self.events[i]
+            if recorded is None or recorded[0] != TX or recorded[2] != data:
+                expected = recorded[2] if recorded is not None and recorded[0] == TX else None
+                raise Exception(f"Replay diverged: sent {data!r}, recording has {expected!r}.")
+            self._advance(i)
+            self._cond.notify_all()
+        return len(data)
+
+    @property
+    def in_waiting(self):
+        with self._cond:
+            self._release_due()
+            return len(self._rx)
+
+    def read(self, size=1):
+        with self._cond:
+            self._wait_for(lambda: self._rx)
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+            return data
+
+    def readline(self):
+        with self._cond:
+            self._wait_for(lambda: b"\n" in self._rx)
+            end = self._rx.find(b"\n")
+            if end < 0:
+                end = len(self._rx) - 1
+            data = bytes(self._rx[:end + 1])
+            del self._rx[:end + 1]
+            return data
+
+    def reset_input_buffer(self):
+        with self._cond:
+            i = self._next_control()
+            if i is not None and self.events[i][0] == RESET:
+                self._advance(i)
+            else:
+                self._release_due()
+            self._rx.clear()
+
+    def close(self):
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
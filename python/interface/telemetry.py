@@ -0,0 +1,103 @@
+# Binary telemetry frames - must match firmware/potentiometer_pid/Telemetry.h
+import struct
+import numpy as np
+
+# Frame layout (11 bytes, little-endian):
+#   SYNC(u8) TYPE(u8) TIME(u16) POS(i16) SETPOINT(i16) OUTPUT(i16) CRC8(u8)
+# CRC8 (poly 0x07, init 0x00) covers TYPE..OUTPUT.
+SYNC = 0xA5
+FRAME_SAMPLE = 0x01
+FRAME_DONE = 0x02
+FRAME_HOMED = 0x03  # TIME = homing duration (HSTART)
+FRAME_BEGIN = 0x04  # TIME = batch index (QRUN)
+FRAME_END = 0x05  # TIME = batch index (QRUN)
+FRAME_SETTLED = 0x06  # TIME = when the settle dwell was met (test ends early)
+# A rejected command is answered with a text line (ERROR:...) even in binary mode
+ERROR_PREFIX = b"ERROR"
+
+FRAME_FORMAT = '<BBHhhhB'
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)
+FRAME_DTYPE = np.dtype([
+    ('sync', 'u1'),
+    ('type', 'u1'),
+    ('time', '<u2'),
+    ('pos', '<i2'),
+    ('setpoint', '<i2'),
+    ('output', '<i2'),
+    ('crc', 'u1'),
+])
+
+
+def _make_crc_table(poly=0x07):
+    table = np.zeros(256, dtype=np.uint8)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) if crc & 0x80 else (crc << 1)
+        table[i] = crc & 0xFF
+    return table
+
+CRC_TABLE = _make_crc_table()
+
+
+def crc8(data):
+    """CRC-8 of a bytes-like object."""
+    crc = 0
+    for byte in data:
+        crc = int(CRC_TABLE[crc ^ byte])
+    return crc
+
+
+def encode_frame(frame_type, time_ms, pos, setpoint, output):
+    """Packs one frame exactly as the firmware sends it."""
+    body = struct.pack('<BHhhh', frame_type, time_ms & 0xFFFF, pos, setpoint, output)
+    return bytes([SYNC]) + body + bytes([crc8(body)])
+
+
+def _crc8_frames(frames):
+    """Vectorized CRC-8 over the covered bytes of every frame."""
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    crc = np.zeros(len(frames), dtype=np.uint8)
+    for col in range(1, FRAME_SIZE - 1):
+        crc = CRC_TABLE[crc ^ raw[:, col]]
+    return crc
+
+
+def decode_frames(buf):
+    """
+    Decodes as many whole frames as possible from buf (bytes/bytearray).
+    Frames are validated in bulk with numpy.frombuffer; on a bad sync byte
+    or CRC the decoder skips ahead to the next sync byte.
+    Returns (frames, consumed) where frames is a structured array with
+    FRAME_DTYPE and consumed is the number of bytes used from buf.
+    """
+    chunks = []
+    pos = 0
+    end = len(buf)
+
+    while end - pos >= FRAME_SIZE:
+        if buf[pos] != SYNC:
+            nxt = buf.find(SYNC, pos + 1)
+            if nxt < 0:
+                pos = end
+                break
+            pos = nxt
+            continue
+
+        count = (end - pos) // FRAME_SIZE
+        frames = np.frombuffer(buf, dtype=FRAME_DTYPE, count=count, offset=pos)
+        valid = (frames['sync'] == SYNC) & (_crc8_frames(frames) == frames['crc'])
+
+        if valid.all():
+            chunks.append(frames)
+            pos += count * FRAME_SIZE
+        else:
+            bad = int(np.argmin(valid))
+            chunks.append(frames[:bad])
+            pos += bad * FRAME_SIZE + 1  # Drop the bad sync byte, then resync
+
+    if chunks:
+        frames = np.concatenate(chunks)
+    else:
+        frames = np.empty(0, dtype=FRAME_DTYPE)
+    return frames, pos
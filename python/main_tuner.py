@@ -1,13 +1,45 @@
-import matplotlib.pyplot as plt
-import time
+import argparse
+import subprocess
+import sys
+import os
 from interface.motor_interface import MotorInterface
+from interface.live_view import LivePublisher, DEFAULT_ADDRESS
 from ai.genetic_tuner import GeneticTuner
+from ai.scenario import ScenarioPlan
+from ai.trace_store import TraceStore
+from ai.checkpoint import Checkpoint
+from ai.metrics import MetricsRecorder, CSVSink
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI PID Tuner")
+    parser.add_argument('--unattended', action='store_true',
+                        help="run without prompts (resumes a saved session automatically)")
+    parser.add_argument('--generations', type=int, default=None,
+                        help="stop after this many generations (default: until Ctrl-C or 'q')")
+    parser.add_argument('--viewer', action='store_true',
+                        help="open the live view (interface/live_view.py) in its own process")
+    parser.add_argument('--port', type=int, default=DEFAULT_ADDRESS[1],
+                        help="UDP port for live view updates")
+    parser.add_argument('--model', action='store_true',
+                        help="tune on a plant model fitted from the traces; only the best "
+                             "model candidates are tested on the rig")
+    parser.add_argument('--rig', default='default',
+                        help="rig name; the serial port found for it is remembered for the next start")
+    parser.add_argument('--record', metavar='PATH',
+                        help="log every byte exchanged with the rig to PATH, for replay with "
+                             "interface.serial_recording.ReplaySerial")
+    parser.add_argument('--settle-tolerance', type=int, default=None, metavar='COUNTS',
+                        help="end a test step once the position stays this close to the "
+                             "setpoint (firmware settle detection; keep it below 10)")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     print("AI PID Tuner - Initializing...")
     
     # 1. Setup Interface
-    motor = MotorInterface()
+    motor = MotorInterface(rig=args.rig)
+    motor.record = args.record
     try:
         motor.connect()
     except Exception as e:
@@ -16,43 +48,79 @@ def main():
 
     # 2. Setup Tuner
     # Using defaults from Phase 4: Pop=20, Mutation=0.1
-    tuner = GeneticTuner() 
-    tuner.initialize_population()
+    # Per-phase timing of every test goes to tuning_log.csv
+    metrics = MetricsRecorder(CSVSink("tuning_log.csv", "tuning_generations.csv"))
+    tuner = GeneticTuner(metrics=metrics)
+    # Every response trace is archived in traces/ (index.bin + traces.bin)
+    tuner.store = TraceStore("traces")
+    if args.model:
+        from ai.system_id import PlantIdentifier  # Keeps numba out of plain starts
+        # Start from the latest archived traces, so the model is fitted at once
+        tuner.identifier = PlantIdentifier()
+        for i in range(max(0, len(tuner.store) - tuner.identifier.max_traces), len(tuner.store)):
+            tuner.identifier.add(tuner.store.trace(i))
+
+    # Score every individual across the travel range, in both directions,
+    # plus a small-signal excursion. Steps are chained so only the first
+    # one needs a homing move.
+    tuner.scenario = ScenarioPlan.from_points([300, 500, 700])
+    tuner.scenario.add_disturbance(500, amplitude=30, duration=1000, weight=0.5)
+    tuner.settle_tolerance = args.settle_tolerance
+
+    # Progress is checkpointed after every test, so a crashed or
+    # interrupted session picks up where it stopped
+    tuner.checkpoint = Checkpoint("tuning_checkpoint.json")
+    resume = tuner.checkpoint.exists()
+    if resume and not args.unattended:
+        resume = input("Resume the previous session? [Y/n]: ").lower() != 'n'
+    if resume:
+        done = tuner.checkpoint.restore(tuner)
+        print(f"Resumed at generation {tuner.generation} ({done}/{tuner.pop_size} already tested)")
+        # The saved settle band is kept, so costs stay comparable within the session
+        if tuner.settle_tolerance != args.settle_tolerance:
+            print(f"Warning: --settle-tolerance {args.settle_tolerance} ignored; "
+                  f"the resumed session uses {tuner.settle_tolerance}.")
+    else:
+        tuner.initialize_population()
     
-    print("\n--- INSTRUCTIONS ---")
-    print("The Tuner will now evolve PID parameters.")
-    print("Between tests, you may need to manually reset the motor position if it drifts too far.")
-    print("Ideally, hold the motor/load at the 'Start Position' (approx 400) before each test.")
-    input("Press Enter to START EVOLUTION...")
+    # Plots are drawn by a separate viewer process; publishing never blocks
+    publisher = LivePublisher((DEFAULT_ADDRESS[0], args.port))
+    if args.viewer:
+        subprocess.Popen([sys.executable, '-m', 'interface.live_view', '--port', str(args.port)],
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    if not args.unattended:
+        print("\n--- INSTRUCTIONS ---")
+        print("The Tuner will now evolve PID parameters.")
+        print("Each candidate runs a chain of steps between 300, 500 and 700 (both directions)")
+        print("plus a 30-count excursion at 500; the motor is homed to the first step by itself.")
+        print("If a run trips the safety limits (50/950), move the load back by hand.")
+        input("Press Enter to START EVOLUTION...")
 
     try:
-        target_setpoint = 600 # Moving from ~400 to 600
+        generations = 0
         
-        while True:
-            best_ind = tuner.run_generation(motor, setpoint=target_setpoint)
-            
-            # Plot the best run of this generation
-            if best_ind.history is not None:
-                df = best_ind.history
-                plt.figure(figsize=(8, 4))
-                plt.plot(df['time'], df['setpoint'], 'r--', label='Target')
-                plt.plot(df['time'], df['pos'], 'b-', label='Best Response')
-                plt.title(f"Gen {tuner.generation-1} Best: Cost={best_ind.cost:.1f} (P={best_ind.kp:.1f}, D={best_ind.kd:.1f})")
-                plt.xlabel('Time (ms)')
-                plt.ylabel('Position')
-                plt.legend()
-                plt.grid(True)
-                plt.show(block=False)
-                plt.pause(2)
-                plt.close()
+        # The scenario plan sets the setpoints of every test
+        while args.generations is None or generations < args.generations:
+            if args.model:
+                best_ind = tuner.run_generation_model(motor)
+            else:
+                best_ind = tuner.run_generation(motor)
+            generations += 1
+            publisher.publish(tuner.generation - 1, best_ind, tuner.evaluations)
             
-            cont = input(f"Generation {tuner.generation-1} Complete. Press Enter to continue, 'q' to quit: ")
-            if cont.lower() == 'q':
-                break
+            if not args.unattended:
+                cont = input(f"Generation {tuner.generation-1} Complete. Press Enter to continue, 'q' to quit: ")
+                if cont.lower() == 'q':
+                    break
                 
     except KeyboardInterrupt:
         print("\nStopped by User.")
     finally:
+        metrics.close()
+        tuner.store.close()
+        tuner.checkpoint.close()
+        publisher.close()  # The viewer window stays open with the final state
         motor.close()
 
 if __name__ == "__main__":
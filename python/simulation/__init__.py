@@ -0,0 +1 @@
+# Simulation module - Software plant models for offline tuning
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class BatchSimulatedMotor:
+    """
+    Vectorized version of the SimulatedMotor plant (tests/physics.py).
+    Advances N independent closed loops together with NumPy array ops so a
+    whole population can be simulated in one call.
+    Model: J * theta_dd + b * theta_d = Kt * V  (same Euler integration,
+    PWM clamp and 0-1023 position clamp as the scalar model).
+    """
+    def __init__(self, J=0.001, b=0.0, Kt=0.5):
+        # Physics Parameters (Arbitrary Units to match Arduino scale)
+        self.J = J
+        self.b = b
+        self.Kt = Kt
+
+    @staticmethod
+    def sample_times(duration=1.5, dt=0.02):
+        """
+        Returns the sample instants (seconds) visited by the scalar loop.
+        Accumulates t exactly like `while t < duration: t += dt` so the
+        sample count and logged timestamps match sample-for-sample.
+        """
+        times = []
+        t = 0
+        while t < duration:
+            times.append(t)
+            t += dt
+        return times
+
+    def run_batch(self, kp, ki, kd, setpoint, start_pos, duration=1.5, dt=0.02):
+        """
+        Simulates N PID control loops for a duration.
+        kp, ki, kd, setpoint, start_pos: scalars or arrays of shape (N,)
+        Returns (times, positions, setpoints, outputs), each an int array
+        of shape (N, T).
+        """
+        kp, ki, kd, setpoint, start_pos = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (kp, ki, kd, setpoint, start_pos))
+        )
+        n = kp.shape[0]
+        sample_t = self.sample_times(duration, dt)
+        steps = len(sample_t)
+
+        positions = np.empty((n, steps), dtype=np.int64)
+        outputs = np.empty((n, steps), dtype=np.int64)
+
+        # State
+        theta = start_pos.copy()
+        omega = np.zeros(n)
+        integral = np.zeros(n)
+        prev_error = np.zeros(n)
+
+        for k in range(steps):
+            # 1. Read Sensor
+            current_pos = theta.copy()
+
+            # 2. PID Calculation
+            error = setpoint - current_pos
+            integral += error * dt
+            derivative = (error - prev_error) / dt
+
+            output = (kp * error) + (ki * integral) + (kd * derivative)
+
+            # Clamp PWM
+            np.clip(output, -255, 255, out=output)
+
+            prev_error = error
+
+            # 3. Apply to Plant (Euler Integration)
+            torque = (output / 255.0) * self.Kt
+            alpha = (torque - self.b * omega) / self.J
+            omega += alpha * dt
+            theta += omega * dt
+
+            # Clamp to physical limits (0-1023)
+            np.clip(theta, 0, 1023, out=theta)
+
+            # 4. Log Data (int() truncates toward zero)
+            positions[:, k] = np.trunc(current_pos)
+            outputs[:, k] = np.trunc(output)
+
+        times = np.tile(np.array([int(t * 1000) for t in sample_t], dtype=np.int64), (n, 1))
+        setpoints = np.repeat(np.trunc(setpoint).astype(np.int64)[:, None], steps, axis=1)
+
+        return times, positions, setpoints, outputs
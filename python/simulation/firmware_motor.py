@@ -0,0 +1,213 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # The kernel then runs as plain Python, far slower (numba is in requirements.txt)
+    njit = None
+
+
+def _kernel(kp, ki, kd, setpoint, theta, omega, pwm, steps, J, b, Kt, deadzone, delay,
+            min_safe, max_safe, positions, outputs, lengths):
+    """
+    Closed-loop kernel for N runs, written as explicit loops so numba can
+    compile it. Follows the firmware step by step: every 20 ms the plant
+    has moved under the last PWM, the pot is read (ADC counts), the safety
+    limits are checked, PID.h computes the output in float32 and Motor.h
+    applies the deadzone. A PWM reaches the plant `delay` control steps
+    late (0 = next interval, like the firmware itself); this models
+    transport and driver lag of a real rig. theta, omega and pwm are
+    updated in place.
+    The runs are interleaved (time outer, run inner) so independent loops
+    overlap in the CPU pipeline; positions and outputs are (T, N). Every
+    run computes its step before the state is stored, and only running
+    runs store it, so the inner loop has no early exits.
+    """
+    n = kp.shape[0]
+    dt = np.float32(0.02)  # (now - lastControlTime) / 1000.0 on the AVR
+    plant_dt = 0.02
+    out_max = np.float32(255.0)
+    out_min = np.float32(-255.0)
+
+    # myPID.reset(pot.read())
+    prev_input = np.empty(n, dtype=np.float32)
+    integral = np.zeros(n, dtype=np.float32)
+    # PWMs on their way to the plant; row k % (delay + 1) is due at step k
+    pending = np.empty((delay + 1, n), dtype=np.int64)
+    for i in range(n):
+        prev_input[i] = np.float32(min(max(int(theta[i]), 0), 1023))
+        lengths[i] = steps
+        for j in range(delay + 1):
+            pending[j, i] = pwm[i]
+
+    for k in range(steps):
+        due = pending[k % (delay + 1)]
+        for i in range(n):
+            running = lengths[i] == steps  # Not stopped by the safety limits
+
+            # Plant runs for one control interval with the PWM being driven
+            torque = (due[i] / 255.0) * Kt
+            alpha = (torque - b * omega[i]) / J
+            new_omega = omega[i] + alpha * plant_dt
+            new_theta = min(max(theta[i] + new_omega * plant_dt, 0.0), 1023.0)
+
+            # Potentiometer.h: analogRead, then the safety stop in loop()
+            pos = min(max(int(new_theta), 0), 1023)
+            tripped = pos < min_safe or pos > max_safe
+
+            # PID.h compute(): float32 arithmetic, derivative on measurement
+            error = setpoint[i] - np.float32(pos)
+            new_integral = integral[i] + error * dt
+            d_input = (np.float32(pos) - prev_input[i]) / dt
+            output = kp[i] * error + ki[i] * new_integral - kd[i] * d_input
+            out = int(min(max(output, out_min), out_max))
+
+            # Motor.h drive(): outputs inside the deadzone are dropped
+            drive = 0 if tripped or (abs(out) < deadzone and out != 0) else out
+
+            if running:
+                omega[i] = new_omega
+                theta[i] = new_theta
+                pwm[i] = drive
+                if tripped:
+                    lengths[i] = k
+                else:
+                    integral[i] = new_integral
+                    prev_input[i] = np.float32(pos)
+                    due[i] = drive
+                    positions[k, i] = pos
+                    outputs[k, i] = out
+
+
+if njit is not None:
+    _kernel = njit(cache=True)(_kernel)
+
+
+class FirmwareSimulatedMotor:
+    """
+    Plant model driven by the firmware's control loop instead of the
+    idealized one in SimulatedMotor: derivative on measurement, float32
+    PID arithmetic, output clamping, the Motor.h deadzone, ADC
+    quantization and the Potentiometer.h safety stop (a run that leaves
+    min_safe..max_safe ends without further samples, like on the rig).
+    Samples are logged at 20, 40, ... ms as the firmware sends them.
+    delay: extra control steps before a PWM reaches the plant (0 for
+    the firmware itself; ai.system_id fits it for a real rig).
+    The loop is compiled with numba when it is installed.
+    """
+    CONTROL_INTERVAL = 20  # ms
+    HOME_TIMEOUT = 1500  # ms
+
+    def __init__(self, J=0.001, b=0.0, Kt=0.5, deadzone=40, min_safe=50, max_safe=950, delay=0):
+        self.J = J
+        self.b = b
+        self.Kt = Kt
+        self.deadzone = deadzone
+        self.delay = delay
+        self.min_safe = min_safe
+        self.max_safe = max_safe
+
+        # Single-motor state for MockSerial (SimulatedMotor interface)
+        self.theta = 0.0
+        self.omega = 0.0
+        self.pwm = 0
+        self.tripped = False  # Last run hit a safety limit
+        self.lengths = None  # Samples per run of the last run_batch
+
+    def _run(self, kp, ki, kd, setpoint, theta, omega, pwm, steps):
+        kp, ki, kd, setpoint = (np.atleast_1d(np.asarray(a, dtype=np.float32))
+                                for a in (kp, ki, kd, setpoint))
+        kp, ki, kd, setpoint = np.broadcast_arrays(kp, ki, kd, setpoint)
+        n = kp.shape[0]
+        theta = np.broadcast_to(np.asarray(theta, dtype=float), (n,)).copy()
+        omega = np.broadcast_to(np.asarray(omega, dtype=float), (n,)).copy()
+        pwm = np.broadcast_to(np.asarray(pwm, dtype=np.int64), (n,)).copy()
+
+        positions = np.zeros((steps, n), dtype=np.int64)
+        outputs = np.zeros((steps, n), dtype=np.int64)
+        lengths = np.zeros(n, dtype=np.int64)
+        _kernel(np.ascontiguousarray(kp), np.ascontiguousarray(ki), np.ascontiguousarray(kd),
+                np.ascontiguousarray(setpoint), theta, omega, pwm, steps,
+                float(self.J), float(self.b), float(self.Kt), int(self.deadzone), int(self.delay),
+                int(self.min_safe), int(self.max_safe), positions, outputs, lengths)
+        return (np.ascontiguousarray(positions.T), np.ascontiguousarray(outputs.T),
+                lengths, theta, omega, pwm)
+
+    def run_batch(self, kp, ki, kd, setpoint, start_pos, duration=1.5, dt=0.02):
+        """
+        Simulates N tests from rest, like BatchSimulatedMotor.run_batch.
+        Returns (times, positions, setpoints, outputs) of shape (N, T).
+        Runs stopped by the safety limits are shorter: self.lengths holds
+        the number of valid samples per row (the rest is zero).
+        """
+        steps = int(round(duration * 1000)) // self.CONTROL_INTERVAL
+        setpoint = np.trunc(np.atleast_1d(np.asarray(setpoint, dtype=float)))
+        positions, outputs, lengths, _, _, _ = self._run(kp, ki, kd, setpoint, start_pos, 0.0, 0, steps)
+
+        n = positions.shape[0]
+        times = np.tile(np.arange(1, steps + 1, dtype=np.int64) * self.CONTROL_INTERVAL, (n, 1))
+        setpoints = np.repeat(np.broadcast_to(setpoint, (n,)).astype(np.int64)[:, None], steps, axis=1)
+        self.lengths = lengths
+        return times, positions, setpoints, outputs
+
+    def reset(self, initial_pos=0):
+        self.theta = initial_pos
+        self.omega = 0.0
+        self.pwm = 0
+
+    def run_simulated_test(self, start_pos, setpoint, kp, ki, kd, duration=1.5, dt=0.02):
+        """
+        One firmware test continuing from the current motor state (so a test
+        right after home() starts with the homing velocity and PWM).
+        Same return format as SimulatedMotor.run_simulated_test.
+        """
+        if start_pos != self.theta:
+            self.reset(start_pos)
+        steps = int(round(duration * 1000)) // self.CONTROL_INTERVAL
+        positions, outputs, lengths, theta, omega, pwm = self._run(
+            kp, ki, kd, int(setpoint), self.theta, self.omega, self.pwm, steps)
+
+        n = int(lengths[0])
+        self.tripped = n < steps
+        # finishTest() / the safety stop leave the motor stopped
+        self.theta, self.omega, self.pwm = float(theta[0]), 0.0, 0
+        times = [(k + 1) * self.CONTROL_INTERVAL for k in range(n)]
+        return times, list(positions[0, :n]), [int(setpoint)] * n, list(outputs[0, :n])
+
+    def home(self, home_pos, home_kp, tolerance, dwell_ms):
+        """
+        Firmware HOMING state (HSTART/QRUN): P-only loop until the position
+        stays within tolerance for dwell_ms, or HOME_TIMEOUT. The motor keeps
+        moving into the following test. Returns the homing time in ms, or
+        None if a safety limit stopped the firmware.
+        """
+        self.omega = 0.0
+        self.pwm = 0
+        self.tripped = False
+        steps = self.HOME_TIMEOUT // self.CONTROL_INTERVAL + 1
+        positions, _, lengths, theta, _, _ = self._run(
+            home_kp, 0.0, 0.0, int(home_pos), self.theta, 0.0, 0, steps)
+
+        stop = None
+        in_band_since = None
+        for k in range(int(lengths[0])):
+            now = (k + 1) * self.CONTROL_INTERVAL
+            if abs(positions[0, k] - home_pos) <= tolerance:
+                if in_band_since is None:
+                    in_band_since = now
+            else:
+                in_band_since = None
+            if (in_band_since is not None and now - in_band_since >= dwell_ms) or now > self.HOME_TIMEOUT:
+                stop = k
+                break
+
+        if stop is None:
+            # Safety stop while homing: no HOMED, the firmware is back to IDLE
+            self.theta = float(theta[0])
+            self.tripped = True
+            return None
+
+        # Re-run up to the stop step to get the state the test starts from
+        _, _, _, theta, omega, pwm = self._run(
+            home_kp, 0.0, 0.0, int(home_pos), self.theta, 0.0, 0, stop + 1)
+        self.theta, self.omega, self.pwm = float(theta[0]), float(omega[0]), int(pwm[0])
+        return (stop + 1) * self.CONTROL_INTERVAL
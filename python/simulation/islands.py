@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Island-model GA for offline design studies.
+
+K independent GeneticTuner populations ("islands") evolve against the batch
+simulator in worker processes. Every migration_interval generations the
+best individuals of each island are copied into the next island (ring
+topology), replacing its newest children. Each island has its own
+random.Random seeded from the master seed, so a run is reproducible no
+matter how many processes execute it.
+
+Usage:
+    cd python/
+    python3 -m simulation.islands --islands 8 --generations 40 --seed 1
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.genetic_tuner import GeneticTuner, Individual
+from simulation.batch_motor import BatchSimulatedMotor
+
+
+def _run_epoch(tuner, generations, setpoint):
+    """
+    Worker: evolves one island for a number of generations.
+    Returns the tuner (with its RNG state) for the next epoch.
+    """
+    simulator = BatchSimulatedMotor()
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-generation logs
+        for _ in range(generations):
+            tuner.run_generation_batch(simulator, setpoint=setpoint, home_pos=tuner.home_pos)
+
+    # Responses are not needed between epochs; keep the pickles small
+    for ind in tuner.population:
+        ind.history = None
+    tuner.archive = {}
+    return tuner
+
+
+class IslandModel:
+    def __init__(self, islands=4, pop_size=20, migration_interval=5, migrants=2, seed=0,
+                 processes=None):
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.seed = seed
+        self.processes = processes  # None = one per core, 0 = run in this process
+
+        # One independent RNG stream per island, derived from the master seed
+        master = random.Random(seed)
+        self.islands = []
+        for _ in range(islands):
+            tuner = GeneticTuner(pop_size=pop_size, rng=random.Random(master.getrandbits(64)))
+            tuner.initialize_population()
+            self.islands.append(tuner)
+
+    @property
+    def evaluations(self):
+        return sum(tuner.evaluations for tuner in self.islands)
+
+    def best(self):
+        """Best evaluated individual across all islands."""
+        evaluated = [ind for tuner in self.islands for ind in tuner.population
+                     if ind.cost != float('inf')]
+        return min(evaluated, key=lambda x: x.cost, default=None)
+
+    def run(self, generations, setpoint=600):
+        """
+        Evolves every island for the given number of generations, migrating
+        between epochs. Returns the best individual found.
+        """
+        done = 0
+        with self._executor() as executor:
+            while done < generations:
+                epoch = min(self.migration_interval, generations - done)
+                jobs = [(tuner, epoch, setpoint) for tuner in self.islands]
+                if executor is None:
+                    self.islands = [_run_epoch(*job) for job in jobs]
+                else:
+                    self.islands = list(executor.map(_run_epoch, *zip(*jobs)))
+                done += epoch
+
+                if done < generations:
+                    self._migrate()
+
+                best = self.best()
+                print(f"Gen {done}: best cost {best.cost:.4f} "
+                      f"[P={best.kp:.2f}, I={best.ki:.2f}, D={best.kd:.2f}], "
+                      f"{self.evaluations} evaluations")
+        return self.best()
+
+    def _executor(self):
+        if self.processes == 0:
+            return contextlib.nullcontext()
+        return ProcessPoolExecutor(max_workers=self.processes)
+
+    def _migrate(self):
+        """
+        Ring migration: island i's top individuals replace the last (newest,
+        not yet evaluated) members of island i+1. Migrants keep their cost.
+        """
+        emigrants = []
+        for tuner in self.islands:
+            ranked = sorted((ind for ind in tuner.population if ind.cost != float('inf')),
+                            key=lambda x: x.cost)
+            emigrants.append(ranked[:self.migrants])
+
+        for i, tuner in enumerate(self.islands):
+            for j, source in enumerate(emigrants[i - 1]):
+                copy = Individual(source.kp, source.ki, source.kd)
+                copy.cost = source.cost
+                tuner.population[-1 - j] = copy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--islands', type=int, default=os.cpu_count())
+    parser.add_argument('--pop-size', type=int, default=20)
+    parser.add_argument('--generations', type=int, default=40)
+    parser.add_argument('--migration-interval', type=int, default=5)
+    parser.add_argument('--migrants', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None,
+                        help="worker processes (default: one per core, 0: no pool)")
+    parser.add_argument('--setpoint', type=int, default=600)
+    args = parser.parse_args()
+
+    model = IslandModel(args.islands, args.pop_size, args.migration_interval, args.migrants,
+                        args.seed, args.processes)
+    start = time.perf_counter()
+    best = model.run(args.generations, setpoint=args.setpoint)
+    elapsed = time.perf_counter() - start
+
+    print(f"\nBest: Cost={best.cost:.4f} [P={best.kp:.4f}, I={best.ki:.4f}, D={best.kd:.4f}]")
+    print(f"{model.evaluations} evaluations in {elapsed:.2f}s "
+          f"({model.evaluations / elapsed:,.0f} evaluations/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Runs the GA against the simulated motor.
+
+Compares how many evaluations the plain GA and the surrogate-screened GA
+need to reach a target cost. Evaluations are what costs rig time, so this
+is the number that matters before touching hardware. With --backends the
+ask/tell optimizers of ai/optimizers.py are compared instead.
+
+Usage:
+    cd python/
+    python3 -m simulation.sim_runner --target 90.5 --seeds 30
+    python3 -m simulation.sim_runner --target 90.5 --seeds 30 --backends ga cmaes de
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.genetic_tuner import GeneticTuner
+from ai.optimizers import OPTIMIZERS
+from ai.surrogate import RBFSurrogate
+from simulation.batch_motor import BatchSimulatedMotor
+
+
+def evaluations_to_target(tuner, simulator, target, max_evals=1000, setpoint=600):
+    """
+    Evolves until the best cost reaches target.
+    Returns the number of evaluations used, or None if max_evals ran out.
+    """
+    tuner.initialize_population()
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-generation logs
+        while tuner.evaluations < max_evals:
+            best = tuner.run_generation_batch(simulator, setpoint=setpoint)
+            if best.cost <= target:
+                return tuner.evaluations
+    return None
+
+
+def optimizer_evaluations_to_target(optimizer, simulator, target, max_evals=1000, setpoint=600):
+    """Same as evaluations_to_target, for an ask/tell optimizer backend."""
+    tuner = GeneticTuner()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while tuner.evaluations < max_evals:
+            best = tuner.run_generation_optimizer(optimizer, simulator=simulator, setpoint=setpoint)
+            if best.cost <= target:
+                return tuner.evaluations
+    return None
+
+
+def compare_backends(target, seeds, backends, max_evals=1000):
+    simulator = BatchSimulatedMotor()
+    results = {}
+    for name in backends:
+        results[name] = [optimizer_evaluations_to_target(OPTIMIZERS[name](seed=seed), simulator,
+                                                         target, max_evals)
+                         for seed in range(seeds)]
+    return results
+
+
+def compare(target, seeds, pop_size=20, max_evals=1000):
+    simulator = BatchSimulatedMotor()
+    results = {}
+    for label in ('plain', 'surrogate'):
+        runs = []
+        for seed in range(seeds):
+            random.seed(seed)
+            tuner = GeneticTuner(pop_size=pop_size)
+            if label == 'surrogate':
+                tuner.surrogate = RBFSurrogate([tuner.kp_range, tuner.ki_range, tuner.kd_range])
+            runs.append(evaluations_to_target(tuner, simulator, target, max_evals))
+        results[label] = runs
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--target', type=float, default=90.5)
+    parser.add_argument('--seeds', type=int, default=30)
+    parser.add_argument('--pop-size', type=int, default=20)
+    parser.add_argument('--max-evals', type=int, default=1000)
+    parser.add_argument('--backends', nargs='+', choices=sorted(OPTIMIZERS),
+                        help="compare these ask/tell optimizers instead")
+    args = parser.parse_args()
+
+    if args.backends:
+        results = compare_backends(args.target, args.seeds, args.backends, args.max_evals)
+    else:
+        results = compare(args.target, args.seeds, args.pop_size, args.max_evals)
+
+    print(f"Evaluations to reach cost <= {args.target} ({args.seeds} seeds)")
+    for label, runs in results.items():
+        # Runs that never reached the target count as max_evals for the median
+        counts = [r if r is not None else args.max_evals for r in runs]
+        failed = runs.count(None)
+        print(f"  {label:<10} median={statistics.median(counts):.0f} "
+              f"mean={statistics.mean(counts):.0f} not reached={failed}/{len(runs)}")
+
+
+if __name__ == "__main__":
+    main()
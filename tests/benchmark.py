@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the tuning pipeline.
+
+Times the hot paths separately against MockSerial / SimulatedMotor:
+  - CSV parsing in MotorInterface.read_response
+  - CostFunction.evaluate across response lengths
+  - a full GeneticTuner.run_generation at several population sizes
+  - simulator steps per second (scalar, batch and firmware kernel); the
+    run fails if the firmware kernel is under FIRMWARE_SPEEDUP x scalar
+  - a generation replayed from a serial recording (real rig traffic
+    with --recording, else one recorded against MockSerial)
+
+Every group runs --rounds times and keeps each case's best time;
+--compare allows --short-threshold for cases under a millisecond.
+
+Usage:
+    cd tests/
+    python3 benchmark.py --output bench.json
+    python3 benchmark.py --compare bench.json --threshold 0.10 --short-threshold 0.50
+    python3 benchmark.py --record-port /dev/ttyACM0 --recording rig.rec   # once, on the rig
+    python3 benchmark.py --only replay --recording rig.rec
+"""
+import argparse
+import contextlib
+import functools
+import gc
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.motor_interface import MotorInterface
+from interface.response_buffer import ResponseBuffer
+from interface.serial_recording import ReplaySerial, load_recording, RX
+from ai.cost_function import CostFunction
+from ai.genetic_tuner import GeneticTuner
+from simulation.batch_motor import BatchSimulatedMotor
+from simulation.firmware_motor import FirmwareSimulatedMotor
+from mock_serial import MockSerial
+from physics import SimulatedMotor
+
+RESPONSE_LENGTHS = (75, 750, 7500)
+POP_SIZES = (5, 20, 50, 100, 200)
+FIRMWARE_SPEEDUP = 50  # Required steps/s of FirmwareSimulatedMotor over SimulatedMotor
+MIN_TIME = 0.2  # Seconds every case is repeated for, at least
+SHORT_CASE = 1e-3  # Cases faster than this (seconds) are compared with --short-threshold
+
+
+def timeit(func, repeat=5, min_time=MIN_TIME):
+    """
+    Best wall time of func() in seconds (stdout silenced), over at least
+    repeat runs and at least min_time seconds of runs, so short cases get
+    enough samples for the best one to be stable.
+    """
+    samples = []
+    gc.collect()
+    gc.disable()  # As in the timeit module, so no sample pays for a collection
+    try:
+        while len(samples) < repeat or sum(samples) < min_time:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                func()
+                samples.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(samples)
+
+
+def _mock_interface():
+    motor = MotorInterface()
+    motor.ser = MockSerial('/dev/ttyBench', 115200)
+    return motor
+
+
+def _csv_stream(n):
+    lines = "".join(f"{i * 20},{400 + i % 200},600,{i % 255}\n" for i in range(n))
+    return (lines + "DONE\n").encode()
+
+
+def bench_read_response(results, lines=5000):
+    motor = _mock_interface()
+    stream = _csv_stream(lines)
+
+    def run():
+        motor.ser.response_buffer = bytearray(stream)
+        motor.read_response(timeout=1.0)
+
+    seconds = timeit(run)
+    results['read_response_csv'] = {'seconds': seconds, 'lines_per_sec': lines / seconds}
+
+
+def bench_cost_function(results):
+    cost_func = CostFunction()
+    motor = SimulatedMotor()
+    for n in RESPONSE_LENGTHS:
+        run = motor.run_simulated_test(400, 600, 2.0, 0.5, 0.1, duration=0.02 * n)
+        data = ResponseBuffer.from_columns(*run)
+        repeat = max(1, 20000 // n)
+        seconds = timeit(lambda: [cost_func.evaluate(data) for _ in range(repeat)]) / repeat
+        results[f'cost_evaluate_{n}'] = {'seconds': seconds}
+
+    # A simulator sweep scored in one call
+    batch_size = 1000
+    rng = random.Random(0)
+    firmware = FirmwareSimulatedMotor()
+    times, positions, setpoints, _ = firmware.run_batch(
+        [rng.uniform(0.1, 10.0) for _ in range(batch_size)], 0.5, 0.1, 600, 400)
+    seconds = timeit(lambda: cost_func.evaluate_many(times, positions, setpoints, lengths=firmware.lengths))
+    results[f'cost_evaluate_many{batch_size}'] = {'seconds': seconds, 'runs_per_sec': batch_size / seconds}
+
+
+def bench_run_generation(results):
+    for pop_size in POP_SIZES:
+        motor = _mock_interface()
+
+        def run():
+            random.seed(0)
+            tuner = GeneticTuner(pop_size=pop_size)
+            tuner.initialize_population()
+            tuner.run_generation(motor, setpoint=600)
+
+        with patch('time.sleep'):  # Settle waits are rig time, not host time
+            seconds = timeit(run, repeat=3)
+        results[f'run_generation_pop{pop_size}'] = {
+            'seconds': seconds, 'individuals_per_sec': pop_size / seconds}
+
+
+def bench_simulator(results, batch_size=200, rounds=7):
+    motor = SimulatedMotor()
+    steps = len(BatchSimulatedMotor.sample_times())
+
+    batch = BatchSimulatedMotor()
+    rng = random.Random(0)
+    kp = [rng.uniform(0.1, 10.0) for _ in range(batch_size)]
+    seconds = timeit(lambda: batch.run_batch(kp, 0.5, 0.1, 600, 400))
+    results[f'simulator_batch{batch_size}'] = {
+        'seconds': seconds, 'steps_per_sec': steps * batch_size / seconds}
+
+    # Scalar and firmware kernel are timed in alternating rounds, so a slow
+    # spell of the machine hits both; the speedup is the median round
+    firmware = FirmwareSimulatedMotor()
+    firmware.run_batch(kp, 0.5, 0.1, 600, 400)  # Compile outside the timing
+    scalar, kernel = [], []
+    for _ in range(rounds):
+        scalar.append(timeit(lambda: motor.run_simulated_test(400, 600, 2.0, 0.5, 0.1), repeat=20))
+        kernel.append(timeit(lambda: firmware.run_batch(kp, 0.5, 0.1, 600, 400), repeat=20))
+    speedup = statistics.median(batch_size * s / k for s, k in zip(scalar, kernel))
+    results['simulator_scalar'] = {'seconds': min(scalar), 'steps_per_sec': steps / min(scalar)}
+    results[f'simulator_firmware{batch_size}'] = {
+        'seconds': min(kernel), 'steps_per_sec': steps * batch_size / min(kernel), 'speedup': speedup}
+
+
+def replay_session(motor):
+    """The session bench_replay replays: one seeded generation of 20."""
+    tuner = GeneticTuner(pop_size=20, rng=random.Random(0))
+    tuner.initialize_population()
+    tuner.run_generation(motor, setpoint=600)
+
+
+def record_session(port, recording):
+    """Runs replay_session on the rig at port, logging its traffic to recording."""
+    motor = MotorInterface(port_cache=None)
+    motor.record = recording
+    motor.connect(port=port)
+    try:
+        replay_session(motor)
+    finally:
+        motor.close()
+
+
+def bench_replay(results, recording=None):
+    """
+    Reader path on recorded traffic, chunking and all: replay_session
+    through MotorInterface and its SerialReader, as fast as possible.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        if recording is None:
+            recording = os.path.join(tmp, 'session.rec')
+            with patch('serial.Serial', side_effect=MockSerial), patch('time.sleep'), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                record_session('/dev/ttyBench', recording)
+        lines = sum(payload.count(b"\n") for kind, _, payload in load_recording(recording) if kind == RX)
+
+        def run():
+            motor = MotorInterface(port_cache=None)
+            motor.open_port = functools.partial(ReplaySerial, speed=None)
+            motor.connect(port=recording)
+            replay_session(motor)
+            motor.close()
+
+        with patch('time.sleep'):
+            seconds = timeit(run, repeat=3)
+    results['replay_generation'] = {'seconds': seconds, 'lines_per_sec': lines / seconds}
+
+
+BENCHMARKS = {
+    'read_response': bench_read_response,
+    'cost': bench_cost_function,
+    'generation': bench_run_generation,
+    'simulator': bench_simulator,
+    'replay': bench_replay,
+}
+
+
+def run_benchmarks(names=None, benchmarks=BENCHMARKS, rounds=5):
+    """
+    Runs the groups `rounds` times over and keeps the fastest result of
+    every case. The machine's speed drifts over seconds, so repeats spread
+    across the whole run find its fast spells better than back-to-back ones.
+    """
+    results = {}
+    for i in range(rounds):
+        for name, bench in benchmarks.items():
+            if names and name not in names:
+                continue
+            print(f"Running {name} ({i + 1}/{rounds})...")
+            current = {}
+            bench(current)
+            for case, entry in current.items():
+                if case not in results or entry['seconds'] < results[case]['seconds']:
+                    results[case] = entry
+    return results
+
+
+def check_requirements(results):
+    """Returns the names of benchmarks under their required speedup."""
+    return [name for name, entry in results.items()
+            if 'speedup' in entry and entry['speedup'] < FIRMWARE_SPEEDUP]
+
+
+def compare(baseline, results, threshold, short_threshold=0.50):
+    """
+    Compares seconds per benchmark against a baseline.
+    Returns the names that got slower by more than threshold (fraction),
+    or by more than short_threshold for cases under SHORT_CASE seconds,
+    whose timings vary more from run to run.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<28}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, entry in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<28}{'-':>12}{entry['seconds']:>12.6f}{'new':>9}")
+            continue
+        change = entry['seconds'] / old['seconds'] - 1.0
+        limit = max(threshold, short_threshold) if old['seconds'] < SHORT_CASE else threshold
+        flag = ""
+        if change > limit:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28}{old['seconds']:>12.6f}{entry['seconds']:>12.6f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tuning pipeline.")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown fraction that counts as a regression (default 0.10)")
+    parser.add_argument('--short-threshold', type=float, default=0.50,
+                        help="the same for cases under 1 ms, which are noisier (default 0.50)")
+    parser.add_argument('--rounds', type=int, default=5,
+                        help="run every group this many times, keeping the fastest (default 5)")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS),
+                        help="run only these benchmark groups")
+    parser.add_argument('--recording', help="serial recording of replay_session for the replay group")
+    parser.add_argument('--record-port', help="first record replay_session on the rig at this port "
+                                              "into --recording")
+    args = parser.parse_args()
+
+    if args.record_port and not args.recording:
+        parser.error("--record-port needs --recording")
+
+    benchmarks = dict(BENCHMARKS)
+    if args.recording:
+        if args.record_port:
+            record_session(args.record_port, args.recording)
+        benchmarks['replay'] = functools.partial(bench_replay, recording=args.recording)
+    results = run_benchmarks(args.only, benchmarks, args.rounds)
+
+    for name, entry in results.items():
+        rates = ", ".join(f"{k}={v:,.0f}" for k, v in entry.items() if k != 'seconds')
+        print(f"  {name:<28}{entry['seconds']:.6f} s  {rates}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+            }, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    failed = check_requirements(results)
+    if failed:
+        print(f"\nUnder the required {FIRMWARE_SPEEDUP}x speedup: {', '.join(failed)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(baseline, results, args.threshold, args.short_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import numpy as np
+from physics import SimulatedMotor
+
+f32 = np.float32
+
+
+class FirmwarePID:
+    """Line-by-line port of firmware/potentiometer_pid/PID.h (float = float32)."""
+    def __init__(self, min_val=-255, max_val=255):
+        self.out_min = min_val
+        self.out_max = max_val
+        self.integral = f32(0)
+        self.prev_input = f32(0)
+        self.kp = self.ki = self.kd = f32(0)
+
+    def set_tunings(self, kp, ki, kd):
+        self.kp, self.ki, self.kd = f32(kp), f32(ki), f32(kd)
+
+    def reset(self, current_input):
+        self.integral = f32(0)
+        self.prev_input = f32(current_input)
+
+    def compute(self, setpoint, input, dt):
+        setpoint, input, dt = f32(setpoint), f32(input), f32(dt)
+        if dt <= 0.0:
+            return 0
+
+        error = setpoint - input
+        P = self.kp * error
+        self.integral += error * dt
+        I = self.ki * self.integral
+        d_input = (input - self.prev_input) / dt
+        D = -self.kd * d_input
+        self.prev_input = input
+
+        output = P + I + D
+        if output > self.out_max:
+            output = f32(self.out_max)
+        elif output < self.out_min:
+            output = f32(self.out_min)
+        return int(output)
+
+
+def motor_drive(pwm, min_pwm=40):
+    """Motor.h drive(): returns the PWM that actually reaches the motor."""
+    if abs(pwm) < min_pwm and pwm != 0:
+        return 0
+    return max(-255, min(255, pwm))
+
+
+def pot_read(plant):
+    """analogRead of the plant angle (ADC counts)."""
+    return min(max(int(plant.theta), 0), 1023)
+
+
+def reference_test(start_pos, setpoint, kp, ki, kd, duration_ms=1500,
+                   min_safe=50, max_safe=950, deadzone=40):
+    """
+    Runs one START test the way potentiometer_pid.ino does.
+    Returns (times, positions, setpoints, outputs) lists.
+    """
+    plant = SimulatedMotor()
+    plant.reset(start_pos)
+    pid = FirmwarePID(-255, 255)
+    pid.set_tunings(kp, ki, kd)
+    pid.reset(pot_read(plant))
+    pwm = 0
+
+    times, positions, setpoints, outputs = [], [], [], []
+    now = 0
+    while True:
+        # Next control step (20 ms later)
+        plant.step(pwm, 0.02)
+        now += 20
+
+        # loop(): safety check first
+        pos = pot_read(plant)
+        if pos < min_safe or pos > max_safe:
+            break
+        if now > duration_ms:
+            break
+
+        output = pid.compute(setpoint, pos, f32(20) / f32(1000.0))
+        pwm = motor_drive(output, deadzone)
+
+        times.append(now)
+        positions.append(pos)
+        setpoints.append(int(setpoint))
+        outputs.append(output)
+
+    return times, positions, setpoints, outputs
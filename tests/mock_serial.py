@@ -1,22 +1,31 @@
-
+import asyncio
+import threading
 import time
 from physics import SimulatedMotor
+from interface.telemetry import (encode_frame, FRAME_SAMPLE, FRAME_DONE, FRAME_HOMED,
+                                 FRAME_BEGIN, FRAME_END, FRAME_SETTLED, FRAME_SIZE)
 
 class MockSerial:
     """
     Simulates a serial connection to the Arduino.
     Intercepts commands and generates responses using the SimulatedMotor physics engine.
+    Pass motor= to use another plant, e.g. simulation.firmware_motor's
+    FirmwareSimulatedMotor, which reproduces the firmware loop (and stays
+    silent after a safety stop, like the rig).
     """
-    def __init__(self, port, baudrate, timeout=1):
+    def __init__(self, port, baudrate, timeout=1, motor=None):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.is_open = True
-        
-        self.motor = SimulatedMotor()
-        self.response_buffer = []
-        self.buffer_index = 0
-        
+
+        self.motor = motor or SimulatedMotor()
+        self.binary = False  # MODE:BIN switches telemetry to binary frames
+        self.batch = []  # Gain sets uploaded with QADD
+        self.response_buffer = bytearray(b"READY\n")  # Printed by setup() after the reset
+        # Reads block until data arrives or `timeout` passes, like pyserial
+        self._cond = threading.Condition()
+
     def write(self, data):
         """
         Simulates sending data to Arduino.
@@ -24,9 +33,14 @@ class MockSerial:
         """
         cmd = data.decode().strip()
         print(f"[MOCK SERIAL] TX: {cmd}")
-        
+
+        with self._cond:
+            self._handle_command(cmd)
+            self._cond.notify_all()
+
+    def _handle_command(self, cmd):
         if cmd.startswith("START:"):
-            # START:Kp,Ki,Kd,Setpoint
+            # START:Kp,Ki,Kd,Setpoint[,DurationMs[,Tolerance,DwellMs]]
             # Example: START:2.0,0.5,0.1,512
             try:
                 params = cmd.split(":")[1].split(",")
@@ -34,47 +48,288 @@ class MockSerial:
                 ki = float(params[1])
                 kd = float(params[2])
                 setpoint = int(params[3])
-                
-                # Run Simulation (Instant 1.5s test)
-                # Default start pos is 0, or we could track state
-                times, positions, setpoints, outputs = self.motor.run_simulated_test(
-                    start_pos=self.motor.theta, 
-                    setpoint=setpoint, 
-                    kp=kp, ki=ki, kd=kd
-                )
-                
-                # Format into CSV lines
-                self.response_buffer = []
-                for i in range(len(times)):
-                    line = f"{times[i]},{positions[i]},{setpoints[i]},{outputs[i]}\n"
-                    self.response_buffer.append(line)
-                
-                self.response_buffer.append("DONE\n")
-                self.buffer_index = 0
-                
+                duration = int(params[4]) / 1000.0 if len(params) > 4 else 1.5
+                settle = (float(params[5]), int(params[6])) if len(params) > 6 else None
+
+                self.response_buffer = bytearray()
+                self._run_test(kp, ki, kd, setpoint, duration, settle)
+                if not self._tripped():
+                    self._finish(FRAME_DONE, b"DONE\n")
+
+            except Exception as e:
+                self.response_buffer = bytearray(f"ERROR:{e}\n".encode())
+
+        elif cmd.startswith("HSTART:"):
+            # HSTART:Kp,Ki,Kd,Setpoint,HomePos,HomeKp,Tolerance,DwellMs
+            try:
+                params = [float(p) for p in cmd.split(":")[1].split(",")]
+                if len(params) != 8:
+                    raise ValueError("INVALID_FORMAT")
+                kp, ki, kd, setpoint, home_pos, home_kp, tolerance, dwell_ms = params
+
+                self.response_buffer = bytearray()
+                self._home_and_test(kp, ki, kd, int(setpoint), int(home_pos), home_kp, tolerance, dwell_ms)
+                if not self._tripped():
+                    self._finish(FRAME_DONE, b"DONE\n")
+
             except Exception as e:
-                self.response_buffer = [f"ERROR:{e}\n"]
-                self.buffer_index = 0
-                
+                self.response_buffer = bytearray(f"ERROR:{e}\n".encode())
+
+        elif cmd == "QCLEAR":
+            self.batch = []
+            self.response_buffer = bytearray(b"QUEUED:0\n")
+
+        elif cmd.startswith("QADD:"):
+            try:
+                kp, ki, kd = (float(p) for p in cmd.split(":")[1].split(","))
+                if len(self.batch) >= 32:
+                    self.response_buffer = bytearray(b"ERROR:QUEUE_FULL\n")
+                    return
+                self.batch.append((kp, ki, kd))
+                self.response_buffer = bytearray(f"QUEUED:{len(self.batch)}\n".encode())
+            except Exception:
+                self.response_buffer = bytearray(b"ERROR:INVALID_FORMAT\n")
+
+        elif cmd.startswith("QRUN:"):
+            # QRUN:Setpoint,HomePos,HomeKp,Tolerance,DwellMs
+            try:
+                setpoint, home_pos, home_kp, tolerance, dwell_ms = (
+                    float(p) for p in cmd.split(":")[1].split(","))
+                if not self.batch:
+                    raise ValueError("QUEUE_EMPTY")
+
+                self.response_buffer = bytearray()
+                for i, (kp, ki, kd) in enumerate(self.batch):
+                    if self.binary:
+                        self.response_buffer += encode_frame(FRAME_BEGIN, i, 0, 0, 0)
+                    else:
+                        self.response_buffer += f"BEGIN:{i}\n".encode()
+                    self._home_and_test(kp, ki, kd, int(setpoint), int(home_pos), home_kp, tolerance, dwell_ms)
+                    if self._tripped():
+                        break  # Safety stop cancels the rest of the batch
+                    if self.binary:
+                        self.response_buffer += encode_frame(FRAME_END, i, 0, 0, 0)
+                    else:
+                        self.response_buffer += f"END:{i}\n".encode()
+                else:
+                    self._finish(FRAME_DONE, b"BATCH_DONE\n")
+                self.batch = []
+
+            except Exception as e:
+                self.response_buffer = bytearray(f"ERROR:{e}\n".encode())
+
+        elif cmd.startswith("MODE:"):
+            self.binary = (cmd == "MODE:BIN")
+            self.response_buffer = bytearray(f"{cmd}\n".encode())
+
         elif cmd.startswith("STOP"):
-            self.response_buffer = ["STOPPED\n"]
-            self.buffer_index = 0
+            self.response_buffer = bytearray(b"STOPPED\n")
+
+    def _run_test(self, kp, ki, kd, setpoint, duration=1.5, settle=None):
+        # Run Simulation (Instant 1.5s test)
+        # Default start pos is 0, or we could track state
+        times, positions, setpoints, outputs = self.motor.run_simulated_test(
+            start_pos=self.motor.theta,
+            setpoint=setpoint,
+            kp=kp, ki=ki, kd=kd,
+            duration=duration
+        )
+        settled_at = self._settle_index(times, positions, setpoint, settle)
+        if settled_at is not None:
+            n = settled_at + 1
+            times, positions, setpoints, outputs = times[:n], positions[:n], setpoints[:n], outputs[:n]
+
+        # Format into CSV lines (or binary frames)
+        for i in range(len(times)):
+            if self.binary:
+                self.response_buffer += encode_frame(
+                    FRAME_SAMPLE, times[i], positions[i], setpoints[i], outputs[i])
+            else:
+                line = f"{times[i]},{positions[i]},{setpoints[i]},{outputs[i]}\n"
+                self.response_buffer += line.encode()
+
+        if settled_at is not None:
+            if self.binary:
+                self.response_buffer += encode_frame(
+                    FRAME_SETTLED, times[-1], positions[-1], setpoint, 0)
+            else:
+                self.response_buffer += f"SETTLED:{times[-1]}\n".encode()
+
+    @staticmethod
+    def _settle_index(times, positions, setpoint, settle):
+        """Sample after which the firmware settle detection ends the test, or None."""
+        if settle is None or settle[0] <= 0:
+            return None
+        tolerance, dwell_ms = settle
+        in_band_since = None
+        for i, (t, pos) in enumerate(zip(times, positions)):
+            if abs(pos - setpoint) <= tolerance:
+                if in_band_since is None:
+                    in_band_since = t
+            else:
+                in_band_since = None
+            if in_band_since is not None and t - in_band_since >= dwell_ms:
+                return i
+        return None
+
+    def _finish(self, frame_type, line):
+        if self.binary:
+            self.response_buffer += encode_frame(frame_type, 0, 0, 0, 0)
+        else:
+            self.response_buffer += line
+
+    def _tripped(self):
+        """True if the firmware plant hit a safety limit (it then sends nothing more)."""
+        return getattr(self.motor, 'tripped', False)
+
+    def _home_and_test(self, kp, ki, kd, setpoint, home_pos, home_kp, tolerance, dwell_ms):
+        homing_ms = self._simulate_homing(home_pos, home_kp, tolerance, dwell_ms)
+        if homing_ms is None:
+            return
+        if self.binary:
+            self.response_buffer += encode_frame(
+                FRAME_HOMED, homing_ms, int(self.motor.theta), home_pos, 0)
+        else:
+            self.response_buffer += f"HOMED:{homing_ms}\n".encode()
+        self._run_test(kp, ki, kd, setpoint)
+
+    def _simulate_homing(self, home_pos, home_kp, tolerance, dwell_ms, timeout_ms=1500, dt=0.02):
+        """
+        Emulates the firmware HOMING state: P-only loop at 50Hz that ends once
+        the position stays within tolerance for dwell_ms, or after timeout_ms.
+        Returns the homing time in ms.
+        """
+        if hasattr(self.motor, 'home'):
+            return self.motor.home(home_pos, home_kp, tolerance, dwell_ms)
+        self.motor.reset(self.motor.theta)  # Motor is at rest after the last test
+        t_ms = 0
+        in_band_since = None
+        while True:
+            t_ms += int(dt * 1000)
+            pos = int(self.motor.theta)
+            output = max(-255, min(255, int(home_kp * (home_pos - pos))))
+            self.motor.step(output, dt)
+
+            if abs(pos - home_pos) <= tolerance:
+                if in_band_since is None:
+                    in_band_since = t_ms
+            else:
+                in_band_since = None
+
+            settled = in_band_since is not None and t_ms - in_band_since >= dwell_ms
+            if settled or t_ms > timeout_ms:
+                return t_ms
+
+    @property
+    def in_waiting(self):
+        return len(self.response_buffer)
+
+    def _wait_for(self, ready):
+        deadline = time.monotonic() + (self.timeout or 0)
+        while self.is_open and not ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+    def read(self, size=1):
+        """
+        Returns up to size bytes from the simulated buffer.
+        """
+        with self._cond:
+            self._wait_for(lambda: self.response_buffer)
+            data = bytes(self.response_buffer[:size])
+            del self.response_buffer[:size]
+            return data
 
     def readline(self):
         """
         Returns the next line from the simulated buffer.
         """
-        if self.buffer_index < len(self.response_buffer):
-            line = self.response_buffer[self.buffer_index]
-            self.buffer_index += 1
-            return line.encode()
-        else:
-            return b""
+        with self._cond:
+            self._wait_for(lambda: b"\n" in self.response_buffer)
+            end = self.response_buffer.find(b"\n")
+            if end < 0:
+                end = len(self.response_buffer) - 1
+            data = bytes(self.response_buffer[:end + 1])
+            del self.response_buffer[:end + 1]
+            return data
 
     def reset_input_buffer(self):
-        self.response_buffer = []
-        self.buffer_index = 0
+        with self._cond:
+            self.response_buffer = bytearray()
 
     def close(self):
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+        print("[MOCK SERIAL] Closed.")
+
+
+
+class AsyncMockSerial(MockSerial):
+    """
+    asyncio counterpart of MockSerial, for AsyncMotorInterface: shaped
+    like the (StreamReader, StreamWriter) pair of pyserial-asyncio.
+    Responses are fed to the reader all at once, or one line (frame)
+    every line_delay seconds; 0.02 is the firmware's 50 Hz pace. A
+    command with a reply drops the rest of the previous stream, as the
+    firmware does.
+    """
+    def __init__(self, port, baudrate, motor=None, line_delay=0.0):
+        super().__init__(port, baudrate, timeout=0, motor=motor)
+        self.line_delay = line_delay
+        self.reader = asyncio.StreamReader()
+        self.commands = []  # Every command received, in order
+        self._feeder = None
+        self._send()  # READY banner
+
+    @classmethod
+    async def open_connection(cls, url, baudrate, **kwargs):
+        mock = cls(url, baudrate, **kwargs)
+        return mock.reader, mock
+
+    def write(self, data):
+        cmd = data.decode().strip()
+        print(f"[MOCK SERIAL] TX: {cmd}")
+        self.commands.append(cmd)
+        self._handle_command(cmd)
+        self._send()
+
+    def _send(self):
+        data = bytes(self.response_buffer)
+        self.response_buffer = bytearray()
+        if not data:
+            return
+        if self._feeder is not None:
+            self._feeder.cancel()
+            self._feeder = None
+        if self.line_delay:
+            self._feeder = asyncio.ensure_future(self._feed(data))
+        else:
+            self.reader.feed_data(data)
+
+    async def _feed(self, data):
+        if self.binary:
+            pieces = [data[i:i + FRAME_SIZE] for i in range(0, len(data), FRAME_SIZE)]
+        else:
+            pieces = data.splitlines(keepends=True)
+        for piece in pieces:
+            await asyncio.sleep(self.line_delay)
+            self.reader.feed_data(piece)
+
+    async def drain(self):
+        pass
+
+    def is_closing(self):
+        return not self.is_open
+
+    def close(self):
+        if self._feeder is not None:
+            self._feeder.cancel()
         self.is_open = False
+        self.reader.feed_eof()
         print("[MOCK SERIAL] Closed.")
+
+    async def wait_closed(self):
+        pass
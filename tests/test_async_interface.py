@@ -0,0 +1,147 @@
+import unittest
+import asyncio
+import contextlib
+import functools
+import io
+import random
+import sys
+import os
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.async_interface import AsyncMotorInterface
+from interface.motor_interface import MotorInterface
+from ai.genetic_tuner import GeneticTuner
+from ai.metrics import MetricsRecorder
+from mock_serial import AsyncMockSerial, MockSerial
+
+
+async def connect(line_delay=0.0, port='/dev/ttyMock'):
+    motor = AsyncMotorInterface(port_cache=None, open_connection=functools.partial(
+        AsyncMockSerial.open_connection, line_delay=line_delay))
+    with contextlib.redirect_stdout(io.StringIO()):
+        await motor.connect(port=port)
+    return motor
+
+
+class TestAsyncMotorInterface(unittest.IsolatedAsyncioTestCase):
+    async def test_read_response(self):
+        motor = await connect()
+        for binary in (False, True):
+            with self.subTest(binary=binary):
+                self.assertTrue(await motor.set_binary_mode(binary))
+                await motor.send_command(2.0, 0.1, 0.2, 512)
+                data = await motor.read_response(timeout=1.0)
+                self.assertEqual(len(data), 75)
+                self.assertEqual(data['setpoint'][-1], 512)
+                self.assertFalse(motor.timed_out)
+        await motor.close()
+
+    async def test_timeout(self):
+        motor = await connect()
+        data = await motor.read_response(timeout=0.05)
+        self.assertTrue(motor.timed_out)
+        self.assertEqual(len(data), 0)
+        await motor.close()
+
+    async def test_binary_error_reply(self):
+        """A text ERROR reply ends a binary read without waiting for the timeout."""
+        motor = await connect()
+        await motor.set_binary_mode(True)
+        await motor._send("HSTART:1.0,0.0")
+        data = await motor.read_response(timeout=3.0)
+        self.assertFalse(motor.timed_out)
+        self.assertEqual(len(data), 0)
+        self.assertEqual(motor._buf, b"")
+        await motor.close()
+
+    async def test_cancel_stops_test(self):
+        """
+        A read cancelled mid-test STOPs the firmware; the next test starts
+        clean instead of reading the leftovers of the cancelled one.
+        """
+        motor = await connect(line_delay=0.002)
+        await motor.send_command(2.0, 0.1, 0.2, 512)
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(motor.read_response(), 0.03)
+        self.assertEqual(motor.writer.commands[-1], "STOP")
+
+        await motor.send_command(2.0, 0.1, 0.2, 300)
+        data = await motor.read_response(timeout=2.0)
+        self.assertEqual(len(data), 75)
+        self.assertTrue((data['setpoint'] == 300).all())
+        await motor.close()
+
+    async def test_run_generation_matches_blocking(self):
+        """The async generation runs the same tests as run_generation."""
+        with patch('serial.Serial', side_effect=MockSerial), patch('time.sleep'), \
+                contextlib.redirect_stdout(io.StringIO()):
+            blocking = MotorInterface(port_cache=None)
+            blocking.connect(port='/dev/ttyMock')
+            tuner = GeneticTuner(pop_size=4, rng=random.Random(3))
+            tuner.initialize_population()
+            expected = [tuner.run_generation(blocking, setpoint=512).cost for _ in range(2)]
+            blocking.close()
+
+        motor = await connect()
+        tuner = GeneticTuner(pop_size=4, rng=random.Random(3))
+        tuner.initialize_population()
+        with patch('asyncio.sleep'), contextlib.redirect_stdout(io.StringIO()):
+            costs = [(await tuner.run_generation_async(motor, setpoint=512)).cost for _ in range(2)]
+        await motor.close()
+        self.assertEqual(costs, expected)
+
+    async def test_rigs_share_the_loop(self):
+        """
+        Two paced rigs test in parallel while another task keeps running
+        in the same event loop.
+        """
+        rigs = [await connect(line_delay=0.001, port=f'/dev/ttyMock{i}') for i in range(2)]
+        tuner = GeneticTuner(pop_size=4, rng=random.Random(0))
+        tuner.on_device_homing = True
+        tuner.initialize_population()
+
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.ensure_future(heartbeat())
+        with contextlib.redirect_stdout(io.StringIO()):
+            best = await tuner.run_generation_async(rigs, setpoint=512)
+        task.cancel()
+
+        self.assertNotEqual(best.cost, float('inf'))
+        starts = [sum(cmd.startswith("HSTART") for cmd in rig.writer.commands) for rig in rigs]
+        self.assertEqual(sum(starts), 4)
+        self.assertTrue(all(starts))
+        self.assertGreater(ticks, 10)
+        for rig in rigs:
+            await rig.close()
+
+    async def test_rigs_keep_separate_metrics(self):
+        """Overlapping rigs each fill their own timing record."""
+        rigs = [await connect(line_delay=0.002, port=f'/dev/ttyMock{i}') for i in range(2)]
+        metrics = MetricsRecorder()
+        tuner = GeneticTuner(pop_size=4, rng=random.Random(0), metrics=metrics)
+        tuner.on_device_homing = True
+        tuner.initialize_population()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await tuner.run_generation_async(rigs, setpoint=512)
+        for rig in rigs:
+            await rig.close()
+
+        rows = metrics.sink.individuals
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(r['lines_rx'] == 77 for r in rows))  # HOMED + 75 samples + DONE
+        self.assertEqual(metrics.sink.generations[0]['tested'], 4)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import random
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from simulation.batch_motor import BatchSimulatedMotor
+from ai.genetic_tuner import GeneticTuner
+from ai.surrogate import RBFSurrogate
+from physics import SimulatedMotor
+
+class TestBatchSimulator(unittest.TestCase):
+    def test_matches_scalar_model(self):
+        """
+        Every row of the batch result must equal the scalar
+        SimulatedMotor run with the same gains, sample for sample.
+        """
+        rng = random.Random(0)
+        gains = [(rng.uniform(0.1, 10.0), rng.uniform(0.0, 2.0), rng.uniform(0.0, 5.0))
+                 for _ in range(16)]
+        setpoints = [rng.choice([200, 512, 600, 900]) for _ in gains]
+        starts = [rng.choice([0, 400, 700]) for _ in gains]
+
+        batch = BatchSimulatedMotor()
+        times, positions, sps, outputs = batch.run_batch(
+            kp=[g[0] for g in gains], ki=[g[1] for g in gains], kd=[g[2] for g in gains],
+            setpoint=setpoints, start_pos=starts,
+        )
+
+        motor = SimulatedMotor()
+        for i, (kp, ki, kd) in enumerate(gains):
+            ref = motor.run_simulated_test(starts[i], setpoints[i], kp, ki, kd)
+            np.testing.assert_array_equal(times[i], ref[0])
+            np.testing.assert_array_equal(positions[i], ref[1])
+            np.testing.assert_array_equal(sps[i], ref[2])
+            np.testing.assert_array_equal(outputs[i], ref[3])
+
+    def test_batch_generation(self):
+        tuner = GeneticTuner(pop_size=10, mutation_rate=0.2)
+        tuner.initialize_population()
+
+        best = tuner.run_generation_batch(BatchSimulatedMotor(), setpoint=600)
+        self.assertNotEqual(best.cost, float('inf'))
+        self.assertEqual(len(best.history), 75)
+        self.assertEqual(len(tuner.population), 10)
+
+    def test_surrogate_screens_children(self):
+        tuner = GeneticTuner(pop_size=10)
+        tuner.surrogate = RBFSurrogate([tuner.kp_range, tuner.ki_range, tuner.kd_range])
+        tuner.initialize_population()
+
+        sim = BatchSimulatedMotor()
+        for _ in range(3):
+            tuner.run_generation_batch(sim)
+
+        # 10 in the first generation, then 8 children per generation
+        self.assertEqual(tuner.evaluations, 26)
+        self.assertTrue(tuner.surrogate.ready)
+        self.assertEqual(len(tuner.population), 10)
+
+        # The fitted model ranks measured points like the simulator does
+        archive = sorted(tuner.archive, key=tuner.archive.get)
+        predicted = tuner.surrogate.predict([archive[0], archive[-1]])
+        self.assertLess(predicted[0], predicted[1])
+
+if __name__ == '__main__':
+    unittest.main()
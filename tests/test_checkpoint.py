@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import random
+import tempfile
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.checkpoint import Checkpoint
+from ai.genetic_tuner import GeneticTuner
+from ai.optimizers import DEOptimizer
+
+
+class RigCrash(Exception):
+    pass
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tested = []
+        self.crash_after = None
+
+        def fake_test(tuner, interface, ind, setpoint, abort_threshold):
+            # Deterministic stand-in for a hardware test
+            if self.crash_after is not None and len(self.tested) == self.crash_after:
+                raise RigCrash()
+            self.tested.append(ind.get_genes())
+            tuner.evaluations += 1
+            ind.cost = (ind.kp - 3) ** 2 + (ind.ki - 0.5) ** 2 + (ind.kd - 1) ** 2
+            return False
+
+        self.patcher = patch.object(GeneticTuner, '_run_test', fake_test)
+        self.patcher.start()
+        self.interface = MagicMock(timed_out=False, stats={})
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def _session(self, path, generations):
+        tuner = GeneticTuner(pop_size=6, rng=random.Random(11))
+        tuner.checkpoint = Checkpoint(path)
+        tuner.initialize_population()
+        for _ in range(generations):
+            tuner.run_generation(self.interface)
+        return tuner
+
+    def test_resume_mid_generation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            reference = self._session(os.path.join(tmp, 'ref.json'), 3)
+            reference_tests = len(self.tested)
+
+            # Crash during the second generation (6 + 4 children, 3 tested)
+            self.tested = []
+            self.crash_after = 9
+            path = os.path.join(tmp, 'session.json')
+            with self.assertRaises(RigCrash):
+                self._session(path, 3)
+            self.crash_after = None
+
+            resumed = GeneticTuner(pop_size=20, rng=random.Random())  # Config comes from the file
+            checkpoint = Checkpoint(path)
+            self.assertEqual(checkpoint.restore(resumed), 2 + 3)
+            resumed.checkpoint = checkpoint
+            self.assertEqual(resumed.pop_size, 6)
+            self.assertEqual(resumed.generation, 1)
+
+            before = len(self.tested)
+            resumed.run_generation(self.interface)
+            self.assertEqual(len(self.tested) - before, 1)  # Only the untested child
+            resumed.run_generation(self.interface)
+            checkpoint.close()
+
+            self.assertEqual(len(self.tested), reference_tests)
+            self.assertEqual(resumed.evaluations, reference.evaluations)
+            self.assertEqual([i.get_genes() for i in resumed.population],
+                             [i.get_genes() for i in reference.population])
+            self.assertEqual(resumed.rng.getstate(), reference.rng.getstate())
+
+    def test_foreign_journal_entries(self):
+        """
+        Optimizer rounds are not checkpointed, and journal entries beyond
+        the snapshot's population are skipped on restore.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'session.json')
+            tuner = self._session(path, 1)
+            with self.assertRaises(Exception):
+                tuner.run_generation_optimizer(DEOptimizer(pop_size=20, seed=0), self.interface)
+
+            tuner.checkpoint.close()
+            expected = Checkpoint(path).restore(GeneticTuner(rng=random.Random()))
+            # An entry of a larger round of the same generation
+            with open(path + '.log', 'a') as f:
+                f.write('{"generation": %d, "index": 19, "kp": 1, "ki": 0, "kd": 0, '
+                        '"cost": 1.0, "aborted": false, "evaluations": 99}\n' % tuner.generation)
+
+            resumed = GeneticTuner(rng=random.Random())
+            self.assertEqual(Checkpoint(path).restore(resumed), expected)
+            self.assertEqual(len(resumed.population), 6)
+
+if __name__ == '__main__':
+    unittest.main()
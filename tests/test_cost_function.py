@@ -0,0 +1,57 @@
+import unittest
+import random
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.cost_function import CostFunction
+from interface.response_buffer import ResponseBuffer
+from physics import SimulatedMotor
+
+class TestEvaluateMany(unittest.TestCase):
+    def setUp(self):
+        # Runs of different lengths (including an empty one), padded to (N, T)
+        rng = random.Random(5)
+        motor = SimulatedMotor()
+        self.runs = []
+        for _ in range(40):
+            run = motor.run_simulated_test(rng.choice([0, 400, 800]), rng.choice([300, 600]),
+                                           rng.uniform(0.1, 10), rng.uniform(0, 2), rng.uniform(0, 5),
+                                           duration=0.02 * rng.randint(0, 75))
+            self.runs.append(ResponseBuffer.from_columns(*run))
+        self.lengths = np.array([len(run) for run in self.runs])
+        t = self.lengths.max()
+        self.arrays = {}
+        for col in ('time', 'pos', 'setpoint'):
+            block = np.full((len(self.runs), t), 999, dtype=np.int64)  # Padding must be ignored
+            for i, run in enumerate(self.runs):
+                block[i, :len(run)] = run[col]
+            self.arrays[col] = block
+
+    def test_matches_evaluate_bit_for_bit(self):
+        cost_func = CostFunction()
+        expected = [cost_func.evaluate(run) for run in self.runs]
+        by_length = cost_func.evaluate_many(self.arrays['time'], self.arrays['pos'],
+                                            self.arrays['setpoint'], lengths=self.lengths)
+        mask = np.arange(self.lengths.max()) < self.lengths[:, None]
+        by_mask = cost_func.evaluate_many(self.arrays['time'], self.arrays['pos'],
+                                          self.arrays['setpoint'], mask=mask)
+        self.assertEqual(list(by_length), expected)
+        self.assertEqual(list(by_mask), expected)
+        self.assertIn(1e6, expected)
+
+    def test_matches_streaming_cost(self):
+        # StreamingCost is an independent, sample-by-sample implementation
+        cost_func = CostFunction()
+        costs = cost_func.evaluate_many(self.arrays['time'], self.arrays['pos'],
+                                        self.arrays['setpoint'], lengths=self.lengths, samples=75)
+        for run, cost in zip(self.runs, costs):
+            stream = cost_func.stream()
+            stream.extend(run['time'], run['pos'], run['setpoint'])
+            self.assertEqual(stream.cost(75), cost)
+
+if __name__ == '__main__':
+    unittest.main()
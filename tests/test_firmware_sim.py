@@ -0,0 +1,79 @@
+import unittest
+import random
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.motor_interface import MotorInterface
+from simulation.firmware_motor import FirmwareSimulatedMotor
+from ai.genetic_tuner import GeneticTuner
+from firmware_reference import reference_test
+from mock_serial import MockSerial
+
+
+class TestFirmwareSimulator(unittest.TestCase):
+    def test_matches_reference(self):
+        """Kernel output equals the line-by-line firmware port, sample for sample."""
+        rng = random.Random(0)
+        runs = [(rng.uniform(100, 900), rng.choice([200, 400, 600, 800, 900]),
+                 rng.uniform(0.1, 10.0), rng.uniform(0.0, 2.0), rng.uniform(0.0, 5.0))
+                for _ in range(200)]
+
+        motor = FirmwareSimulatedMotor()
+        times, positions, setpoints, outputs = motor.run_batch(
+            kp=[r[2] for r in runs], ki=[r[3] for r in runs], kd=[r[4] for r in runs],
+            setpoint=[r[1] for r in runs], start_pos=[r[0] for r in runs])
+
+        tripped = 0
+        for i, run in enumerate(runs):
+            expected = reference_test(*run)
+            n = motor.lengths[i]
+            tripped += n < times.shape[1]
+            self.assertEqual(list(times[i, :n]), expected[0])
+            self.assertEqual(list(positions[i, :n]), expected[1])
+            self.assertEqual(list(setpoints[i, :n]), expected[2])
+            self.assertEqual(list(outputs[i, :n]), expected[3])
+        self.assertGreater(tripped, 0)  # Some runs hit the 50/950 safety limits
+
+    def test_deadzone_stalls_small_outputs(self):
+        # Kp=0.1 on a 300-count step gives 30 PWM: below the deadzone, no motion
+        times, positions, _, outputs = FirmwareSimulatedMotor().run_batch(0.1, 0.0, 0.0, 700, 400)
+        self.assertEqual(times[0, 0], 20)
+        self.assertTrue((positions == 400).all())
+        self.assertTrue((outputs == 30).all())
+
+    def test_batch_generation(self):
+        """The tuner scores safety-stopped runs on the samples that were sent."""
+        random.seed(3)
+        tuner = GeneticTuner(pop_size=20)
+        tuner.initialize_population()
+        tuner.population[0].kp, tuner.population[0].kd = 10.0, 0.0
+        simulator = FirmwareSimulatedMotor()
+        tuner.evaluate_population_batch(simulator, setpoint=900, home_pos=400)
+
+        self.assertLess(simulator.lengths[0], 75)
+        self.assertEqual(len(tuner.population[0].history), simulator.lengths[0])
+        self.assertTrue(all(ind.cost < float('inf') for ind in tuner.population))
+
+    def test_mock_serial(self):
+        """HSTART through MotorInterface; a safety stop ends the stream without DONE."""
+        motor = MotorInterface()
+        motor.ser = MockSerial('/dev/ttyMock', 115200, motor=FirmwareSimulatedMotor())
+        motor.ser.motor.reset(400)
+
+        motor.send_home_and_start(2.0, 0.5, 0.1, 600, 400, 1.0, 5, 100)
+        data = motor.read_response(timeout=1.0)
+        self.assertFalse(motor.timed_out)
+        self.assertEqual(len(data), 75)
+        self.assertIsNotNone(motor.last_homing_ms)
+
+        motor.ser.timeout = 0.1
+        motor.send_command(10.0, 0.0, 0.0, 1023)  # Runs straight into the 950 limit
+        data = motor.read_response(timeout=0.3)
+        self.assertTrue(motor.timed_out)
+        self.assertLess(len(data), 75)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.fitness_cache import FitnessCache
+from ai.genetic_tuner import GeneticTuner
+from simulation.batch_motor import BatchSimulatedMotor
+
+class TestFitnessCache(unittest.TestCase):
+    def test_quantized_lru_and_remeasure(self):
+        cache = FitnessCache(max_size=2, resolution=0.1, remeasure_after=2)
+        cache.put(1.00, 0.5, 0.2, 600, 400, 12.0)
+
+        # Near-identical gains hit the same entry
+        self.assertEqual(cache.get(1.02, 0.49, 0.21, 600, 400), 12.0)
+        self.assertIsNone(cache.get(1.00, 0.5, 0.2, 512, 400))  # Different setpoint
+
+        # After two hits the point must be measured again
+        self.assertEqual(cache.get(1.0, 0.5, 0.2, 600, 400), 12.0)
+        self.assertIsNone(cache.get(1.0, 0.5, 0.2, 600, 400))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+        # LRU eviction
+        cache.put(2.0, 0.0, 0.0, 600, 400, 5.0)
+        cache.put(3.0, 0.0, 0.0, 600, 400, 6.0)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(1.0, 0.5, 0.2, 600, 400))
+
+    def test_disk_backing_skips_known_individuals(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'fitness.json')
+
+            tuner = GeneticTuner(pop_size=6, cache=FitnessCache(path=path))
+            tuner.initialize_population()
+            genes = [ind.get_genes() for ind in tuner.population]
+            tuner.run_generation_batch(BatchSimulatedMotor())
+
+            # A fresh session with the same individuals never simulates
+            cache = FitnessCache(path=path)
+            self.assertEqual(len(cache), 6)
+
+            class NoSimulator:
+                def run_batch(self, **kwargs):
+                    raise AssertionError("cached individuals were re-tested")
+
+            tuner = GeneticTuner(pop_size=6, cache=cache)
+            tuner.initialize_population()
+            for ind, (kp, ki, kd) in zip(tuner.population, genes):
+                ind.kp, ind.ki, ind.kd = kp, ki, kd
+            tuner.run_generation_batch(NoSimulator())
+            self.assertEqual(cache.hits, 6)
+
+if __name__ == '__main__':
+    unittest.main()
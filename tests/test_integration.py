@@ -3,12 +3,17 @@ import unittest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import tempfile
+import time
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
 
 from interface.motor_interface import MotorInterface
-from ai.genetic_tuner import GeneticTuner
+from interface.rig_pool import RigPool
+from ai.genetic_tuner import GeneticTuner, Individual
+from ai.metrics import MetricsRecorder
+from ai.cost_function import CostFunction
 from mock_serial import MockSerial
 
 class TestIntegration(unittest.TestCase):
@@ -62,5 +67,241 @@ class TestIntegration(unittest.TestCase):
         motor.close()
         print("--- Test Passed ---")
 
+    def test_rig_pool_survives_failed_rig(self):
+        """
+        Runs a generation across three simulated rigs, one of which drops
+        out. Every individual must still be evaluated by a healthy rig.
+        """
+        rigs = []
+        for i in range(3):
+            motor = MotorInterface()
+            motor.connect(port=f'/dev/ttyMock{i}')
+            rigs.append(motor)
+
+        def broken_write(data):
+            raise IOError("device disconnected")
+        rigs[1].ser.write = broken_write
+
+        pool = RigPool(rigs)
+        tuner = GeneticTuner(pop_size=6, mutation_rate=0.2)
+        tuner.initialize_population()
+
+        best = tuner.run_generation_pool(pool, setpoint=512)
+
+        self.assertNotEqual(best.cost, float('inf'))
+        self.assertEqual(pool.retired, [rigs[1]])
+        self.assertTrue(all(ind.cost != float('inf') for ind in tuner.population[:2]))
+
+        for motor in rigs:
+            motor.close()
+
+    def test_rig_pool_moves_failed_job(self):
+        """
+        A rig allowed several failures does not retry the job it just
+        failed; a healthy rig takes it.
+        """
+        rigs = [MagicMock(port=name, timed_out=False) for name in ('bad', 'good')]
+        attempts = []
+
+        def test(rig, job):
+            attempts.append((rig.port, job))
+            rig.timed_out = rig.port == 'bad'
+
+        pool = RigPool(rigs, max_failures=3)
+        pool.run([0], test)
+
+        self.assertEqual(attempts[-1], ('good', 0))
+        self.assertLessEqual(attempts.count(('bad', 0)), 1)
+        self.assertEqual(pool.retired, [])
+
+    def test_rig_pool_early_abort(self):
+        """run_generation_pool passes the early-abort threshold like run_generation."""
+        tuner = GeneticTuner(pop_size=6)
+        tuner.early_abort = True
+        tuner.initialize_population()
+        for cost, ind in enumerate(tuner.population[:4]):
+            ind.cost = float(cost + 1)
+
+        def evaluate(rig, ind, setpoint, abort_threshold=None):
+            ind.cost = 10.0
+
+        with patch.object(tuner, 'evaluate_individual', side_effect=evaluate) as run:
+            tuner.run_generation_pool(RigPool([MagicMock(timed_out=False)]), setpoint=512)
+
+        self.assertEqual(run.call_count, 2)
+        self.assertTrue(all(call.args[3] == 4.0 for call in run.call_args_list))
+
+    def test_phase_metrics(self):
+        """
+        Every tested individual gets a timing record, and each generation
+        a summary with the serial counters.
+        """
+        motor = MotorInterface()
+        motor.connect(port='/dev/ttyMock')
+
+        metrics = MetricsRecorder()
+        tuner = GeneticTuner(pop_size=4, metrics=metrics)
+        tuner.initialize_population()
+        tuner.run_generation(motor, setpoint=512)
+        motor.close()
+
+        rows = metrics.sink.individuals
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(r['settle'] >= 0.3 and r['test'] > 0 for r in rows))
+        self.assertTrue(all(r['lines_rx'] == 76 * 2 for r in rows))  # Homing + test, incl. DONE
+
+        summary = metrics.sink.generations[0]
+        self.assertEqual(summary['tested'], 4)
+        self.assertEqual(summary['timeouts'], 0)
+        self.assertEqual(summary['lines_rx'], sum(r['lines_rx'] for r in rows))
+
+    def test_on_device_homing(self):
+        """
+        HSTART replaces the separate homing run and settle sleep: one
+        command per individual, and homing ends once the dwell is met.
+        """
+        motor = MotorInterface()
+        motor.connect(port='/dev/ttyMock')
+
+        metrics = MetricsRecorder()
+        tuner = GeneticTuner(pop_size=4, metrics=metrics)
+        tuner.on_device_homing = True
+        tuner.home_tolerance = 1023  # Always "in band": homing ends after the dwell
+        tuner.initialize_population()
+
+        with patch.object(motor.ser, 'write', wraps=motor.ser.write) as write:
+            tuner.run_generation(motor, setpoint=512)
+        motor.close()
+
+        self.assertEqual(write.call_count, 4)
+        self.assertEqual(motor.last_homing_ms, 120)  # First in-band sample at 20 ms + 100 ms dwell
+        rows = metrics.sink.individuals
+        self.assertTrue(all(r['settle'] == 0 and r['homing'] == 0.12 for r in rows))
+        self.assertTrue(all(len(ind.history) == 75 for ind in tuner.population[:2]))
+
+    def test_device_batch(self):
+        """
+        QRUN results are split per gain set and match testing the same
+        individuals one HSTART at a time, in ASCII and binary mode.
+        """
+        for binary in (False, True):
+            with self.subTest(binary=binary):
+                single, batched = GeneticTuner(pop_size=5), GeneticTuner(pop_size=5)
+                single.on_device_homing = True
+                single.initialize_population()
+                batched.population = [Individual(*ind.get_genes()) for ind in single.population]
+
+                motor = MotorInterface()
+                motor.connect(port='/dev/ttyMock')
+                motor.set_binary_mode(binary)
+                for ind in single.population:
+                    single.evaluate_individual(motor, ind, setpoint=512)
+                motor.close()
+
+                motor = MotorInterface()
+                motor.connect(port='/dev/ttyMock')
+                motor.set_binary_mode(binary)
+                motor.max_batch = 3  # Two QRUNs for five individuals
+                batched.evaluate_population_device(motor, setpoint=512)
+                motor.close()
+
+                self.assertEqual(batched.evaluations, 5)
+                for a, b in zip(single.population, batched.population):
+                    self.assertEqual(len(b.history), 75)
+                    self.assertEqual(a.cost, b.cost)
+
+    def test_device_batch_metrics(self):
+        """Every set of a QRUN gets its own timing record with its homing time."""
+        motor = MotorInterface()
+        motor.connect(port='/dev/ttyMock')
+        motor.max_batch = 3
+        before = dict(motor.stats)
+
+        metrics = MetricsRecorder()
+        tuner = GeneticTuner(pop_size=5, metrics=metrics)
+        tuner.home_tolerance = 1023  # Homing ends after the dwell
+        tuner.initialize_population()
+        tuner.run_generation_device(motor, setpoint=512)
+        motor.close()
+
+        rows = metrics.sink.individuals
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(all(r['homing'] == 0.12 and r['total'] > 0 for r in rows))
+        summary = metrics.sink.generations[0]
+        self.assertEqual(summary['tested'], 5)
+        self.assertEqual(summary['lines_rx'], motor.stats['lines_rx'] - before['lines_rx'])
+
+    def test_settle_detection(self):
+        """
+        With a settle band the test ends once the response has settled, and
+        the shortened run scores about the same as the full-length one.
+        """
+        for binary in (False, True):
+            with self.subTest(binary=binary):
+                motor = MotorInterface()
+                motor.connect(port='/dev/ttyMock')
+                motor.set_binary_mode(binary)
+
+                motor.ser.motor.reset(400)
+                motor.send_command(20.0, 0.0, 5.0, 512)
+                full = motor.read_response(timeout=3.0)
+                motor.ser.motor.reset(400)
+                motor.send_command(20.0, 0.0, 5.0, 512, settle_tolerance=5, settle_dwell_ms=200)
+                short = motor.read_response(timeout=3.0)
+                motor.close()
+
+                self.assertIsNone(full.settled_ms)
+                self.assertEqual(short.settled_ms, short['time'][-1])
+                self.assertLess(len(short), len(full))
+                cost = CostFunction()
+                self.assertAlmostEqual(cost.evaluate(short, samples=len(full)), cost.evaluate(full),
+                                       delta=0.01 * cost.evaluate(full))
+
+    def test_binary_error_reply(self):
+        """A text ERROR reply ends a binary read at once instead of at the timeout."""
+        motor = MotorInterface()
+        motor.connect(port='/dev/ttyMock')
+        motor.set_binary_mode(True)
+
+        start = time.monotonic()
+        motor.ser.write(b"HSTART:1.0,0.0\n")
+        data = motor.read_response(timeout=3.0)
+        responses, homing_ms = motor.run_batch([], 512, 400, timeout=3.0)  # QUEUE_EMPTY
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertFalse(motor.timed_out)
+        self.assertEqual(len(data), 0)
+        self.assertEqual(responses, [])
+
+        # Tests still run afterwards
+        motor.send_command(2.0, 0.1, 0.2, 512)
+        self.assertEqual(len(motor.read_response(timeout=3.0)), 75)
+        motor.close()
+
+    def test_connect_waits_for_ready_and_caches_port(self):
+        """
+        connect() returns on the READY banner instead of sleeping, and a
+        restart reuses the port the rig was found on without scanning.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = os.path.join(tmp, 'ports.json')
+            motor = MotorInterface(rig='bench', port_cache=cache)
+            start = time.monotonic()
+            motor.connect()
+            self.assertLess(time.monotonic() - start, 1.0)
+            motor.close()
+            self.assertEqual(self.mock_ports.call_count, 1)
+
+            motor = MotorInterface(rig='bench', port_cache=cache)
+            motor.connect()
+            motor.close()
+            self.assertEqual(self.mock_ports.call_count, 1)
+            self.assertEqual(motor.port, '/dev/ttyMock')
+
+            # Another rig has no entry yet and scans
+            other = MotorInterface(rig='other', port_cache=cache)
+            other.connect()
+            other.close()
+            self.assertEqual(self.mock_ports.call_count, 2)
+
 if __name__ == '__main__':
     unittest.main()
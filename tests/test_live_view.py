@@ -0,0 +1,54 @@
+import unittest
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.genetic_tuner import Individual
+from interface.live_view import LivePublisher, LiveViewer
+from interface.response_buffer import ResponseBuffer
+from physics import SimulatedMotor
+
+ADDRESS = ('127.0.0.1', 57601)
+
+
+class TestLiveView(unittest.TestCase):
+    def _best(self, cost, samples=75):
+        ind = Individual(2.0, 0.5, 0.1)
+        ind.cost = cost
+        run = SimulatedMotor().run_simulated_test(400, 600, 2.0, 0.5, 0.1, duration=0.02 * samples)
+        ind.history = ResponseBuffer.from_columns(*run)
+        return ind
+
+    def test_publish_without_viewer(self):
+        """Nothing listening: publishing neither blocks nor raises."""
+        publisher = LivePublisher(ADDRESS)
+        start = time.perf_counter()
+        for gen in range(100):
+            publisher.publish(gen, self._best(100.0 - gen), evaluations=gen * 20)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        publisher.close()
+
+    def test_viewer_receives_history(self):
+        viewer = LiveViewer(ADDRESS)
+        publisher = LivePublisher(ADDRESS, max_points=100)
+        self.assertFalse(viewer.poll())
+
+        publisher.publish(0, self._best(90.0), evaluations=20)
+        publisher.publish(1, self._best(85.0, samples=500), evaluations=38)
+        time.sleep(0.05)
+        self.assertTrue(viewer.poll())
+
+        msg = viewer.latest
+        self.assertEqual(msg['generation'], 1)
+        self.assertEqual(msg['history'], [[0, 20, 90.0], [1, 38, 85.0]])
+        self.assertLessEqual(len(msg['trace']['pos']), 100)  # Decimated from ~500
+        self.assertEqual(msg['gains'], [2.0, 0.5, 0.1])
+
+        viewer.close()
+        publisher.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import random
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.genetic_tuner import GeneticTuner
+from ai.optimizers import OPTIMIZERS, GAOptimizer
+from simulation.batch_motor import BatchSimulatedMotor
+from simulation.sim_runner import evaluations_to_target, optimizer_evaluations_to_target
+
+RANGES = ((0.5, 3.0), (0.1, 0.2), (1.0, 4.0))
+
+
+class TestAskTell(unittest.TestCase):
+    def test_every_backend_stays_in_ranges(self):
+        for name, backend in OPTIMIZERS.items():
+            with self.subTest(backend=name):
+                optimizer = backend(RANGES, seed=1)
+                for _ in range(30):
+                    genes = np.array(optimizer.ask())
+                    self.assertTrue(np.all(genes >= [r[0] for r in RANGES]))
+                    self.assertTrue(np.all(genes <= [r[1] for r in RANGES]))
+                    # Optimum outside the box pushes the search against the bounds
+                    optimizer.tell(np.sum((genes - [10.0, -1.0, 0.0]) ** 2, axis=1))
+                self.assertLess(optimizer.best_cost, float('inf'))
+
+    def test_tell_must_follow_ask(self):
+        optimizer = OPTIMIZERS['de'](seed=0)
+        with self.assertRaises(Exception):
+            optimizer.tell([1.0])
+        optimizer.ask()
+        with self.assertRaises(Exception):
+            optimizer.ask()
+
+    def test_ga_backend_is_the_genetic_tuner(self):
+        simulator = BatchSimulatedMotor()
+        for seed in range(3):
+            tuner = GeneticTuner(rng=random.Random(seed))
+            expected = evaluations_to_target(tuner, simulator, 90.5, max_evals=400)
+            self.assertEqual(optimizer_evaluations_to_target(GAOptimizer(seed=seed), simulator,
+                                                             90.5, max_evals=400), expected)
+
+    def test_cmaes_and_de_need_fewer_evaluations(self):
+        simulator = BatchSimulatedMotor()
+        used = {}
+        for name in OPTIMIZERS:
+            runs = [optimizer_evaluations_to_target(OPTIMIZERS[name](seed=seed), simulator,
+                                                    90.5, max_evals=600) for seed in range(8)]
+            used[name] = sum(600 if r is None else r for r in runs)
+        self.assertLess(used['cmaes'], used['ga'] / 2)
+        self.assertLess(used['de'], used['ga'] / 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.response_buffer import ResponseBuffer
+from ai.cost_function import CostFunction
+from physics import SimulatedMotor
+
+class TestResponseBuffer(unittest.TestCase):
+    def test_grows_and_matches_dataframe_cost(self):
+        times, positions, setpoints, outputs = SimulatedMotor().run_simulated_test(
+            start_pos=400, setpoint=600, kp=2.0, ki=0.5, kd=0.1)
+
+        data = ResponseBuffer(capacity=4)
+        for row in zip(times, positions, setpoints, outputs):
+            data.append(*row)
+
+        self.assertEqual(len(data), len(times))
+        np.testing.assert_array_equal(data['pos'], positions)
+
+        df = data.to_dataframe()
+        self.assertEqual(list(df.columns), ['time', 'pos', 'setpoint', 'output'])
+
+        cost = CostFunction()
+        self.assertEqual(cost.evaluate(data), cost.evaluate(df))
+
+    def test_empty_run_is_penalized(self):
+        self.assertTrue(ResponseBuffer().empty)
+        self.assertEqual(CostFunction().evaluate(ResponseBuffer()), 1e6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.motor_interface import MotorInterface
+from interface.response_buffer import ResponseBuffer
+from ai.cost_function import CostFunction
+from ai.genetic_tuner import GeneticTuner, Individual
+from ai.scenario import ScenarioPlan
+from ai.system_id import PlantIdentifier
+from simulation.firmware_motor import FirmwareSimulatedMotor
+from mock_serial import MockSerial
+from physics import SimulatedMotor
+
+
+class TestScenarioPlan(unittest.TestCase):
+    def test_steps_are_chained(self):
+        """Both directions between three points need a single homing move."""
+        plan = ScenarioPlan.from_points([300, 500, 700])
+        order = plan.compile()
+
+        self.assertEqual(len(order), 6)
+        self.assertEqual(plan.moves, [True] + [False] * 5)
+        for prev, step in zip(order, order[1:]):
+            self.assertEqual(prev.setpoint, step.home)
+        self.assertEqual(plan.total_time(order), plan.home_overhead_ms + 6 * 1500)
+
+    def test_greedy_order_for_large_plans(self):
+        plan = ScenarioPlan.from_points([200, 400, 600, 800], exact_limit=4)
+        plan.add_disturbance(500, amplitude=30)
+        order = plan.compile(start_pos=200)
+
+        self.assertEqual(len(order), 14)
+        self.assertLess(plan.total_time(order, 200), plan.total_time(plan.steps, 200))
+        self.assertLessEqual(sum(plan.moves), 3)
+
+    def test_weighted_cost(self):
+        motor = SimulatedMotor()
+        runs = [ResponseBuffer.from_columns(*motor.run_simulated_test(400, sp, 2.0, 0.5, 0.1))
+                for sp in (600, 200)]
+        cost_func = CostFunction()
+        expected = (1.0 * cost_func.evaluate(runs[0]) + 3.0 * cost_func.evaluate(runs[1])) / 4.0
+        self.assertAlmostEqual(cost_func.evaluate_scenario(runs, [1.0, 3.0]), expected)
+
+        runs[1] = ResponseBuffer()  # Failed step
+        self.assertGreater(cost_func.evaluate_scenario(runs, [1.0, 3.0]), 1e5)
+
+    def test_tuner_runs_plan(self):
+        motor = MotorInterface()
+        motor.ser = MockSerial('/dev/ttyMock', 115200)
+
+        tuner = GeneticTuner(pop_size=2)
+        tuner.scenario = ScenarioPlan.from_points([300, 700], duration=1000)
+        tuner.scenario.add_disturbance(700, amplitude=-40, duration=500, weight=0.5)
+        ind = Individual(2.0, 0.5, 0.1)
+
+        with patch('time.sleep'), \
+                patch.object(motor.ser, 'write', wraps=motor.ser.write) as write:
+            tuner.evaluate_individual(motor, ind)
+
+        commands = [c.args[0].decode() for c in write.call_args_list]
+        self.assertEqual(len(commands), 5)  # One homing run, four chained tests
+        self.assertTrue(commands[1].strip().endswith(",1000") or commands[1].strip().endswith(",500"))
+        self.assertEqual(len(ind.history), 50 + 50 + 25 + 25)
+        self.assertTrue((ind.history['time'][1:] > ind.history['time'][:-1]).all())
+        self.assertLess(ind.cost, 1e5)
+
+    def test_settle_detection_per_step(self):
+        """
+        Settled steps end early and are scored over their own length, so
+        the plan costs about the same as with full-length steps.
+        """
+        costs = {}
+        for tolerance in (None, 5):
+            motor = MotorInterface()
+            motor.ser = MockSerial('/dev/ttyMock', 115200)
+            tuner = GeneticTuner(pop_size=2)
+            tuner.scenario = ScenarioPlan.from_points([400, 512], duration=1200)
+            tuner.settle_tolerance = tolerance
+            ind = Individual(20.0, 0.0, 5.0)
+            with patch('time.sleep'), \
+                    patch.object(motor.ser, 'write', wraps=motor.ser.write) as write:
+                tuner.evaluate_individual(motor, ind)
+            costs[tolerance] = ind.cost
+            tests = [c.args[0].decode().strip() for c in write.call_args_list][1:]
+            if tolerance is not None:
+                self.assertTrue(all(t.endswith(",1200,5,200") for t in tests))
+                self.assertLess(len(ind.history), 2 * 60)
+        self.assertAlmostEqual(costs[5], costs[None], delta=0.01 * costs[None])
+
+        # HSTART has no settle detection
+        tuner.scenario = None
+        tuner.on_device_homing = True
+        with self.assertRaises(Exception):
+            tuner.evaluate_individual(motor, Individual(2.0, 0.5, 0.1))
+
+    def test_identifier_gets_steps_separately(self):
+        """The idle time between steps is not in the trace, so steps are fitted apart."""
+        motor = MotorInterface()
+        motor.ser = MockSerial('/dev/ttyMock', 115200)
+        tuner = GeneticTuner(pop_size=2)
+        tuner.scenario = ScenarioPlan.from_points([300, 700], duration=1000)
+        tuner.identifier = PlantIdentifier()
+        with patch('time.sleep'):
+            tuner.evaluate_individual(motor, Individual(2.0, 0.5, 0.1))
+        self.assertEqual([len(pos) for pos, _ in tuner.identifier.segments], [50, 50])
+
+    def test_simulated_plan(self):
+        """
+        evaluate_population_batch scores the plan's steps, chained where the
+        plan chains them, like running them one by one.
+        """
+        plan = ScenarioPlan.from_points([300, 700], duration=1000)
+        plan.add_disturbance(700, amplitude=-40, duration=500, weight=0.5)
+        steps, moves = plan.compiled()
+        tuner = GeneticTuner(pop_size=3)
+        tuner.scenario = plan
+        tuner.population = [Individual(2.0, 0.5, 0.1), Individual(0.5, 0.0, 0.0),
+                            Individual(6.0, 1.0, 2.0)]
+        simulator = FirmwareSimulatedMotor()
+        tuner.evaluate_population_batch(simulator)
+
+        cost_func = CostFunction()
+        for ind in tuner.population:
+            runs, pos = [], None
+            for step, move in zip(steps, moves):
+                start = step.home if move else pos
+                run = ResponseBuffer.from_columns(*(column[0] for column in simulator.run_batch(
+                    ind.kp, ind.ki, ind.kd, step.setpoint, start, duration=step.duration / 1000.0)))
+                runs.append(run)
+                pos = run['pos'][-1]
+            expected = cost_func.evaluate_scenario(runs, [step.weight for step in steps])
+            self.assertAlmostEqual(ind.cost, expected)
+            self.assertEqual(len(ind.history), sum(len(run) for run in runs))
+        self.assertEqual(tuner.evaluations, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.serial_reader import SerialReader
+from mock_serial import MockSerial
+
+class TestSerialReader(unittest.TestCase):
+    def test_lines_across_chunks_and_deadline(self):
+        ser = MockSerial('/dev/ttyMock', 115200, timeout=0.2)
+        ser.reset_input_buffer()  # Drop the READY banner
+        reader = SerialReader(ser)
+
+        # Bytes arrive split mid-line
+        with ser._cond:
+            ser.response_buffer += b"0,400,600,2"
+            ser._cond.notify_all()
+        self.assertEqual(reader.readline(timeout=0.1), b"")
+        with ser._cond:
+            ser.response_buffer += b"55\n20,410,600,255\nDONE\n"
+            ser._cond.notify_all()
+
+        self.assertEqual(reader.readline(timeout=1.0), b"0,400,600,255\n")
+        self.assertEqual(reader.readline(timeout=1.0), b"20,410,600,255\n")
+        self.assertEqual(reader.readline(timeout=1.0), b"DONE\n")
+
+        # Nothing more: blocks for the deadline, not forever
+        start = time.monotonic()
+        self.assertEqual(reader.readline(timeout=0.1), b"")
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+        reader.stop()
+        ser.close()
+        reader.join()
+
+if __name__ == '__main__':
+    unittest.main()
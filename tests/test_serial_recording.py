@@ -0,0 +1,114 @@
+import unittest
+import contextlib
+import functools
+import io
+import random
+import sys
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.motor_interface import MotorInterface
+from interface.serial_recording import RecordingSerial, ReplaySerial, load_recording, TX
+from ai.genetic_tuner import GeneticTuner
+from mock_serial import MockSerial
+
+START = b"START:2.0,0.1,0.2,512\n"
+
+
+def record_paced_test(path, line_delay):
+    """Records one test read line by line, line_delay apart (a rig at a slower pace)."""
+    ser = RecordingSerial(MockSerial('/dev/ttyMock', 115200), path)
+    ser.reset_input_buffer()  # Drop the READY banner
+    with contextlib.redirect_stdout(io.StringIO()):
+        ser.write(START)
+    lines = []
+    while not lines or lines[-1] != b"DONE\n":
+        time.sleep(line_delay)
+        lines.append(ser.readline())
+    ser.close()
+    return lines
+
+
+def replay_test(path, speed):
+    ser = ReplaySerial(path, 115200, timeout=1.0, speed=speed)
+    ser.reset_input_buffer()
+    start = time.monotonic()
+    ser.write(START)
+    lines = []
+    while not lines or lines[-1] != b"DONE\n":
+        lines.append(ser.readline())
+    return lines, time.monotonic() - start
+
+
+class TestSerialRecording(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'session.rec')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_reproduces_generation(self):
+        """
+        A generation recorded on the (mock) rig replays through
+        MotorInterface to the same costs, with no rig attached.
+        """
+        def generation(motor):
+            tuner = GeneticTuner(pop_size=4, rng=random.Random(5))
+            tuner.initialize_population()
+            best = tuner.run_generation(motor, setpoint=512)
+            # Children are bred from the measured costs
+            return best.cost, [ind.get_genes() for ind in tuner.population]
+
+        with patch('time.sleep'), contextlib.redirect_stdout(io.StringIO()):
+            with patch('serial.Serial', side_effect=MockSerial):
+                motor = MotorInterface(port_cache=None)
+                motor.record = self.path
+                motor.connect(port='/dev/ttyMock')
+                recorded = generation(motor)
+                motor.close()
+
+            motor = MotorInterface(port_cache=None)
+            motor.open_port = functools.partial(ReplaySerial, speed=None)
+            motor.connect(port=self.path)
+            replayed = generation(motor)
+            remaining = motor.ser.remaining
+            motor.close()
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(remaining, 0)
+
+    def test_replay_keeps_recorded_pacing(self):
+        lines = record_paced_test(self.path, 0.004)
+
+        paced, seconds = replay_test(self.path, speed=1.0)
+        self.assertEqual(paced, lines)
+        self.assertGreater(seconds, 0.25)  # 76 lines x 4 ms
+
+        fast, seconds = replay_test(self.path, speed=None)
+        self.assertEqual(fast, lines)
+        self.assertLess(seconds, 0.1)
+
+    def test_divergence_and_torn_file(self):
+        record_paced_test(self.path, 0.0)
+        events = load_recording(self.path)
+        self.assertEqual(sum(kind == TX for kind, _, _ in events), 1)
+
+        ser = ReplaySerial(self.path, 115200, speed=None)
+        ser.reset_input_buffer()
+        with self.assertRaises(Exception):
+            ser.write(b"START:9.0,0.1,0.2,512\n")
+
+        # A crash while recording leaves a partial last record
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        self.assertEqual(len(load_recording(self.path)), len(events) - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+import random
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.cost_function import CostFunction
+from ai.genetic_tuner import GeneticTuner, Individual
+from interface.motor_interface import MotorInterface
+from interface.response_buffer import ResponseBuffer
+from mock_serial import MockSerial
+from physics import SimulatedMotor
+
+class TestStreamingCost(unittest.TestCase):
+    def test_matches_evaluate_and_bounds_final_cost(self):
+        rng = random.Random(3)
+        cost_func = CostFunction()
+        motor = SimulatedMotor()
+        for _ in range(50):
+            run = motor.run_simulated_test(rng.choice([0, 400, 800]), rng.choice([300, 600]),
+                                           rng.uniform(0.1, 10), rng.uniform(0, 2), rng.uniform(0, 5))
+            buffer = ResponseBuffer.from_columns(*run)
+            final = cost_func.evaluate(buffer)
+
+            stream = cost_func.stream(max_samples=76)
+            for t, pos, sp, _ in zip(*run):
+                stream.update(t, pos, sp)
+                self.assertLessEqual(stream.lower_bound(), final)
+            self.assertEqual(stream.cost(), final)
+            # Settled run cut short: the missing samples count as zero error
+            self.assertEqual(stream.cost(100), cost_func.evaluate(buffer, samples=100))
+
+    def test_hopeless_test_is_stopped_early(self):
+        with patch('serial.Serial', side_effect=MockSerial), patch('time.sleep'):
+            motor = MotorInterface()
+            motor.connect(port='/dev/ttyMock')
+
+            tuner = GeneticTuner()
+            ind = Individual(0.1, 0.0, 0.0)
+            tuner.evaluate_individual(motor, ind, setpoint=600, abort_threshold=1.0)
+            motor.close()
+
+        self.assertTrue(ind.aborted)
+        self.assertGreater(ind.cost, 1.0)
+        self.assertLess(len(ind.history), 75)
+
+if __name__ == '__main__':
+    unittest.main()
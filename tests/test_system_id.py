@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch
+import contextlib
+import io
+import random
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.genetic_tuner import GeneticTuner
+from ai.scenario import ScenarioPlan
+from ai.system_id import PlantIdentifier
+from interface.motor_interface import MotorInterface
+from interface.response_buffer import ResponseBuffer
+from simulation.firmware_motor import FirmwareSimulatedMotor
+from mock_serial import MockSerial
+
+
+def rig_plant():
+    """'Hardware' for these tests: a plant unlike the defaults, with lag."""
+    plant = FirmwareSimulatedMotor(b=0.0005, Kt=0.4, deadzone=30, delay=1, min_safe=-1, max_safe=2000)
+    plant.reset(400)
+    return plant
+
+
+class TestPlantIdentifier(unittest.TestCase):
+    def test_recovers_plant_from_traces(self):
+        plant = rig_plant()
+        rng = np.random.default_rng(1)
+        n = 5
+        times, positions, setpoints, outputs = plant.run_batch(
+            rng.uniform(0.5, 5, n), rng.uniform(0, 1, n), rng.uniform(0, 0.3, n), [600] * n, [400] * n)
+
+        identifier = PlantIdentifier()
+        for row in zip(times, positions, setpoints, outputs):
+            identifier.add(ResponseBuffer.from_columns(*row))
+        fit = identifier.fit()
+
+        self.assertAlmostEqual(fit.Kt, 0.4, delta=0.01)
+        self.assertAlmostEqual(fit.b, 0.0005, delta=0.00005)
+        self.assertEqual(fit.delay, 1)
+        self.assertLessEqual(abs(fit.deadzone - 30), 10)
+        self.assertLess(fit.rms, 1.0)  # ADC quantization only
+
+    def test_scenario_traces_are_split_at_time_jumps(self):
+        identifier = PlantIdentifier()
+        time = [20, 40, 60, 80, 1600, 1620, 1640]
+        identifier.add(ResponseBuffer.from_columns(time, [400] * 7, [500] * 7, [0] * 7))
+        self.assertEqual([len(pos) for pos, _ in identifier.segments], [4, 3])
+
+
+class TestModelAssistedTuning(unittest.TestCase):
+    def tune(self, model, max_evaluations):
+        with patch('serial.Serial', side_effect=lambda *a, **k: MockSerial(*a, motor=rig_plant(), **k)), \
+                patch('time.sleep'), contextlib.redirect_stdout(io.StringIO()):
+            motor = MotorInterface(port_cache=None)
+            motor.connect(port='/dev/ttyMock')
+            tuner = GeneticTuner(pop_size=20, rng=random.Random(0))
+            tuner.on_device_homing = True
+            tuner.home_kp = 5.0
+            tuner.home_tolerance = 3
+            if model:
+                tuner.identifier = PlantIdentifier()
+            tuner.initialize_population()
+            while tuner.evaluations < max_evaluations:
+                if model:
+                    best = tuner.run_generation_model(motor, setpoint=450)
+                else:
+                    best = tuner.run_generation(motor, setpoint=450)
+            motor.close()
+        return tuner, best
+
+    def test_fewer_hardware_tests_for_the_same_result(self):
+        plain, plain_best = self.tune(False, 380)
+        assisted, assisted_best = self.tune(True, 38)
+        # One hardware generation, then 3 confirmations per generation
+        self.assertEqual(assisted.evaluations, 38)
+        self.assertGreaterEqual(plain.evaluations, 10 * assisted.evaluations)
+        self.assertLessEqual(assisted_best.cost, plain_best.cost)
+
+    def test_model_ranks_on_the_scenario(self):
+        """With a scenario plan the model GA simulates its steps, the objective the rig confirms."""
+        simulate = GeneticTuner._simulate_scenario
+        with patch('serial.Serial', side_effect=lambda *a, **k: MockSerial(*a, motor=rig_plant(), **k)), \
+                patch('time.sleep'), contextlib.redirect_stdout(io.StringIO()), \
+                patch.object(GeneticTuner, '_simulate_scenario', autospec=True,
+                             side_effect=simulate) as simulated:
+            motor = MotorInterface(port_cache=None)
+            motor.connect(port='/dev/ttyMock')
+            tuner = GeneticTuner(pop_size=6, rng=random.Random(0))
+            tuner.scenario = ScenarioPlan.from_points([400, 500], duration=1000)
+            tuner.identifier = PlantIdentifier(min_samples=100)
+            tuner.initialize_population()
+            tuner.run_generation_model(motor)  # Not fitted yet: plain generation
+            tuner.run_generation_model(motor, model_generations=2)
+            motor.close()
+        self.assertGreater(simulated.call_count, 0)
+        self.assertEqual(tuner.evaluations, 6 + 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
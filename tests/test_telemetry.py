@@ -0,0 +1,45 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from interface.motor_interface import MotorInterface
+from interface.telemetry import encode_frame, decode_frames, FRAME_SAMPLE
+from mock_serial import MockSerial
+
+class TestTelemetry(unittest.TestCase):
+    def test_decode_resyncs_after_garbage(self):
+        good = [encode_frame(FRAME_SAMPLE, 20 * i, 400 + i, 600, -i) for i in range(5)]
+        corrupt = bytearray(good[2])
+        corrupt[5] ^= 0xFF  # Breaks the CRC
+
+        stream = b"\x00\xa5junk" + good[0] + good[1] + bytes(corrupt) + good[3] + good[4][:4]
+        frames, consumed = decode_frames(bytearray(stream))
+
+        self.assertEqual(list(frames['time']), [0, 20, 60])
+        self.assertEqual(list(frames['output']), [0, -1, -3])
+        # The partial trailing frame is left for the next read
+        self.assertEqual(len(stream) - consumed, 4)
+
+    def test_binary_mode_matches_ascii(self):
+        with patch('serial.Serial', side_effect=MockSerial), patch('time.sleep'):
+            motor = MotorInterface()
+            motor.connect(port='/dev/ttyMock')
+
+            motor.send_command(2.0, 0.5, 0.1, 600)
+            ascii_df = motor.read_response(timeout=3.0)
+
+            self.assertTrue(motor.set_binary_mode(True))
+            motor.ser.motor.reset(0)  # Same start as the ASCII run
+            motor.send_command(2.0, 0.5, 0.1, 600)
+            binary_df = motor.read_response(timeout=3.0)
+            motor.close()
+
+        self.assertEqual(len(binary_df), 75)
+        self.assertTrue(ascii_df.to_dataframe().equals(binary_df.to_dataframe()))
+
+if __name__ == '__main__':
+    unittest.main()
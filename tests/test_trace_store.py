@@ -0,0 +1,103 @@
+import unittest
+import contextlib
+import io
+import random
+import tempfile
+import tracemalloc
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from ai.genetic_tuner import GeneticTuner, Individual
+from ai.surrogate import RBFSurrogate
+from ai.checkpoint import Checkpoint
+from ai.trace_store import TraceStore, TraceHandle
+from interface.response_buffer import ResponseBuffer
+from simulation.batch_motor import BatchSimulatedMotor
+from physics import SimulatedMotor
+
+class TestTraceStore(unittest.TestCase):
+    def test_append_and_reopen(self):
+        runs = [ResponseBuffer.from_columns(*SimulatedMotor().run_simulated_test(400, sp, 2.0, 0.5, 0.1))
+                for sp in (600, 300)]
+        ind = Individual(2.0, 0.5, 0.1)
+        ind.cost = 42.0
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TraceStore(tmp)
+            handles = [store.append(0, i, ind, run) for i, run in enumerate(runs)]
+            store.append(0, 2, ind, ResponseBuffer())  # Failed run
+            for handle, run in zip(handles, runs):
+                self.assertEqual(len(handle), len(run))
+                for col in ResponseBuffer.COLUMNS:
+                    self.assertEqual(list(handle[col]), list(run[col]))
+            store.close()
+
+            # Crash mid-write of an index record: reopening drops the fragment
+            with open(store.index_path, 'ab') as f:
+                f.write(b'\x00' * 5)
+            store = TraceStore(tmp)
+            self.assertEqual(len(store), 3)
+            entries = store.entries()
+            self.assertEqual(list(entries['individual']), [0, 1, 2])
+            self.assertEqual(list(entries['cost']), [42.0] * 3)
+            self.assertTrue(store.trace(2).empty)
+            self.assertEqual(list(store.trace(1)['pos']), list(runs[1]['pos']))
+            store.close()
+
+    def test_tuner_keeps_handles(self):
+        random.seed(5)
+        with tempfile.TemporaryDirectory() as tmp:
+            tuner = GeneticTuner(pop_size=10)
+            tuner.store = TraceStore(tmp)
+            tuner.initialize_population()
+            simulator = BatchSimulatedMotor()
+            for _ in range(3):
+                tuner.run_generation_batch(simulator, setpoint=600)
+
+            self.assertEqual(len(tuner.store), tuner.evaluations)
+            entries = tuner.store.entries()
+            self.assertEqual(sorted(set(entries['generation'])), [0, 1, 2])
+            for ind in tuner.population[:2]:  # Elites carry their history
+                self.assertIsInstance(ind.history, TraceHandle)
+                self.assertEqual(tuner.cost_func.evaluate(ind.history), ind.cost)
+            tuner.store.close()
+
+    def test_memory_stays_flat(self):
+        """
+        With a store, a bounded surrogate archive and a checkpoint, Python
+        memory does not grow with the number of generations.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            tuner = GeneticTuner(pop_size=20, rng=random.Random(2))
+            tuner.store = TraceStore(tmp)
+            tuner.surrogate = RBFSurrogate([tuner.kp_range, tuner.ki_range, tuner.kd_range])
+            tuner.max_archive = 100
+            tuner.checkpoint = Checkpoint(os.path.join(tmp, 'session.json'))
+            tuner.initialize_population()
+            simulator = BatchSimulatedMotor()
+
+            def generations(n):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(n):
+                        tuner.run_generation_batch(simulator, setpoint=600)
+
+            tracemalloc.start()
+            try:
+                generations(20)  # Archive full
+                warm = tracemalloc.get_traced_memory()[0]
+                generations(60)
+                grown = tracemalloc.get_traced_memory()[0] - warm
+            finally:
+                tracemalloc.stop()
+            tuner.checkpoint.close()
+            tuner.store.close()
+
+        self.assertEqual(len(tuner.archive), 100)
+        self.assertLess(grown, 50_000)
+
+
+if __name__ == '__main__':
+    unittest.main()